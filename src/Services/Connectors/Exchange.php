@@ -1,6 +1,7 @@
 <?php
 
 namespace App\Services\Connectors;
+use Psr\Log\LoggerInterface;
 use Symfony\Contracts\Cache\CacheInterface;
 
 class Exchange extends AbstractConnector implements ConnectorInterface
@@ -12,6 +13,10 @@ class Exchange extends AbstractConnector implements ConnectorInterface
   private $clientId = '';
   private $clientSecret = '';
   private $tenantId = '';
+  private $daemonSocket = '';
+  private $syncStateDir = '';
+  private $logTimings = false;
+  private $logger = null;
   
   private $preferedEmailAsLogin;
   
@@ -27,7 +32,7 @@ class Exchange extends AbstractConnector implements ConnectorInterface
     ),
   );
 
-  public function __construct(CacheInterface $cache, string $emailServer, string $domain, string $clientId, string $clientSecret, string $tenantId)
+  public function __construct(CacheInterface $cache, string $emailServer, string $domain, string $clientId, string $clientSecret, string $tenantId, string $daemonSocket = '', string $syncStateDir = '', bool $logTimings = false, ?LoggerInterface $logger = null)
   {
     $this->cache = $cache;
     $this->emailServer = $emailServer;
@@ -35,6 +40,10 @@ class Exchange extends AbstractConnector implements ConnectorInterface
     $this->clientId = $clientId;
     $this->clientSecret = $clientSecret;
     $this->tenantId = $tenantId;
+    $this->daemonSocket = $daemonSocket;
+    $this->syncStateDir = $syncStateDir;
+    $this->logTimings = $logTimings && null !== $logger;
+    $this->logger = $logger;
   }
 
   public function getName()
@@ -110,14 +119,55 @@ class Exchange extends AbstractConnector implements ConnectorInterface
     $exchangeUser = $this->user->getEntry()->getAttribute('userPrincipalName')[0];
     $listOfEmails[] = $exchangeUser;
 
-    $workingAccount = false;
-    foreach($listOfEmails as $userEmail)
+    /**
+     * all the candidate emails are given at once,
+     * the script tries them concurrently and returns the first working one
+     */
+    $listOfEmails = \array_unique($listOfEmails);
+
+    /**
+     * when calendar-exchange.py runs as a daemon, use it:
+     * it keeps the exchange sessions and tokens between requests.
+     * Fallback to a one-shot process if the daemon is not reachable
+     */
+    $startTime = \microtime(true);
+    $entries = null;
+    if($this->daemonSocket != '')
+    {
+      $entries = $this->callCalendarDaemon($strStart, $strEnd, $exchangeUser, $listOfEmails);
+    }
+    $fromDaemon = null !== $entries;
+
+    if(null === $entries)
     {
-      $cmd = sprintf('../src/py-exchange/calendar-exchange.py --start=%s --stop=%s --login=%s --mail=%s --server=%s --client_id=%s --client_secret=%s --tenant_id=%s',
+      $scriptArgs = array();
+      foreach($listOfEmails as $userEmail)
+      {
+        $scriptArgs[] = '--mail='.\escapeshellarg($userEmail);
+      }
+
+      /**
+       * with a state directory, the script only asks exchange
+       * for the changes since the previous refresh
+       */
+      if($this->syncStateDir != '')
+      {
+        $scriptArgs[] = '--state-dir='.\escapeshellarg($this->syncStateDir);
+      }
+
+      /**
+       * ask the script how long each phase took
+       */
+      if($this->logTimings)
+      {
+        $scriptArgs[] = '--timings';
+      }
+
+      $cmd = sprintf('../src/py-exchange/calendar-exchange.py --start=%s --stop=%s --login=%s %s --server=%s --client_id=%s --client_secret=%s --tenant_id=%s',
         \escapeshellarg($strStart),
         \escapeshellarg($strEnd),
         \escapeshellarg($exchangeUser),
-        \escapeshellarg($userEmail),
+        \implode(' ', $scriptArgs),
         \escapeshellarg($this->emailServer),
 	\escapeshellarg($this->clientId),
 	\escapeshellarg($this->clientSecret),
@@ -147,32 +197,7 @@ class Exchange extends AbstractConnector implements ConnectorInterface
       \fclose($pipes[0]);
       $entries = \stream_get_contents($pipes[1]);
       \fclose($pipes[1]);
-      $returnValue = \proc_close($r);
-      
-      // should be treat no entry as an error ?
-      if(0 != $returnValue || trim($returnValue) == '[]')
-      {
-        //echo 'got an error, checking for other emails ?'.N;
-        continue;
-      }
-    
-      /**
-       * yay, found a working account
-       */
-      $workingAccount = true;
-      
-      /**
-       * save tthis preference in cache
-       */
-      $this->preferedEmailAsLogin->set($userEmail);
-      $this->cache->save($this->preferedEmailAsLogin);
-      //echo 'setting '.$userEmail.' as prefered email account'.N;
-      break;
-    }
-
-    if(false === $workingAccount)
-    {
-      return array('errors' => 'unable to find a working account, tried '.implode(', ', $listOfEmails));
+      \proc_close($r);
     }
 
     if($entries == '')
@@ -181,11 +206,40 @@ class Exchange extends AbstractConnector implements ConnectorInterface
       return array('errors' => 'no entries');
     }
 
-    $entries = json_decode($entries, true);
-    if(isset($entries['errors']))
+    $response = json_decode($entries, true);
+    if(\is_array($response) && isset($response['errors']))
     {
-      return array('errors' => 'found errors in script output');
+      // the script knows why each candidate failed, pass it along
+      return array('errors' => $response['errors']);
     }
+    if(!\is_array($response) || !isset($response['mail']) || !isset($response['events']))
+    {
+      return array('errors' => 'unable to find a working account, tried '.implode(', ', $listOfEmails));
+    }
+
+    /**
+     * log which phase of the refresh took the time, next to the
+     * total time seen from here
+     */
+    if($this->logTimings && isset($response['timings']))
+    {
+      $this->logger->info('exchange refresh timings', array(
+        'key' => $memcacheKey,
+        'mail' => $response['mail'],
+        'daemon' => $fromDaemon,
+        'wall' => \round(\microtime(true) - $startTime, 4),
+        'timings' => $response['timings'],
+      ));
+    }
+
+    /**
+     * yay, found a working account
+     * save this preference in cache
+     */
+    $this->preferedEmailAsLogin->set($response['mail']);
+    $this->cache->save($this->preferedEmailAsLogin);
+
+    $entries = $response['events'];
     
     $entriesCopy = $entries;
     foreach($entriesCopy as $k => $entry)
@@ -224,6 +278,40 @@ class Exchange extends AbstractConnector implements ConnectorInterface
     return $entries;
   }
 
+  /**
+   * send one request to the calendar-exchange.py daemon
+   * returns the raw json output, or null if the daemon cannot be reached
+   */
+  private function callCalendarDaemon(string $strStart, string $strEnd, string $exchangeUser, array $listOfEmails)
+  {
+    $socket = @\stream_socket_client('unix://'.$this->daemonSocket, $errno, $errstr);
+    if(!$socket)
+    {
+      return null;
+    }
+
+    $request = array(
+      'start' => $strStart,
+      'stop' => $strEnd,
+      'login' => $exchangeUser,
+      'mail' => \array_values($listOfEmails),
+      'timings' => $this->logTimings,
+    );
+    \fwrite($socket, \json_encode($request)."\n");
+
+    /**
+     * like the one-shot mode, the password is sent apart
+     * on its own line, after the request
+     */
+    $this->writePasswordToPipe($socket);
+    \fwrite($socket, "\n");
+
+    $entries = \stream_get_contents($socket);
+    \fclose($socket);
+
+    return $entries;
+  }
+
   /**
    * the user asks to hide an event
    */
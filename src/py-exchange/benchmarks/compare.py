@@ -0,0 +1,75 @@
+"""
+Compare benchmark results with a baseline
+
+  python -m benchmarks.compare baseline.json results.json --threshold 0.2
+
+Both files are written by benchmarks.run or benchmarks.micro. Benchmarks
+found in both files are compared on their best time. The exit status is 1
+when any of them got slower than the baseline by more than the threshold,
+a fraction of the baseline time.
+
+Timings only compare on the same machine: keep a baseline per machine, made
+from a run of the reference commit, and use enough --repeat runs to smooth
+out the noise.
+"""
+
+import argparse
+import json
+import sys
+
+THRESHOLD = 0.2
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline, current, threshold=THRESHOLD, out=sys.stderr):
+    """
+    Print the comparison of two result documents, return the names of the
+    benchmarks that regressed past the threshold
+    """
+    for key in ('python', 'platform'):
+        if baseline['meta'].get(key) != current['meta'].get(key):
+            print('Warning: %s differs, baseline %s, current %s' % (key, baseline['meta'].get(key),
+                current['meta'].get(key)), file=out)
+
+    regressions = []
+    for name in sorted(set(baseline['results']) | set(current['results'])):
+        if name not in current['results']:
+            print('%-48s %10s %10s %8s  missing' % (name, '', '', ''), file=out)
+            continue
+        if name not in baseline['results']:
+            print('%-48s %10s %10s %8s  new' % (name, '', '', ''), file=out)
+            continue
+        before = baseline['results'][name]['seconds']
+        after = current['results'][name]['seconds']
+        change = after / before - 1 if before else 0.0
+        status = ''
+        if change > threshold:
+            status = 'REGRESSION'
+            regressions.append(name)
+        elif change < -threshold:
+            status = 'faster'
+        print('%-48s %9.4fs %9.4fs %+7.1f%%  %s' % (name, before, after, change * 100, status), file=out)
+
+    if regressions:
+        print('%d benchmark(s) more than %d%% slower than the baseline' % (len(regressions), threshold * 100),
+            file=out)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare benchmark results with a baseline")
+    parser.add_argument('baseline', help="Baseline result file")
+    parser.add_argument('current', help="Result file to check")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+        help="Allowed slowdown, as a fraction of the baseline time (default: %(default)s)")
+    args = parser.parse_args()
+    if compare(load(args.baseline), load(args.current), args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
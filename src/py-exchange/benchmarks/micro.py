@@ -0,0 +1,263 @@
+"""
+Micro-benchmarks of the exchangelib parsing and serialization hot paths
+
+  cd src/py-exchange
+  python -m benchmarks.micro --items 1000 --output micro-results.json
+  python -m benchmarks.micro --baseline micro-results.json --threshold 0.2
+
+Each benchmark runs one function on synthetic payloads of --items elements:
+
+  from_xml         EWSElement.from_xml() of CalendarItem and Message elements
+  field_clean      Field.clean() of all the fields of the parsed items
+  to_xml           EWSElement.to_xml() of the parsed items
+  wrap             transport.wrap() of GetItem and FindItem request payloads
+  util.to_xml      util.to_xml() of FindItem and GetItem responses
+  from_string      EWSDateTime.from_string() of UTC and offset timestamps
+  q.to_xml         Q.to_xml() of a restriction with several conditions
+  DocumentYielder  splitting of a stream of GetStreamingEvents envelopes
+
+Results use the format of benchmarks.run, keyed as name[variant,items]. With
+--baseline, they are compared with a previous result file and the exit
+status is 1 when a benchmark got slower than the threshold allows.
+"""
+
+import argparse
+import sys
+import time
+
+from exchangelib import EWSDateTime, Q
+from exchangelib.items import ID_ONLY, CalendarItem, Message
+from exchangelib.properties import ItemId
+from exchangelib.restriction import Restriction
+from exchangelib.services import FindItem, GetItem
+from exchangelib.transport import wrap
+from exchangelib.util import DocumentYielder, to_xml
+
+from benchmarks.mock_ews import FOOTER, HEADER, MESSAGE, Calendar, MockServer
+from benchmarks.run import TNS, addBaselineArguments, checkBaseline, getAccount, measure, result, writeResults
+
+
+# Fast functions are called in a loop until a run takes at least this long, in seconds
+MIN_TIME = 0.05
+
+
+def measureLoops(func, repeat, setup=None):
+    """
+    Like measure(), with times per call of func(). Without setup, func() is
+    called as many times as needed to take MIN_TIME per run
+    """
+    loops = 1
+    if setup is None:
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if elapsed < MIN_TIME:
+            loops = int(MIN_TIME / elapsed) + 1 if elapsed else 1000
+
+    def looped():
+        for _ in range(loops):
+            func()
+
+    seconds, runs, peak = measure(looped, repeat, setup=setup)
+    return seconds / loops, [run / loops for run in runs], peak
+
+
+def message(i, body_size):
+    """
+    The Message element of item i, as returned by GetItem
+    """
+    body = ('Message %d text. ' % i) * (body_size // 16 + 1)
+    return ('<t:Message><t:ItemId Id="message-%d" ChangeKey="ck-%d"/><t:ParentFolderId Id="inbox" ChangeKey="f"/>'
+        '<t:ItemClass>IPM.Note</t:ItemClass><t:Subject>Re: report %d &amp; figures</t:Subject>'
+        '<t:Sensitivity>Normal</t:Sensitivity><t:Body BodyType="Text">%s</t:Body>'
+        '<t:DateTimeReceived>2026-03-%02dT09:%02d:00Z</t:DateTimeReceived><t:Size>%d</t:Size>'
+        '<t:Importance>Normal</t:Importance><t:IsDraft>false</t:IsDraft>'
+        '<t:DateTimeSent>2026-03-%02dT09:%02d:00Z</t:DateTimeSent>'
+        '<t:ToRecipients><t:Mailbox><t:Name>Recipient</t:Name><t:EmailAddress>to@example.com</t:EmailAddress>'
+        '<t:RoutingType>SMTP</t:RoutingType></t:Mailbox></t:ToRecipients>'
+        '<t:From><t:Mailbox><t:Name>Sender %d</t:Name><t:EmailAddress>sender%d@example.com</t:EmailAddress>'
+        '<t:RoutingType>SMTP</t:RoutingType></t:Mailbox></t:From>'
+        '<t:InternetMessageId>&lt;%d@example.com&gt;</t:InternetMessageId><t:IsRead>true</t:IsRead>'
+        '</t:Message>' % (i, i, i, body[:body_size], 1 + i % 28, i % 60, body_size, 1 + i % 28, i % 60, i, i, i))
+
+
+def response(service, messages):
+    return (HEADER % {'service': service} + ''.join(MESSAGE % {'service': service, 'content': content}
+        for content in messages) + FOOTER % {'service': service}).encode()
+
+
+class Payloads:
+    """
+    The synthetic payloads of the benchmarks, built once
+    """
+
+    def __init__(self, calendar, body_size):
+        size = calendar.size
+        self.size = size
+        self.elements = {
+            CalendarItem: ''.join(calendar.item(i, full=True) for i in range(size)),
+            Message: ''.join(message(i, body_size) for i in range(size)),
+        }
+        self.responses = {
+            'FindItem': response('FindItem', ['<m:RootFolder IndexedPagingOffset="%d" TotalItemsInView="%d" '
+                'IncludesLastItemInRange="true"><t:Items>%s</t:Items></m:RootFolder>'
+                % (size, size, ''.join(calendar.item(i) for i in range(size)))]),
+            'GetItem': response('GetItem', ['<m:Items>%s</m:Items>' % calendar.item(i, full=True)
+                for i in range(size)]),
+        }
+        self.timestamps = {
+            'utc': ['2026-%02d-%02dT%02d:%02d:%02dZ' % (1 + i % 12, 1 + i % 28, i % 24, i % 60, i % 59)
+                for i in range(size)],
+            'offset': ['2026-%02d-%02dT%02d:%02d:%02d.%03d+02:00' % (1 + i % 12, 1 + i % 28, i % 24, i % 60,
+                i % 59, i % 1000) for i in range(size)],
+        }
+        # A GetStreamingEvents response holds one envelope per notification
+        notification = response('GetStreamingEvents', ['<m:Notifications><m:Notification>'
+            '<t:SubscriptionId>subscription</t:SubscriptionId><t:ModifiedEvent><t:TimeStamp>%s</t:TimeStamp>'
+            '<t:ItemId Id="%s" ChangeKey="ck"/><t:ParentFolderId Id="calendar" ChangeKey="f"/></t:ModifiedEvent>'
+            '</m:Notification></m:Notifications>']).replace(b'<?xml version="1.0" encoding="utf-8"?>\n', b'')
+        self.stream = b''.join(notification.replace(b'%s', ts.encode(), 1).replace(b'%s',
+            calendar.item_id(i).encode(), 1) for i, ts in enumerate(self.timestamps['utc']))
+
+    def parse(self, cls):
+        return to_xml(('<t:Items xmlns:t="%s">%s</t:Items>' % (TNS, self.elements[cls])).encode()).getroot()
+
+
+def benchItems(account, payloads, repeat):
+    version = account.version
+    results = {}
+    for cls in (CalendarItem, Message):
+        elems = []
+        items = []
+
+        def parse():
+            # from_xml() clears the elements it converted
+            elems[:] = payloads.parse(cls)
+
+        def fromXml():
+            items[:] = [cls.from_xml(elem=elem, account=account) for elem in elems]
+
+        def clean():
+            for item in items:
+                for f in item.supported_fields(version=version):
+                    f.clean(getattr(item, f.name), version=version)
+
+        def toXml():
+            for item in items:
+                item.to_xml(version=version)
+
+        results['from_xml', cls.__name__] = result(payloads.size, *measureLoops(fromXml, repeat, setup=parse))
+        results['field_clean', cls.__name__] = result(payloads.size, *measureLoops(clean, repeat))
+        results['to_xml', cls.__name__] = result(payloads.size, *measureLoops(toXml, repeat))
+    return results
+
+
+def benchWrap(account, payloads, repeat):
+    version = account.version
+    tz = account.default_timezone
+    ids = [ItemId(id=Calendar.item_id(i), changekey='ck-%d' % i) for i in range(payloads.size)]
+    folders = [account.calendar]
+    getItem = GetItem(account=account).get_payload(items=ids, additional_fields=None, shape=ID_ONLY)
+    findItem = FindItem(account=account).get_payload(folders=folders, additional_fields=None, restriction=None,
+        order_fields=None, query_string=None, shape=ID_ONLY, depth='Shallow', calendar_view=None, page_size=100)
+
+    # One GetItem request for all the items, one FindItem request per item
+    def runGetItem():
+        wrap(content=getItem, api_version=version.api_version, timezone=tz)
+
+    def runFindItem():
+        for _ in range(payloads.size):
+            wrap(content=findItem, api_version=version.api_version, timezone=tz)
+
+    return {
+        ('wrap', 'GetItem'): result(payloads.size, *measureLoops(runGetItem, repeat)),
+        ('wrap', 'FindItem'): result(payloads.size, *measureLoops(runFindItem, repeat)),
+    }
+
+
+def benchToXml(payloads, repeat):
+    results = {}
+    for service, content in payloads.responses.items():
+        def run():
+            to_xml(content)
+
+        results['util.to_xml', service] = result(payloads.size, *measureLoops(run, repeat))
+    return results
+
+
+def benchFromString(payloads, repeat):
+    results = {}
+    for variant, timestamps in payloads.timestamps.items():
+        def run():
+            for ts in timestamps:
+                EWSDateTime.from_string(ts)
+
+        results['from_string', variant] = result(payloads.size, *measureLoops(run, repeat))
+    return results
+
+
+def benchQ(account, payloads, repeat):
+    version = account.version
+    folders = [account.calendar]
+    start = EWSDateTime.from_string('2026-01-01T00:00:00Z')
+    end = EWSDateTime.from_string('2026-12-31T23:59:59Z')
+    q = (Q(start__gte=start) & Q(end__lt=end) & ~Q(subject__contains='cancelled')
+        & (Q(categories__contains=['Project']) | Q(location__startswith='Room'))
+        & Q(legacy_free_busy_status__in=['Busy', 'Tentative', 'OOF']))
+
+    def run():
+        for _ in range(payloads.size):
+            q.to_xml(folders=folders, version=version, applies_to=Restriction.ITEMS)
+
+    return {('q.to_xml', 'restriction'): result(payloads.size, *measureLoops(run, repeat))}
+
+
+def benchDocumentYielder(payloads, repeat):
+    # requests.Response.iter_content() yields the body byte by byte
+    chunks = [payloads.stream[i:i + 1] for i in range(len(payloads.stream))]
+
+    def run():
+        assert sum(1 for _ in DocumentYielder(iter(chunks))) == payloads.size
+
+    return {('DocumentYielder', 'notifications'): result(payloads.size, *measureLoops(run, repeat))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks of the parsing and serialization hot paths")
+    parser.add_argument('--items', default='1000', help="Comma separated payload sizes (default: %(default)s)")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per benchmark, the best one is kept (default: %(default)s)")
+    parser.add_argument('--body-size', type=int, default=2000, help="Body size of the items (default: %(default)s)")
+    parser.add_argument('--attendees', type=int, default=10, help="Attendees of the calendar items (default: %(default)s)")
+    parser.add_argument('--output', default='micro-results.json', help="Result file (default: %(default)s)")
+    addBaselineArguments(parser)
+    args = parser.parse_args()
+
+    results = {}
+    for size in [int(size) for size in args.items.split(',')]:
+        calendar = Calendar(size, body_size=args.body_size, attendees=args.attendees)
+        payloads = Payloads(calendar, args.body_size)
+        # The mock server only answers the version and calendar folder lookups
+        with MockServer(calendar) as server:
+            account = getAccount(server)
+            groups = (
+                benchItems(account, payloads, args.repeat),
+                benchWrap(account, payloads, args.repeat),
+                benchToXml(payloads, args.repeat),
+                benchFromString(payloads, args.repeat),
+                benchQ(account, payloads, args.repeat),
+                benchDocumentYielder(payloads, args.repeat),
+            )
+        for group in groups:
+            for (name, variant), value in group.items():
+                key = '%s[%s,%d]' % (name, variant, size)
+                results[key] = value
+                print('%-40s %10.4fs %12s items/s %10s KiB' % (key, value['seconds'], value['items_per_second'],
+                    value['peak_memory_kb']), file=sys.stderr)
+
+    output = writeResults(args.output, results, repeat=args.repeat, body_size=args.body_size,
+        attendees=args.attendees)
+    checkBaseline(args, output)
+
+
+if __name__ == '__main__':
+    main()
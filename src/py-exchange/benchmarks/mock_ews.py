@@ -0,0 +1,248 @@
+"""
+A local stand-in for an Exchange server, for the benchmarks
+
+It answers FindItem, GetItem, ResolveNames, GetFolder, SyncFolderHierarchy
+and SyncFolderItems requests with canned responses about a calendar of a
+configurable number of items, and OAuth token requests. Requests are not
+validated, only the ids, offsets and sync states they carry are read.
+
+Recorded responses can be replayed instead: put the SOAP response of a
+service in <recordings>/<service name>.xml, e.g. FindItem.xml.
+"""
+
+import json
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from xml.sax.saxutils import escape
+
+EWS_PATH = '/EWS/Exchange.asmx'
+TOKEN_PATH = '/token'
+
+HEADER = '''<?xml version="1.0" encoding="utf-8"?>
+<s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/"><s:Header>\
+<h:ServerVersionInfo MajorVersion="15" MinorVersion="20" MajorBuildNumber="5452" MinorBuildNumber="24" \
+Version="V2018_01_08" xmlns:h="http://schemas.microsoft.com/exchange/services/2006/types"/></s:Header><s:Body>\
+<m:%(service)sResponse xmlns:m="http://schemas.microsoft.com/exchange/services/2006/messages" \
+xmlns:t="http://schemas.microsoft.com/exchange/services/2006/types"><m:ResponseMessages>'''
+
+FOOTER = '''</m:ResponseMessages></m:%(service)sResponse></s:Body></s:Envelope>'''
+
+MESSAGE = '''<m:%(service)sResponseMessage ResponseClass="Success"><m:ResponseCode>NoError</m:ResponseCode>\
+%(content)s</m:%(service)sResponseMessage>'''
+
+CALENDAR_FOLDER_ID = 'calendar-folder-id'
+
+
+class Calendar:
+    """
+    The items of the mock calendar, all built from their index
+
+    Items are spread over the days from 2026-01-05 on, 8 per day. With
+    body_size, GetItem returns a text body of that many characters, with
+    attendees, that many required attendees.
+    """
+
+    def __init__(self, size, body_size=0, attendees=0, changes=10):
+        self.size = size
+        self.body_size = body_size
+        self.attendees = attendees
+        # Number of items reported as updated by an incremental SyncFolderItems
+        self.changes = min(changes, size)
+
+    @staticmethod
+    def item_id(i):
+        return 'item-%d' % i
+
+    @staticmethod
+    def index(item_id):
+        return int(item_id.rsplit('-', 1)[1])
+
+    def times(self, i):
+        day, slot = divmod(i, 8)
+        month, day = divmod(day, 28)
+        start = '2026-%02d-%02dT%02d:00:00Z' % (1 + month % 12, 5 + day % 24, 8 + slot)
+        end = start[:11] + '%02d:45:00Z' % (8 + slot)
+        return start, end
+
+    def item(self, i, full=False):
+        """
+        The CalendarItem element of item i. FindItem only returns the
+        summary, GetItem also returns the body and attendees
+        """
+        start, end = self.times(i)
+        xml = ['<t:CalendarItem><t:ItemId Id="%s" ChangeKey="ck-%d"/>' % (self.item_id(i), i),
+            '<t:Subject>Meeting %d &amp; review</t:Subject>' % i]
+        if full and self.body_size:
+            body = ('Agenda of meeting %d. ' % i) * (self.body_size // 20 + 1)
+            xml.append('<t:Body BodyType="Text">%s</t:Body>' % escape(body[:self.body_size]))
+        xml.append('<t:UID>uid-%d</t:UID><t:Start>%s</t:Start><t:End>%s</t:End>' % (i, start, end))
+        xml.append('<t:IsAllDayEvent>false</t:IsAllDayEvent><t:LegacyFreeBusyStatus>Busy</t:LegacyFreeBusyStatus>')
+        xml.append('<t:Location>Room %d</t:Location><t:CalendarItemType>Single</t:CalendarItemType>' % (i % 50))
+        if full and self.attendees:
+            xml.append('<t:RequiredAttendees>')
+            for j in range(self.attendees):
+                xml.append('<t:Attendee><t:Mailbox><t:Name>Attendee %d</t:Name>'
+                    '<t:EmailAddress>attendee%d@example.com</t:EmailAddress><t:RoutingType>SMTP</t:RoutingType>'
+                    '</t:Mailbox><t:ResponseType>Accept</t:ResponseType></t:Attendee>' % (j, j))
+            xml.append('</t:RequiredAttendees>')
+        xml.append('</t:CalendarItem>')
+        return ''.join(xml)
+
+
+class MockEWS:
+    """
+    Build the SOAP responses of the mock server
+    """
+
+    def __init__(self, calendar, recordings=None):
+        self.calendar = calendar
+        self.recordings = recordings
+        self.requests = {}
+        self._lock = threading.Lock()
+
+    def respond(self, body):
+        match = re.search(rb'<(?:\w+:)?Body[^>]*>\s*<(?:\w+:)?(\w+)', body)
+        if match is None:
+            raise ValueError('No SOAP body in the request')
+        service = match.group(1).decode()
+        with self._lock:
+            self.requests[service] = self.requests.get(service, 0) + 1
+        if self.recordings:
+            path = os.path.join(self.recordings, service + '.xml')
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    return f.read()
+        handler = getattr(self, service, None)
+        if handler is None:
+            raise ValueError('Unsupported service %s' % service)
+        messages = handler(body.decode())
+        return (HEADER % {'service': service} + ''.join(MESSAGE % {'service': service, 'content': content}
+            for content in messages) + FOOTER % {'service': service}).encode()
+
+    def ResolveNames(self, request):
+        return ['<m:ResolutionSet TotalItemsInView="1" IncludesLastItemInRange="true"><t:Resolution><t:Mailbox>'
+            '<t:Name>Benchmark</t:Name><t:EmailAddress>benchmark@example.com</t:EmailAddress>'
+            '<t:RoutingType>SMTP</t:RoutingType><t:MailboxType>Mailbox</t:MailboxType></t:Mailbox>'
+            '</t:Resolution></m:ResolutionSet>']
+
+    def GetFolder(self, request):
+        folders = []
+        for kind, folder_id in re.findall(r'<t:(DistinguishedFolderId|FolderId)[^>]*\bId="([^"]+)"', request):
+            if folder_id in ('calendar', CALENDAR_FOLDER_ID):
+                folders.append('<m:Folders><t:CalendarFolder><t:FolderId Id="%s" ChangeKey="fck"/>'
+                    '<t:ParentFolderId Id="root-folder-id" ChangeKey="rck"/><t:DisplayName>Calendar</t:DisplayName>'
+                    '<t:FolderClass>IPF.Appointment</t:FolderClass><t:TotalCount>%d</t:TotalCount>'
+                    '<t:ChildFolderCount>0</t:ChildFolderCount></t:CalendarFolder></m:Folders>'
+                    % (CALENDAR_FOLDER_ID, self.calendar.size))
+            else:
+                folders.append('<m:Folders><t:Folder><t:FolderId Id="%s-id" ChangeKey="fck"/>'
+                    '<t:DisplayName>%s</t:DisplayName><t:FolderClass>IPF.Note</t:FolderClass>'
+                    '<t:ChildFolderCount>0</t:ChildFolderCount></t:Folder></m:Folders>' % (folder_id, folder_id))
+        return folders
+
+    def SyncFolderHierarchy(self, request):
+        return ['<m:SyncState>hierarchy-state</m:SyncState>'
+            '<m:IncludesLastFolderInRange>true</m:IncludesLastFolderInRange><m:Changes/>']
+
+    def FindItem(self, request):
+        calendar = self.calendar
+        if '<m:CalendarView' in request:
+            # Calendar views are not paged
+            offset, count = 0, calendar.size
+        else:
+            offset = int(re.search(r'\bOffset="(\d+)"', request).group(1))
+            count = max(min(int(re.search(r'\bMaxEntriesReturned="(\d+)"', request).group(1)),
+                calendar.size - offset), 0)
+        last = 'true' if offset + count >= calendar.size else 'false'
+        items = ''.join(calendar.item(i) for i in range(offset, offset + count))
+        return ['<m:RootFolder IndexedPagingOffset="%d" TotalItemsInView="%d" IncludesLastItemInRange="%s">'
+            '<t:Items>%s</t:Items></m:RootFolder>' % (offset + count, calendar.size, last, items)]
+
+    def GetItem(self, request):
+        return ['<m:Items>%s</m:Items>' % self.calendar.item(self.calendar.index(item_id), full=True)
+            for item_id in re.findall(r'<t:ItemId Id="([^"]+)"', request)]
+
+    def SyncFolderItems(self, request):
+        """
+        Without a sync state, all items are created. With the final sync
+        state of a full sync, the first items of the calendar are updated
+        """
+        calendar = self.calendar
+        state = re.search(r'<m:SyncState>([^<]*)</m:SyncState>', request)
+        state = state.group(1) if state else ''
+        max_changes = int(re.search(r'<m:MaxChangesReturned>(\d+)<', request).group(1))
+        if state == 'synced':
+            changes = ''.join('<t:Update>%s</t:Update>' % calendar.item(i) for i in range(calendar.changes))
+            new_state, last = 'synced', 'true'
+        else:
+            # Full sync, the state holds the number of items sent so far
+            offset = int(state[5:]) if state.startswith('full-') else 0
+            count = min(max_changes, calendar.size - offset)
+            changes = ''.join('<t:Create><t:CalendarItem><t:ItemId Id="%s" ChangeKey="ck-%d"/></t:CalendarItem>'
+                '</t:Create>' % (calendar.item_id(i), i) for i in range(offset, offset + count))
+            offset += count
+            new_state, last = ('full-%d' % offset, 'false') if offset < calendar.size else ('synced', 'true')
+        return ['<m:SyncState>%s</m:SyncState><m:IncludesLastItemInRange>%s</m:IncludesLastItemInRange>'
+            '<m:Changes>%s</m:Changes>' % (new_state, last, changes)]
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.path.startswith(TOKEN_PATH):
+            self.reply(200, 'application/json', json.dumps(
+                {'access_token': 'benchmark', 'token_type': 'Bearer', 'expires_in': 3600}).encode())
+        elif self.path.startswith(EWS_PATH):
+            try:
+                self.reply(200, 'text/xml; charset=utf-8', self.server.ews.respond(body))
+            except Exception as e:
+                self.reply(500, 'text/plain', str(e).encode())
+        else:
+            self.reply(404, 'text/plain', b'Not found')
+
+    def reply(self, status, content_type, content):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockServer(ThreadingHTTPServer):
+    """
+    The mock server, listening on a free local port. Use it as a context
+    manager to serve requests in a background thread
+    """
+
+    daemon_threads = True
+
+    def __init__(self, calendar, recordings=None):
+        super().__init__(('127.0.0.1', 0), RequestHandler)
+        self.ews = MockEWS(calendar, recordings)
+
+    @property
+    def url(self):
+        return 'http://%s:%d' % self.server_address
+
+    @property
+    def service_endpoint(self):
+        return self.url + EWS_PATH
+
+    @property
+    def token_url(self):
+        return self.url + TOKEN_PATH
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, name='mock-ews', daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
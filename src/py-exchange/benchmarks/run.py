@@ -0,0 +1,281 @@
+"""
+Offline benchmarks of calendar-exchange.py and exchangelib
+
+  cd src/py-exchange
+  python -m benchmarks.run --sizes 100,1000,10000 --output results.json
+
+Every benchmark runs against a local mock EWS server (see mock_ews), with
+calendars of each of the given sizes:
+
+  script.once     end-to-end calendar-exchange.py run, cold (no version and
+                  folder caches) and warm
+  script.delta    end-to-end run with --state-dir: the first run does a full
+                  sync, the refresh only gets a few changes
+  queryset.view   calendar view iteration, FindItem only
+  queryset.all    calendar iteration with FindItem and GetItem
+  from_xml        CalendarItem.from_xml() of GetItem items
+  to_xml          CalendarItem.to_xml() of the same items
+
+The in-process benchmarks run with 'plain' items, and with 'full' items
+having a body and attendees. Each benchmark keeps the best time of
+--repeat runs. Memory is the tracemalloc peak of one more run, or the peak
+RSS reported by the script. Results are written as JSON, keyed by
+benchmark name, variant and size. With --baseline, they are compared with
+a previous result file (see benchmarks.compare).
+
+The script runs through benchmarks.script_runner, which imports
+exchangelib before the script: the script "interpreter" phase then
+includes the import time.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from exchangelib import DELEGATE, Account, Configuration, Credentials, EWSDateTime, EWSTimeZone, __version__
+from exchangelib.items import CalendarItem
+from exchangelib.transport import NOAUTH
+from exchangelib.util import to_xml
+
+from benchmarks import compare
+from benchmarks.mock_ews import Calendar, MockServer
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'calendar-exchange.py')
+
+# Calendar view window covering all the items of the mock calendars
+VIEW_START = '2026-01-01'
+VIEW_STOP = '2026-12-31'
+
+VIEW_FIELDS = ('uid', 'subject', 'start', 'end', 'is_all_day', 'type')
+
+TNS = 'http://schemas.microsoft.com/exchange/services/2006/types'
+
+
+def measure(func, repeat, memory=True, setup=None):
+    """
+    Call func() repeat times, return the best time in seconds, all the
+    times, and the tracemalloc peak of one more call in KiB
+
+    The optional setup() is called, untimed, before each call
+    """
+    runs = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - start)
+    peak = None
+    if memory:
+        if setup:
+            setup()
+        tracemalloc.start()
+        try:
+            func()
+            peak = tracemalloc.get_traced_memory()[1] // 1024
+        finally:
+            tracemalloc.stop()
+    return min(runs), runs, peak
+
+
+def result(items, seconds, runs, peak_memory_kb, **extra):
+    return dict(extra, items=items, seconds=round(seconds, 6), runs=[round(r, 6) for r in runs],
+        items_per_second=round(items / seconds, 1) if seconds else None, peak_memory_kb=peak_memory_kb)
+
+
+def getAccount(server):
+    config = Configuration(service_endpoint=server.service_endpoint, credentials=Credentials('benchmark', 'benchmark'),
+        auth_type=NOAUTH, max_connections=4)
+    return Account('benchmark@example.com', config=config, autodiscover=False, access_type=DELEGATE,
+        default_timezone=EWSTimeZone('UTC'))
+
+
+def benchQueryset(server, calendar, variant, repeat):
+    account = getAccount(server)
+    folder = account.calendar
+    tz = account.default_timezone
+    start = EWSDateTime.from_string(VIEW_START + 'T00:00:00Z').astimezone(tz)
+    end = EWSDateTime.from_string(VIEW_STOP + 'T23:59:59Z').astimezone(tz)
+    results = {}
+
+    if variant == 'plain':
+        # FindItem returns the same summary for both variants
+        def view():
+            assert sum(1 for _ in folder.view(start=start, end=end).find_only(*VIEW_FIELDS)) == calendar.size
+        results['queryset.view', variant] = result(calendar.size, *measure(view, repeat))
+
+    def iterate():
+        assert sum(1 for _ in folder.all()) == calendar.size
+    results['queryset.all', variant] = result(calendar.size, *measure(iterate, repeat))
+    return results
+
+
+def benchXml(server, calendar, variant, repeat):
+    account = getAccount(server)
+    content = ('<t:Items xmlns:t="%s">%s</t:Items>' % (
+        TNS, ''.join(calendar.item(i, full=True) for i in range(calendar.size)))).encode()
+    elems = []
+    items = []
+
+    def parse():
+        # from_xml() clears the elements it converted
+        elems[:] = to_xml(content).getroot()
+
+    def fromXml():
+        items[:] = [CalendarItem.from_xml(elem=elem, account=account) for elem in elems]
+
+    def toXml():
+        for item in items:
+            item.to_xml(version=account.version)
+
+    results = {('from_xml', variant): result(calendar.size, *measure(fromXml, repeat, setup=parse))}
+    results['to_xml', variant] = result(calendar.size, *measure(toXml, repeat))
+    return results
+
+
+def runScript(server, tmpdir, stateDir=None):
+    """
+    Run calendar-exchange.py once, return its wall time and its answer
+    """
+    cmd = [sys.executable, '-m', 'benchmarks.script_runner', server.url, SCRIPT, '--start=' + VIEW_START,
+        '--stop=' + VIEW_STOP, '--login=benchmark@example.com', '--mail=benchmark@example.com', '--server=mock',
+        '--client_id=benchmark', '--client_secret=benchmark', '--tenant_id=benchmark', '--timings']
+    if stateDir:
+        cmd.append('--state-dir=' + stateDir)
+    # The version, folder and autodiscover caches live in the temporary directory
+    env = dict(os.environ, TMPDIR=tmpdir)
+    start = time.perf_counter()
+    process = subprocess.run(cmd, input='benchmark\n', capture_output=True, text=True, env=env,
+        cwd=os.path.dirname(SCRIPT))
+    seconds = time.perf_counter() - start
+    try:
+        answer = json.loads(process.stdout)
+    except ValueError:
+        raise RuntimeError('calendar-exchange.py failed: %s' % process.stderr.strip())
+    if 'errors' in answer:
+        raise RuntimeError('calendar-exchange.py failed: %s' % answer['errors'])
+    return seconds, answer
+
+
+def benchScript(server, calendar, repeat):
+    """
+    Each repeat starts from empty caches, the best run of each step is kept
+    together with its timings
+    """
+    steps = {}
+
+    def record(step, seconds, answer):
+        steps.setdefault(step, []).append((seconds, answer))
+
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            record(('script.once', 'cold'), *runScript(server, tmpdir))
+            record(('script.once', 'warm'), *runScript(server, tmpdir))
+        with tempfile.TemporaryDirectory() as tmpdir:
+            stateDir = os.path.join(tmpdir, 'state')
+            os.mkdir(stateDir)
+            record(('script.delta', 'full'), *runScript(server, tmpdir, stateDir))
+            record(('script.delta', 'refresh'), *runScript(server, tmpdir, stateDir))
+
+    results = {}
+    for step, runs in steps.items():
+        seconds, answer = min(runs, key=lambda run: run[0])
+        if len(answer['events']) != calendar.size:
+            raise RuntimeError('%s returned %d events instead of %d' % (step[0], len(answer['events']), calendar.size))
+        timings = answer['timings']
+        results[step] = result(calendar.size, seconds, [run[0] for run in runs], timings['peak_rss_kb'],
+            phases=timings['phases'], services=timings['services'])
+    return results
+
+
+def writeResults(path, results, **parameters):
+    """
+    Write the results as JSON, with the benchmark environment and parameters
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+            cwd=os.path.dirname(SCRIPT)).stdout.strip() or None
+    except OSError:
+        commit = None
+    output = {
+        'meta': dict(parameters,
+            date=datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            commit=commit,
+            python=platform.python_version(),
+            platform=platform.platform(),
+            exchangelib=__version__,
+        ),
+        'results': results,
+    }
+    with open(path, 'w') as f:
+        json.dump(output, f, indent=2, sort_keys=True)
+    print("Results written to %s" % path, file=sys.stderr)
+    return output
+
+
+def addBaselineArguments(parser):
+    parser.add_argument('--baseline', help="Result file to compare with, exit with status 1 on regressions")
+    parser.add_argument('--threshold', type=float, default=compare.THRESHOLD,
+        help="Allowed slowdown, as a fraction of the baseline time (default: %(default)s)")
+
+
+def checkBaseline(args, output):
+    if args.baseline and compare.compare(compare.load(args.baseline), output, args.threshold):
+        sys.exit(1)
+
+
+BENCHMARKS = ('script', 'queryset', 'xml')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks against a mock EWS server")
+    parser.add_argument('--sizes', default='100,1000,10000', help="Comma separated calendar sizes (default: %(default)s)")
+    parser.add_argument('--benchmarks', default=','.join(BENCHMARKS), help="Comma separated groups (default: %(default)s)")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per benchmark, the best one is kept (default: %(default)s)")
+    parser.add_argument('--body-size', type=int, default=2000, help="Body size of 'full' items (default: %(default)s)")
+    parser.add_argument('--attendees', type=int, default=10, help="Attendees of 'full' items (default: %(default)s)")
+    parser.add_argument('--recordings', help="Directory of recorded responses (<service>.xml) to serve instead")
+    parser.add_argument('--output', default='benchmark-results.json', help="Result file (default: %(default)s)")
+    addBaselineArguments(parser)
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    benchmarks = args.benchmarks.split(',')
+    for name in benchmarks:
+        if name not in BENCHMARKS:
+            parser.error("unknown benchmark %s, choose from %s" % (name, ', '.join(BENCHMARKS)))
+
+    results = {}
+
+    def report(size, group):
+        for (name, variant), value in group.items():
+            key = '%s[%s,%d]' % (name, variant, size)
+            results[key] = value
+            print('%-40s %10.4fs %12s items/s %10s KiB' % (key, value['seconds'], value['items_per_second'],
+                value['peak_memory_kb']), file=sys.stderr)
+
+    for size in sizes:
+        variants = {'plain': Calendar(size), 'full': Calendar(size, body_size=args.body_size, attendees=args.attendees)}
+        for variant, calendar in variants.items():
+            with MockServer(calendar, args.recordings) as server:
+                if 'script' in benchmarks and variant == 'plain':
+                    report(size, benchScript(server, calendar, args.repeat))
+                if 'queryset' in benchmarks:
+                    report(size, benchQueryset(server, calendar, variant, args.repeat))
+                if 'xml' in benchmarks:
+                    report(size, benchXml(server, calendar, variant, args.repeat))
+
+    output = writeResults(args.output, results, repeat=args.repeat, body_size=args.body_size,
+        attendees=args.attendees, recordings=args.recordings)
+    checkBaseline(args, output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+"""
+Run calendar-exchange.py against the mock EWS server
+
+  python -m benchmarks.script_runner <mock server url> <script> [script arguments]
+
+The script is run as is, only the exchange server and the OAuth token URL
+it builds from --server and --tenant_id are pointed to the mock server.
+"""
+
+import os
+import runpy
+import sys
+
+
+def main():
+    mock_url, script = sys.argv[1:3]
+    sys.argv = [script] + sys.argv[3:]
+    # The mock server talks plain HTTP
+    os.environ['OAUTHLIB_INSECURE_TRANSPORT'] = '1'
+
+    import exchangelib
+    from exchangelib.credentials import OAuth2Credentials
+    from benchmarks.mock_ews import EWS_PATH, TOKEN_PATH
+
+    OAuth2Credentials.token_url = property(lambda self: mock_url + TOKEN_PATH)
+
+    class MockConfiguration(exchangelib.Configuration):
+        def __init__(self, *args, server=None, **kwargs):
+            super().__init__(*args, service_endpoint=mock_url + EWS_PATH, **kwargs)
+
+    exchangelib.Configuration = MockConfiguration
+    runpy.run_path(script, run_name='__main__')
+
+
+if __name__ == '__main__':
+    main()
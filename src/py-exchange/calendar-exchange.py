@@ -3,70 +3,238 @@
 # Get a list of EWS calendar events for a specific user
 # in JSON format
 #
+# The script can either run once (the default), reading the password on
+# stdin, or run as a daemon listening on a local unix socket (--daemon).
+# In daemon mode, exchangelib Protocol instances (cached by CachingProtocol),
+# their OAuth tokens and warm TLS sessions are kept between requests.
+#
+# With --timings (or "timings": true in a daemon request), the answer gets a
+# "timings" key with the time spent in each phase of the request, see Timings.
+#
 
 # Imports
 
 ## Builtins
+import datetime
+import hashlib
 import json
+import logging
+import os
+import signal
 import sys
+import tempfile
 import argparse
+import collections
+import resource
+import socketserver
+import stat
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager, suppress
+
+# CPU time used to start the interpreter and import the builtins above
+startupTime = time.process_time()
+importStart = time.perf_counter()
 
 ## Other
 from exchangelib import DELEGATE, IMPERSONATION, Account, Credentials, OAuth2LegacyCredentials,\
     Configuration, NTLM, GSSAPI, Build, Version, EWSDateTime, CalendarItem, EWSTimeZone
+from exchangelib import BaseProtocol
+from exchangelib.folders import FolderCollection, RootOfHierarchy
+from exchangelib.folders.collections import SyncCompleted
+from exchangelib.errors import ErrorInvalidSyncStateData
+from exchangelib.protocol import Protocol
+from exchangelib.services import EWSService, FindItem, SyncFolderItems
+from exchangelib.tracing import LogTracer, set_tracer
+
+importTime = time.perf_counter() - importStart
+
+# Remember the server version between runs instead of asking it each time
+BaseProtocol.PERSISTENT_VERSION_CACHE = True
+# Remember the calendar folder ID between runs instead of asking for it each time
+RootOfHierarchy.PERSISTENT_HIERARCHY_CACHE = True
+# Convert the calendar items one by one while the FindItem response is parsed, instead of building the whole page
+FindItem.INCREMENTAL_PARSING = True
+# Send the chunks of chunked requests (e.g. GetItem) concurrently
+EWSService.CONCURRENT_CHUNKS = True
 
 
 parser = argparse.ArgumentParser()
-parser.add_argument('--start',     required=True, help="Hostname of the server")
-parser.add_argument('--stop',     required=True, help="File with the results")
-parser.add_argument('--login', required=True, help="login")
-parser.add_argument('--mail', required=True, help="User login")
+parser.add_argument('--start',     help="First day of the calendar view (YYYY-MM-DD)")
+parser.add_argument('--stop',     help="Last day of the calendar view (YYYY-MM-DD)")
+parser.add_argument('--login', help="login")
+parser.add_argument('--mail', action='append', help="Candidate mailbox address, can be repeated")
 parser.add_argument('--server', required=True)
 parser.add_argument('--client_id', required=True)
 parser.add_argument('--client_secret', required=True)
 parser.add_argument('--tenant_id', required=True)
+parser.add_argument('--daemon', action='store_true', help="Serve requests on a unix socket instead of running once")
+parser.add_argument('--socket', help="Unix socket path used in daemon mode (default: in $XDG_RUNTIME_DIR, or a private directory in /tmp)")
+parser.add_argument('--state-dir', help="Keep the calendar sync state in this directory and only ask exchange for changes")
+parser.add_argument('--timings', action='store_true', help="Add the time spent in each phase to the JSON answer")
+parser.add_argument('--trace', action='store_true', help="Log the exchangelib spans (mailbox, service, retry, duration) on stderr")
 
 args = parser.parse_args()
 
-# Argument parsing
-# TODO: use ArgParse instead
-dateStart     = args.start.split('-')
-dateEnd       = args.stop.split('-')
-user_login    = args.login
-user_mail     = args.mail
+if not args.daemon:
+    for required in ('start', 'stop', 'login', 'mail'):
+        if getattr(args, required) is None:
+            parser.error("the following arguments are required: --%s" % required)
+
 server        = args.server
 client_id     = args.client_id
 client_secret = args.client_secret
 tenant_id     = args.tenant_id
-user_password = input("")
-
-# Setup exchangelib necessary objects
-ews_credentials   = OAuth2LegacyCredentials(
-        client_id=client_id,
-        client_secret=client_secret,
-        tenant_id=tenant_id,
-        username=user_login,
-        password=user_password)
-ews_configuration = Configuration(server=server, credentials=ews_credentials)
-
-# Try to login to EWS, using user supplied parameters, and bail if an error happens
-try:
-    account = Account(primary_smtp_address=user_mail,
-                         config=ews_configuration,
-                         autodiscover=False,
-                         access_type=DELEGATE
-                     )
-except:
-    print(json.dumps({'errors': "Unable to discover exchange server"}))
-    sys.exit(1)
-
-#for item in account.inbox.all().order_by('-datetime_received')[:5]:
-#    print(item.subject, item.sender, item.datetime_received)
-
-#sys.exit(0)
-
-start = EWSDateTime(int(dateStart[0]), int(dateStart[1]), int(dateStart[2]), tzinfo=account.default_timezone)
-end   = EWSDateTime(int(dateEnd[0]), int(dateEnd[1]), int(dateEnd[2]), tzinfo=account.default_timezone)
+
+
+# Calendar fields needed by calendarItemNormalize(). None of them is a complex
+# field, so the calendar view is answered by FindItem alone, without GetItem
+calendarFields = ('uid', 'subject', 'start', 'end', 'is_all_day', 'type')
+
+# SyncFolderItems does not add the timezone fields needed to convert the
+# start and end of all day events like calendar views do
+syncFields = calendarFields + ('_start_timezone', '_end_timezone')
+
+# Only single events can be patched locally, calendar views expand the
+# other types (recurring masters, occurrences and exceptions)
+singleItemType = 'Single'
+
+# Number of calendar windows (start/stop pairs) kept per mailbox in delta mode
+maxWindows = 8
+
+# All candidate mailboxes of a user share the same credentials, thus the same
+# Protocol. Allow up to that many concurrent sessions so they are probed in
+# parallel. In daemon mode, the actual number adapts to the response times
+# of the server. A single run is too short for that, and gets them all
+maxConnections = 4
+
+
+class CalendarError(Exception):
+    """
+    An error that is reported back to the caller as {"errors": ...}
+    """
+
+
+class Timings:
+    """
+    Wall time spent in the phases of a request, in seconds
+
+    Phases measured several times, like the items of several windows, are
+    added up. The requests sent to exchange are taken from the metrics of
+    the exchangelib Protocol, which is shared by all the candidate mailboxes
+    of a user: they include the requests of the other probes.
+    """
+
+    # Per service stats: (name in the report, kind of metric, metric name)
+    REQUEST_STATS = (
+        ('requests', 'counters', 'requests_total'),
+        ('request', 'histograms', 'request_seconds'),
+        ('parse', 'histograms', 'parse_seconds'),
+        ('response_bytes', 'counters', 'response_bytes_total'),
+    )
+
+    def __init__(self):
+        self.phases = {}
+        self.services = {}
+        # Time spent in exchange requests and SOAP parsing, per phase
+        self.exchange = {}
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0) + seconds
+
+    @contextmanager
+    def requests(self, protocol, phase=None):
+        """
+        Count the exchange requests sent while in the block, per service:
+        number of requests, HTTP time, SOAP parse time and response bytes
+
+        The HTTP and parse time are also added to the exchange time of phase
+        """
+        before = protocol.metrics.snapshot()
+        try:
+            yield
+        finally:
+            after = protocol.metrics.snapshot()
+            for service_name in after['counters'].get('requests_total', {}):
+                stats = self.services.setdefault(service_name, dict.fromkeys((key for key, _, _ in self.REQUEST_STATS), 0))
+                for key, kind, name in self.REQUEST_STATS:
+                    value = metricValue(after, kind, name, service_name) - metricValue(before, kind, name, service_name)
+                    stats[key] += value
+                    if phase and key in ('request', 'parse'):
+                        self.exchange[phase] = self.exchange.get(phase, 0) + value
+
+    def report(self):
+        phases = {name: round(seconds, 4) for name, seconds in self.phases.items()}
+        services = {}
+        for service_name, stats in self.services.items():
+            if stats['requests']:
+                services[service_name] = dict(stats, request=round(stats['request'], 4), parse=round(stats['parse'], 4))
+        if 'items' in phases:
+            # What is left of the item iteration once the requests and the SOAP
+            # parsing are removed: mostly the from_xml conversion of the items,
+            # and their XML parsing since FindItem parses incrementally
+            phases['convert'] = round(max(self.phases['items'] - self.exchange.get('items', 0), 0), 4)
+        return {'phases': phases, 'services': services}
+
+
+def metricValue(snapshot, kind, name, service_name):
+    """
+    Return a counter, or the sum of a histogram, from a snapshot of the
+    exchangelib Protocol metrics
+    """
+    value = snapshot[kind].get(name, {}).get(service_name)
+    if value is None:
+        return 0
+    return value['sum'] if kind == 'histograms' else value
+
+
+def getAccount(user_login, user_mail, user_password, timings=None):
+    """
+    Setup exchangelib necessary objects and return an Account
+
+    Credentials are compared by value, so the same user always gets the same
+    cached Protocol (and its session pool) back from exchangelib.
+    """
+    timings = timings or Timings()
+    ews_credentials   = OAuth2LegacyCredentials(
+            client_id=client_id,
+            client_secret=client_secret,
+            tenant_id=tenant_id,
+            username=user_login,
+            password=user_password)
+    ews_configuration = Configuration(server=server, credentials=ews_credentials, max_connections=maxConnections,
+        adaptive_connections=args.daemon)
+
+    # Try to login to EWS, using user supplied parameters, and bail if an error happens.
+    # Keep the cause in the message, so the caller can tell an authentication
+    # failure from a discovery failure
+    try:
+        # Account() would do all this, do it first to time each step
+        protocol = Protocol(config=ews_configuration)
+        with timings.phase('token'):
+            protocol.release_session(protocol.get_session())
+    except Exception as e:
+        raise CalendarError("Unable to authenticate on exchange server: %s" % e) from e
+    try:
+        with timings.phase('version'), timings.requests(protocol):
+            protocol.version
+        return Account(primary_smtp_address=user_mail,
+                             config=ews_configuration,
+                             autodiscover=False,
+                             access_type=DELEGATE
+                         )
+    except Exception as e:
+        raise CalendarError("Unable to discover exchange server: %s" % e) from e
+
 
 def calendarItemNormalize(item):
     """
@@ -91,18 +259,439 @@ def calendarItemNormalize(item):
 
     return event
 
-# Initialize items list (duh)
-items = []
-
-# Normalize every item available in user calendar and append it to
-# the items list.
-#for item in account.calendar.filter(start__range=(start, end)):
-for item in account.calendar.view(start = start, end = end):
-    #print(item.subject)
-    formattedItem = calendarItemNormalize(item)
-    items.append(formattedItem)
-    #print(formattedItem)
-    #print(json.dumps(formattedItem) + ",")
-
-# Send items back to the user / script
-print(json.dumps(items))
+
+def getWindow(account, start, stop):
+    """
+    Return the EWSDateTime bounds of the start and stop days (YYYY-MM-DD strings)
+    """
+    dateStart = start.split('-')
+    dateEnd   = stop.split('-')
+    start = EWSDateTime(int(dateStart[0]), int(dateStart[1]), int(dateStart[2]), tzinfo=account.default_timezone)
+    end   = EWSDateTime(int(dateEnd[0]), int(dateEnd[1]), int(dateEnd[2]), tzinfo=account.default_timezone)
+    return start, end
+
+
+def viewItems(account, start, stop, cancelled=None, timings=None):
+    """
+    Yield the items of the account calendar view between the start and
+    stop days
+
+    The optional cancelled event stops the iteration once another
+    mailbox candidate already answered
+    """
+    timings = timings or Timings()
+    start, end = getWindow(account, start, stop)
+    with timings.phase('calendar'), timings.requests(account.protocol):
+        calendar = account.calendar
+    #for item in account.calendar.filter(start__range=(start, end)):
+    items = iter(calendar.view(start = start, end = end).find_only(*calendarFields))
+    with timings.requests(account.protocol, 'items'):
+        while True:
+            # Time the item iteration only, not the work of the caller between items
+            with timings.phase('items'):
+                item = next(items, None)
+            if item is None:
+                return
+            if cancelled is not None and cancelled.is_set():
+                raise CalendarError("Cancelled")
+            yield item
+
+
+def getEvents(account, start, stop, cancelled=None, timings=None):
+    """
+    Return the normalized events of the account calendar between the
+    start and stop days (YYYY-MM-DD strings)
+    """
+    timings = timings or Timings()
+    # Initialize items list (duh)
+    items = []
+
+    # Normalize every item available in user calendar and append it to
+    # the items list.
+    for item in viewItems(account, start, stop, cancelled, timings):
+        with timings.phase('normalize'):
+            formattedItem = calendarItemNormalize(item)
+        items.append(formattedItem)
+
+    return items
+
+
+class CalendarState:
+    """
+    Events of a mailbox calendar kept on disk between runs, together with
+    the SyncFolderItems state, so a refresh only asks exchange for changes
+
+    Events are stored per window (start/stop days), by item id
+    """
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        self.sync_state = data.get('sync_state')
+        self.windows = data.get('windows', {})
+
+    def save(self):
+        # Forget the oldest windows, dicts keep their insertion order
+        for key in list(self.windows)[:-maxWindows]:
+            del self.windows[key]
+        tmpPath = self.path + '.tmp'
+        # The state holds event titles, keep it private
+        fd = os.open(tmpPath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'sync_state': self.sync_state, 'windows': self.windows}, f)
+        os.replace(tmpPath, self.path)
+
+
+stateLocks = {}
+stateLocksLock = threading.Lock()
+
+
+def getStateLock(path):
+    """
+    Return the lock serializing the refreshes of one state file
+    """
+    with stateLocksLock:
+        return stateLocks.setdefault(path, threading.Lock())
+
+
+def syncChanges(account, sync_state):
+    """
+    Return the calendar changes since sync_state, and the new sync state
+
+    Without a sync state, the server sends every item of the calendar: only
+    their ids are asked and they are dropped, the call only gets a starting
+    point for the next refreshes
+    """
+    only_fields = syncFields if sync_state else ()
+    changes = []
+    try:
+        for change in FolderCollection(account=account, folders=[account.calendar]).sync_items(
+                sync_state=sync_state, only_fields=only_fields, max_changes_returned=512):
+            if sync_state:
+                changes.append(change)
+    except SyncCompleted as e:
+        return changes, e.sync_state
+
+
+def isInWindow(item, start, end):
+    """
+    Tell if the item overlaps the [start, end[ window
+    """
+    if not isinstance(item.start, datetime.datetime):
+        # All day events have dates, and their end day is included
+        return item.start < end.date() and item.end >= start.date()
+    return item.start < end and item.end > start
+
+
+def applyChanges(account, windowKey, window, changes):
+    """
+    Apply SyncFolderItems changes to the events of a window. Return False
+    when the window cannot be patched and must be fetched again
+    """
+    start, end = getWindow(account, *windowKey.split('/'))
+    events = window['events']
+    for change_type, item in changes:
+        if change_type == SyncFolderItems.DELETE:
+            if item.id in events:
+                del events[item.id]
+            elif window['recurring']:
+                # Maybe the master of some occurrences of the window
+                return False
+        elif change_type in (SyncFolderItems.CREATE, SyncFolderItems.UPDATE):
+            if getattr(item, 'type', None) != singleItemType:
+                return False
+            events.pop(item.id, None)
+            if isInWindow(item, start, end):
+                events[item.id] = calendarItemNormalize(item)
+    return True
+
+
+def getEventsDelta(account, user_login, user_mail, start, stop, cancelled=None, timings=None):
+    """
+    Like getEvents(), but keep the events in the state directory and only
+    ask exchange for the changes since the last refresh
+    """
+    timings = timings or Timings()
+    path = os.path.join(args.state_dir, hashlib.sha1(("%s\0%s" % (user_login, user_mail)).encode('utf-8')).hexdigest() + '.json')
+    windowKey = '%s/%s' % (start, stop)
+
+    with getStateLock(path):
+        state = CalendarState(path)
+        changes = None
+        with timings.phase('sync'), timings.requests(account.protocol):
+            if state.sync_state:
+                try:
+                    changes, state.sync_state = syncChanges(account, state.sync_state)
+                except ErrorInvalidSyncStateData:
+                    changes = None
+            if changes is None:
+                # First refresh, or the server forgot our state: start from scratch
+                changes, state.sync_state = syncChanges(account, None)
+                state.windows = {}
+
+        for key, window in list(state.windows.items()):
+            if not applyChanges(account, key, window, changes):
+                del state.windows[key]
+
+        window = state.windows.pop(windowKey, None)
+        if window is None:
+            window = {'events': {}, 'recurring': False}
+            for item in viewItems(account, start, stop, cancelled, timings):
+                with timings.phase('normalize'):
+                    window['events'][item.id] = calendarItemNormalize(item)
+                if item.type != singleItemType:
+                    window['recurring'] = True
+        # Most recently used last
+        state.windows[windowKey] = window
+        state.save()
+
+    return list(window['events'].values())
+
+
+class AccountCache:
+    """
+    Keep Account objects (and thus their resolved calendar folder) between
+    requests. An account is rebuilt when the credentials change.
+
+    Accounts hold the password and an authenticated session, so only the
+    maxSize most recently used accounts are kept, and accounts unused for
+    idleTimeout seconds are dropped. The Protocol of a dropped account is
+    dropped too, unless another cached account still uses it.
+    """
+
+    def __init__(self, maxSize=64, idleTimeout=1800):
+        self.maxSize = maxSize
+        self.idleTimeout = idleTimeout
+        # Least recently used first
+        self._accounts = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_login, user_mail, user_password, timings=None):
+        key = (user_login, user_mail)
+        with self._lock:
+            self._evict(time.monotonic() - self.idleTimeout)
+            cached = self._accounts.get(key)
+            if cached is not None and cached[0] == user_password:
+                self._accounts[key] = (user_password, cached[1], time.monotonic())
+                self._accounts.move_to_end(key)
+                return cached[1]
+        account = getAccount(user_login, user_mail, user_password, timings)
+        with self._lock:
+            self._accounts[key] = (user_password, account, time.monotonic())
+            self._accounts.move_to_end(key)
+            self._evict(time.monotonic() - self.idleTimeout)
+        return account
+
+    def _evict(self, idleBefore):
+        """
+        Drop the idle accounts and the least recently used ones above
+        maxSize. Called with the lock held
+        """
+        dropped = []
+        while self._accounts:
+            key, (_, account, lastUsed) = next(iter(self._accounts.items()))
+            if lastUsed >= idleBefore and len(self._accounts) <= self.maxSize:
+                break
+            del self._accounts[key]
+            dropped.append(account)
+        inUse = {id(account.protocol) for _, account, _ in self._accounts.values()}
+        for account in dropped:
+            protocol = account.protocol
+            if id(protocol) in inUse:
+                continue
+            inUse.add(id(protocol))
+            # A request may still be using it, its sessions are closed when
+            # the last reference is gone
+            with suppress(KeyError):
+                del Protocol[protocol.config]
+
+
+accounts = AccountCache()
+
+
+def probeMailboxes(user_login, user_mails, user_password, start, stop, withTimings=False):
+    """
+    Try all candidate mailboxes concurrently, and return the first one in
+    the order of user_mails that answers, together with its events:
+    {"mail": ..., "events": [...]}
+
+    A candidate only wins once all the candidates before it have failed,
+    so a fast alias never shadows the preferred address.
+
+    withTimings adds the timings of the winning probe to the answer
+    """
+    cancelled = threading.Event()
+
+    def probe(user_mail):
+        timings = Timings()
+        with timings.phase('probe'):
+            account = accounts.get(user_login, user_mail, user_password, timings)
+            if args.state_dir:
+                events = getEventsDelta(account, user_login, user_mail, start, stop, cancelled, timings)
+            else:
+                events = getEvents(account, start, stop, cancelled, timings)
+        return events, timings
+
+    results = [None] * len(user_mails)
+    errors = [None] * len(user_mails)
+    executor = ThreadPoolExecutor(max_workers=len(user_mails))
+    futures = {executor.submit(probe, user_mail): i for i, user_mail in enumerate(user_mails)}
+    try:
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                results[index] = future.result()
+            except Exception as e:
+                print("%s: %s" % (user_mails[index], e), file=sys.stderr)
+                errors[index] = e
+            # The first candidate that did not fail wins, once it has answered
+            for i, user_mail in enumerate(user_mails):
+                if results[i] is not None:
+                    events, timings = results[i]
+                    response = {'mail': user_mail, 'events': events}
+                    if withTimings:
+                        response['timings'] = timings.report()
+                    return response
+                if errors[i] is None:
+                    break
+    finally:
+        # Remaining probes stop at their next item
+        cancelled.set()
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+    raise CalendarError("Unable to find a working mailbox: %s" % '; '.join(
+        "%s: %s" % (user_mail, error) for user_mail, error in zip(user_mails, errors)))
+
+
+def dumpResponse(response):
+    """
+    Serialize the answer to JSON. With timings, the serialization time and
+    the peak RSS of the process (in KiB) are added to them
+    """
+    timings = response.pop('timings', None)
+    start = time.perf_counter()
+    payload = json.dumps(response)
+    if timings is None:
+        return payload
+    timings['phases']['json'] = round(time.perf_counter() - start, 4)
+    timings['peak_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # The events are already serialized, only append the timings
+    return payload[:-1] + ', "timings": ' + json.dumps(timings) + '}'
+
+
+def runOnce():
+    """
+    Historical mode: one request per process, password read on stdin
+    """
+    user_password = input("")
+    try:
+        response = probeMailboxes(args.login, args.mail, user_password, args.start, args.stop, args.timings)
+    except CalendarError as e:
+        print(json.dumps({'errors': str(e)}))
+        sys.exit(1)
+
+    if args.timings:
+        response['timings']['phases'].update(interpreter=round(startupTime, 4), imports=round(importTime, 4))
+
+    # Send items back to the user / script
+    print(dumpResponse(response))
+
+
+class CalendarRequestHandler(socketserver.StreamRequestHandler):
+    """
+    One request per connection. The client sends a JSON line with the
+    start, stop, login and mail (list of candidates) keys, then the password
+    on the next line, and reads the JSON answer until the connection is closed.
+    """
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+            user_password = self.rfile.readline().decode('utf-8').rstrip('\r\n')
+            user_mails = request['mail']
+            if isinstance(user_mails, str):
+                user_mails = [user_mails]
+            response = probeMailboxes(request['login'], user_mails, user_password, request['start'], request['stop'],
+                bool(request.get('timings')))
+        except CalendarError as e:
+            response = {'errors': str(e)}
+        except (ValueError, KeyError) as e:
+            response = {'errors': "Invalid request: %s" % e}
+        except Exception as e:
+            response = {'errors': "Unable to get calendar events: %s" % e}
+        self.wfile.write(dumpResponse(response).encode('utf-8'))
+
+
+class CalendarServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def defaultSocketPath():
+    """
+    A socket path in a directory only this user can write to, so that
+    nobody else can squat the path: $XDG_RUNTIME_DIR, or else a private
+    directory in the temporary directory
+    """
+    runtimeDir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtimeDir:
+        return os.path.join(runtimeDir, 'calendar-exchange.sock')
+
+    socketDir = os.path.join(tempfile.gettempdir(), 'calendar-exchange-%d' % os.getuid())
+    with suppress(FileExistsError):
+        os.mkdir(socketDir, 0o700)
+    # The directory may have been created by someone else beforehand
+    st = os.lstat(socketDir)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise SystemExit("%s is not a private directory, use --socket" % socketDir)
+    return os.path.join(socketDir, 'calendar-exchange.sock')
+
+
+def runDaemon():
+    """
+    Serve calendar requests on a unix socket until SIGTERM / SIGINT
+    """
+    socketPath = args.socket or defaultSocketPath()
+    # A previous daemon may have left its socket behind
+    if os.path.exists(socketPath):
+        os.unlink(socketPath)
+
+    # The password goes through the socket, keep it private to this user and
+    # group from the moment it is created
+    oldUmask = os.umask(0o117)
+    try:
+        calendarServer = CalendarServer(socketPath, CalendarRequestHandler)
+    finally:
+        os.umask(oldUmask)
+
+    def shutdown(signum, frame):
+        threading.Thread(target=calendarServer.shutdown).start()
+    signal.signal(signal.SIGTERM, shutdown)
+
+    try:
+        calendarServer.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        calendarServer.server_close()
+        if os.path.exists(socketPath):
+            os.unlink(socketPath)
+
+
+if args.trace:
+    # One line per span, children first, all the spans of a calendar view share its trace id
+    logging.basicConfig(stream=sys.stderr, format='%(asctime)s %(message)s')
+    logging.getLogger('exchangelib.tracing').setLevel(logging.INFO)
+    set_tracer(LogTracer(logging.INFO))
+
+if args.daemon:
+    # Identical calendar refreshes arriving at the same time share a single FindItem request
+    FolderCollection.COALESCE_FIND_ITEMS = True
+    runDaemon()
+else:
+    runOnce()
@@ -1,4 +1,5 @@
-from .account import Account, Identity
+from .account import Account, Identity, fetch_calendar_views
+from .aio import AsyncAccount
 from .attachments import FileAttachment, ItemAttachment
 from .autodiscover import discover
 from .configuration import Configuration
@@ -13,6 +14,7 @@ from .credentials import (
 from .ewsdatetime import UTC, UTC_NOW, EWSDate, EWSDateTime, EWSTimeZone
 from .extended_properties import ExtendedProperty
 from .folders import DEEP, SHALLOW, Folder, FolderCollection, RootOfHierarchy
+from .item_cache import ItemCache
 from .items import (
     AcceptItem,
     CalendarItem,
@@ -29,6 +31,7 @@ from .items import (
     Task,
     TentativelyAcceptItem,
 )
+from .metrics import MetricsRegistry
 from .properties import UID, Attendee, Body, DLMailbox, HTMLBody, ItemId, Mailbox, Room, RoomList
 from .protocol import BaseProtocol, FailFast, FaultTolerance, NoVerifyHTTPAdapter, TLSClientAuth
 from .restriction import Q
@@ -42,6 +45,7 @@ __all__ = [
     "__version__",
     "AcceptItem",
     "Account",
+    "AsyncAccount",
     "Attendee",
     "BASIC",
     "BaseProtocol",
@@ -74,9 +78,11 @@ __all__ = [
     "IMPERSONATION",
     "Identity",
     "ItemAttachment",
+    "ItemCache",
     "ItemId",
     "Mailbox",
     "Message",
+    "MetricsRegistry",
     "NTLM",
     "NoVerifyHTTPAdapter",
     "OAUTH2",
@@ -103,6 +109,7 @@ __all__ = [
     "Version",
     "close_connections",
     "discover",
+    "fetch_calendar_views",
 ]
 
 # Set a default user agent, e.g. "exchangelib/3.1.1 (python-requests/2.22.0)"
@@ -1,4 +1,5 @@
 import locale as stdlib_locale
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from logging import getLogger
 
 from cached_property import threaded_cached_property
@@ -54,8 +55,19 @@ from .folders import (
     ToDoSearch,
     VoiceMail,
 )
-from .items import ALL_OCCURRENCES, AUTO_RESOLVE, HARD_DELETE, ID_ONLY, SAVE_ONLY, SEND_TO_NONE
-from .properties import Mailbox, SendingAs
+from .item_cache import ItemCache
+from .items import (
+    ALL_OCCURRENCES,
+    ALL_PROPERTIES,
+    AUTO_RESOLVE,
+    HARD_DELETE,
+    ID_ONLY,
+    SAVE_ONLY,
+    SEND_TO_NONE,
+    SHALLOW,
+    CalendarItem,
+)
+from .properties import CalendarView, DistinguishedFolderId, ItemId, Mailbox, SendingAs
 from .protocol import Protocol
 from .queryset import QuerySet
 from .services import (
@@ -64,6 +76,7 @@ from .services import (
     CreateItem,
     DeleteItem,
     ExportItems,
+    FindItem,
     GetDelegate,
     GetItem,
     GetMailTips,
@@ -76,7 +89,9 @@ from .services import (
     UpdateItem,
     UploadItems,
 )
-from .util import get_domain, peek
+from .services.common import to_item_id
+from .tracing import bind
+from .util import chunkify, get_domain, peek
 
 log = getLogger(__name__)
 
@@ -121,6 +136,7 @@ class Account:
         config=None,
         locale=None,
         default_timezone=None,
+        item_cache=None,
     ):
         """
 
@@ -136,6 +152,8 @@ class Account:
         :param locale: The locale of the user, e.g. 'en_US'. Defaults to the locale of the host, if available.
         :param default_timezone: EWS may return some datetime values without timezone information. In this case, we will
             assume values to be in the provided timezone. Defaults to the timezone of the host.
+        :param item_cache: An ItemCache object. If set, fetch() serves unchanged items from the cache instead of
+            fetching them again. (Default value = None)
         :return:
         """
         if "@" not in primary_smtp_address:
@@ -198,6 +216,10 @@ class Account:
         # For maintaining affinity in e.g. subscriptions
         self.affinity_cookie = None
 
+        if not isinstance(item_cache, (ItemCache, type(None))):
+            raise InvalidTypeError("item_cache", item_cache, ItemCache)
+        self.item_cache = item_cache
+
         # We may need to override the default server version on a per-account basis because Microsoft may report one
         # server version up-front but delegate account requests to an older backend server. Create a new instance to
         # avoid changing the protocol version.
@@ -698,6 +720,9 @@ class Account:
         :param chunk_size: The number of items to send to the server in a single request (Default value = None)
 
         :return: A generator of Item objects, in the same order as the input
+
+        If the account has an item cache, items whose changekey is unchanged are served from the cache. Only the other
+        items are fetched from the server.
         """
         validation_folder = folder or Folder(root=self.root)  # Default to a folder type that supports all item types
         # 'ids' could be an unevaluated QuerySet, e.g. if we ended up here via `fetch(ids=some_folder.filter(...))`. In
@@ -715,6 +740,9 @@ class Account:
             additional_fields = {
                 f for f in validation_folder.normalize_fields(fields=only_fields) if not f.field.is_attribute
             }
+        if self.item_cache is not None:
+            yield from self._fetch_with_cache(ids=ids, additional_fields=additional_fields, chunk_size=chunk_size)
+            return
         # Always use IdOnly here, because AllProperties doesn't actually get *all* properties
         yield from self._consume_item_service(
             service_cls=GetItem,
@@ -726,6 +754,36 @@ class Account:
             ),
         )
 
+    def _fetch_with_cache(self, ids, additional_fields, chunk_size):
+        # Look up the IDs in batches that are large enough to keep all sessions busy fetching the cache misses. Follow
+        # the adaptive pool size, which may have backed off after throttling.
+        if isinstance(ids, QuerySet):
+            # We just want an iterator over the results
+            ids = iter(ids)
+        batch_size = (chunk_size or GetItem.CHUNK_SIZE) * self.protocol.session_pool_limit
+        for batch in chunkify(ids, batch_size):
+            item_ids = [to_item_id(i, ItemId) for i in batch]
+            cached = [
+                self.item_cache.get(item_id=i.id, changekey=i.changekey, fields=additional_fields) for i in item_ids
+            ]
+            misses = [i for i, item in zip(item_ids, cached) if item is None]
+            log.debug("Found %s of %s items in the item cache", len(batch) - len(misses), len(batch))
+            fetched = self._consume_item_service(
+                service_cls=GetItem,
+                items=misses,
+                chunk_size=chunk_size,
+                kwargs=dict(
+                    additional_fields=additional_fields,
+                    shape=ID_ONLY,
+                ),
+            )
+            for item in cached:
+                if item is None:
+                    item = next(fetched)
+                    if not isinstance(item, Exception):
+                        self.item_cache.put(item=item, fields=additional_fields)
+                yield item
+
     def fetch_personas(self, ids):
         """Fetch personas by ID.
 
@@ -760,3 +818,70 @@ class Account:
         if self.fullname:
             return f"{self.primary_smtp_address} ({self.fullname})"
         return self.primary_smtp_address
+
+
+def fetch_calendar_views(
+    config, mailboxes, start, end, only=None, access_type=IMPERSONATION, max_workers=None, **kwargs
+):
+    """Get the calendar view between 'start' and 'end' of many mailboxes at once. All mailboxes share the Protocol of
+    'config', which must have credentials that can impersonate or access the mailboxes as a delegate. One CalendarView
+    request per mailbox is sent directly to the distinguished calendar folder of the mailbox, so no folder lookups are
+    needed. Requests run concurrently.
+
+    :param config: A Configuration object
+    :param mailboxes: An iterable of email addresses
+    :param start: The start of the view, as an EWSDateTime
+    :param end: The end of the view, as an EWSDateTime
+    :param only: A list of CalendarItem field names to return. These must be fields that FindItem can return. Default
+        is all the properties FindItem returns.
+    :param access_type: The access type of the credentials of 'config' (Default value = IMPERSONATION)
+    :param max_workers: The max number of concurrent requests. Defaults to the max session pool size of the protocol
+    :param kwargs: Extra arguments for the Account objects, e.g. 'default_timezone'
+    :return: A generator of (mailbox, item) tuples, in the order the responses arrive. If the request for a mailbox
+        fails, the exception is returned as the item.
+    """
+    if only is None:
+        shape, additional_fields = ALL_PROPERTIES, None
+    else:
+        shape = ID_ONLY
+        additional_fields = {FieldPath(field=CalendarItem.get_field_by_fieldname(f)) for f in only}
+        complex_fields = sorted(fp.field.name for fp in additional_fields if fp.field.is_complex)
+        if complex_fields:
+            raise ValueError(f"Fields {complex_fields} are complex fields and would require a GetItem request")
+    calendar_view = CalendarView(start=start, end=end)
+    protocol = Protocol(config=config)
+
+    def _fetch(mailbox):
+        account = Account(primary_smtp_address=mailbox, access_type=access_type, config=config, **kwargs)
+        folder = DistinguishedFolderId(id=Calendar.DISTINGUISHED_FOLDER_ID, mailbox=Mailbox(email_address=mailbox))
+        return list(
+            FindItem(account=account).call(
+                folders=[folder],
+                additional_fields=additional_fields,
+                restriction=None,
+                order_fields=None,
+                shape=shape,
+                query_string=None,
+                depth=SHALLOW,
+                calendar_view=calendar_view,
+                max_items=None,
+                offset=0,
+            )
+        )
+
+    with ThreadPoolExecutor(max_workers=max_workers or protocol.session_pool_maxsize) as executor:
+        futures = {executor.submit(bind(_fetch), mailbox): mailbox for mailbox in mailboxes}
+        try:
+            for future in as_completed(futures):
+                mailbox = futures[future]
+                try:
+                    items = future.result()
+                except Exception as e:
+                    log.debug("Calendar view of %s failed: %s", mailbox, e)
+                    yield mailbox, e
+                    continue
+                for item in items:
+                    yield mailbox, item
+        finally:
+            for future in futures:
+                future.cancel()
@@ -0,0 +1,358 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from inspect import isgenerator
+from itertools import islice
+from threading import Lock
+from weakref import WeakKeyDictionary
+
+from cached_property import threaded_cached_property
+
+from .folders import BaseFolder, FolderCollection
+from .queryset import QuerySet
+
+log = logging.getLogger(__name__)
+
+
+def _async_method(name, doc_prefix):
+    """Create a coroutine method that calls the blocking method 'name' of the wrapped object in a worker."""
+
+    async def method(self, *args, **kwargs):
+        return await self._call(getattr(self._wrapped, name), *args, **kwargs)
+
+    method.__name__ = name
+    method.__doc__ = f"Async version of {doc_prefix}.{name}(). Generators are returned as lists."
+    return method
+
+
+def _protocol_of(wrapped):
+    # Find the protocol that the requests of an account, folder or queryset are sent with
+    if isinstance(wrapped, QuerySet):
+        wrapped = wrapped.folder_collection
+    account = getattr(wrapped, "account", None) or wrapped
+    return getattr(account, "protocol", None)
+
+
+class WorkerPool:
+    """A fixed set of worker threads that run the blocking service layer for the asyncio wrappers.
+
+    Each worker is a single thread with its own queue, so at most 'size' blocking calls run at the same time. Other
+    calls wait in the queue of a worker, which costs a future instead of a thread. By default, there is one pool per
+    protocol, with one worker per session in the session pool of the protocol. More workers would only wait for a
+    session. Note that the services may still start threads of their own, e.g. for concurrent paging.
+
+    Blocking generators, e.g. QuerySet iteration, are pinned to a single worker for their entire life. Thread-local
+    state, like the tracing context, is thus never split across threads. Generators pinned to the same worker take
+    turns, one batch at a time.
+    """
+
+    _pools = WeakKeyDictionary()
+    _pools_lock = Lock()
+
+    def __init__(self, size):
+        if size < 1:
+            raise ValueError(f"'size' {size} must be a positive number")
+        self.size = size
+        self._workers = [None] * size
+        self._pending = [0] * size  # The number of calls queued on each worker
+        self._pinned = [0] * size  # The number of generators pinned to each worker
+        self._lock = Lock()
+
+    @classmethod
+    def for_protocol(cls, protocol):
+        """Return the pool shared by all wrappers of objects that use 'protocol'."""
+        with cls._pools_lock:
+            pool = cls._pools.get(protocol)
+            if pool is None:
+                pool = cls(size=protocol.session_pool_maxsize)
+                cls._pools[protocol] = pool
+            return pool
+
+    def _least_busy(self):
+        return min(range(self.size), key=lambda i: self._pending[i] + self._pinned[i])
+
+    def pick(self):
+        """Return the index of the least busy worker."""
+        with self._lock:
+            return self._least_busy()
+
+    def pin(self):
+        """Reserve the least busy worker for a generator. Call unpin() with the returned index when done."""
+        with self._lock:
+            index = self._least_busy()
+            self._pinned[index] += 1
+            return index
+
+    def unpin(self, index):
+        with self._lock:
+            self._pinned[index] -= 1
+
+    def _executor(self, index):
+        with self._lock:
+            if self._workers[index] is None:
+                self._workers[index] = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"ews-aio-{index}")
+            self._pending[index] += 1
+            return self._workers[index]
+
+    def _done(self, index):
+        with self._lock:
+            self._pending[index] -= 1
+
+    async def run(self, func, worker=None):
+        """Call 'func' on the given worker, or on the least busy one, and return the result."""
+        index = self.pick() if worker is None else worker
+        executor = self._executor(index)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, func)
+        finally:
+            self._done(index)
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            workers, self._workers = self._workers, [None] * self.size
+        for executor in workers:
+            if executor is not None:
+                executor.shutdown(wait=wait)
+
+
+class AsyncBase:
+    """Base class for the asyncio wrappers. The blocking service layer runs in a WorkerPool, so the event loop is never
+    blocked by HTTP requests or by sleeping while the server asks us to back off. Payloads are built and responses are
+    parsed by the exact same code as in the blocking API.
+
+    'workers' defaults to the WorkerPool of the protocol of the wrapped object. At most one blocking call per worker
+    runs at a time, and the rest are queued. To run more calls at the same time, raise the max_connections of the
+    Configuration.
+    """
+
+    # The number of elements to fetch from a blocking generator per trip to a worker
+    BATCH_SIZE = 100
+
+    def __init__(self, wrapped, workers=None):
+        self._wrapped = wrapped
+        if workers is None:
+            protocol = _protocol_of(wrapped)
+            workers = WorkerPool.for_protocol(protocol) if protocol else WorkerPool(size=1)
+        self.workers = workers
+
+    def __getattr__(self, name):
+        return getattr(self._wrapped, name)
+
+    async def _call(self, func, *args, **kwargs):
+        """Call 'func' in a worker and return the result. Generators are consumed in the worker, too."""
+
+        def _consume():
+            res = func(*args, **kwargs)
+            # Folder collections are lazy and may need to fetch the folder hierarchy, too
+            return list(res) if isgenerator(res) or isinstance(res, FolderCollection) else res
+
+        return await self.workers.run(_consume)
+
+    async def _iterate(self, iterable, batch_size=None, dedicated=False):
+        """Consume a blocking iterable in a worker and yield its elements. Elements are fetched in batches to limit
+        the number of trips to the worker. All batches run on the same worker.
+
+        Use a batch size of 1 for iterables that block until the next element arrives, e.g. notifications. Those
+        should also be 'dedicated', to run on their own thread instead of blocking a worker that others are queued on.
+        """
+        iterator = iter(iterable)
+        batch_size = batch_size or self.BATCH_SIZE
+        workers = WorkerPool(size=1) if dedicated else self.workers
+        worker = workers.pin()
+        try:
+            while True:
+                batch = await workers.run(lambda: list(islice(iterator, batch_size)), worker=worker)
+                if not batch:
+                    return
+                for elem in batch:
+                    yield elem
+        finally:
+            workers.unpin(worker)
+            if dedicated:
+                workers.shutdown(wait=False)
+
+    def _wrap(self, res):
+        if isinstance(res, QuerySet):
+            return AsyncQuerySet(res, workers=self.workers)
+        if isinstance(res, BaseFolder):
+            return AsyncFolder(res, workers=self.workers)
+        if isinstance(res, list):
+            return [self._wrap(r) for r in res]
+        return res
+
+    async def _resolve(self, func, *args, **kwargs):
+        """Call 'func' in a worker and wrap the result."""
+        return self._wrap(await self._call(func, *args, **kwargs))
+
+
+class AsyncQuerySet(AsyncBase):
+    """Asyncio wrapper around a QuerySet. Supports 'async for' and the QuerySet methods that send requests. Methods
+    that return a new QuerySet return a new AsyncQuerySet.
+
+      async for item in AsyncQuerySet(account.calendar.view(start=start, end=end)):
+          ...
+    """
+
+    CHAINABLE = (
+        "all",
+        "none",
+        "filter",
+        "exclude",
+        "people",
+        "only",
+        "find_only",
+        "order_by",
+        "reverse",
+        "values",
+        "values_list",
+        "depth",
+    )
+
+    def __init__(self, queryset, workers=None):
+        if not isinstance(queryset, QuerySet):
+            raise ValueError(f"{queryset!r} must be a QuerySet")
+        super().__init__(wrapped=queryset, workers=workers)
+
+    @property
+    def queryset(self):
+        return self._wrapped
+
+    def __getattr__(self, name):
+        attr = getattr(self._wrapped, name)
+        if name in self.CHAINABLE:
+            return lambda *args, **kwargs: self._wrap(attr(*args, **kwargs))
+        return attr
+
+    def __aiter__(self):
+        return self._iterate(self._wrapped, batch_size=self._wrapped.page_size)
+
+    get = _async_method("get", "QuerySet")
+    count = _async_method("count", "QuerySet")
+    exists = _async_method("exists", "QuerySet")
+    delete = _async_method("delete", "QuerySet")
+    send = _async_method("send", "QuerySet")
+    copy = _async_method("copy", "QuerySet")
+    move = _async_method("move", "QuerySet")
+    archive = _async_method("archive", "QuerySet")
+    mark_as_junk = _async_method("mark_as_junk", "QuerySet")
+
+
+class AsyncFolder(AsyncBase):
+    """Asyncio wrapper around a folder. Query methods return AsyncQuerySet instances. Notifications and sync changes
+    are available as async generators.
+
+    Attributes that need the folder hierarchy of the account, which may require a FindFolder request, are awaitables
+    that return AsyncFolder instances where applicable:
+
+      parent = await folder.parent
+      for child in await folder.children:
+          ...
+    """
+
+    QUERYSET_METHODS = ("all", "none", "filter", "exclude", "people", "view")
+    HIERARCHY_ATTRIBUTES = ("children", "parent", "parts", "absolute")
+    HIERARCHY_METHODS = ("walk", "glob", "tree")
+
+    def __init__(self, folder, workers=None):
+        super().__init__(wrapped=folder, workers=workers)
+
+    @property
+    def folder(self):
+        return self._wrapped
+
+    def __getattr__(self, name):
+        if name in self.HIERARCHY_ATTRIBUTES:
+            return self._resolve(getattr, self._wrapped, name)
+        attr = getattr(self._wrapped, name)
+        if name in self.QUERYSET_METHODS:
+            return lambda *args, **kwargs: self._wrap(attr(*args, **kwargs))
+        if name in self.HIERARCHY_METHODS:
+            return lambda *args, **kwargs: self._resolve(attr, *args, **kwargs)
+        return attr
+
+    async def get(self, *args, **kwargs):
+        return await self._call(self._wrapped.get, *args, **kwargs)
+
+    async def bulk_create(self, items, *args, **kwargs):
+        return await self._call(self._wrapped.bulk_create, items, *args, **kwargs)
+
+    subscribe_to_pull = _async_method("subscribe_to_pull", "Folder")
+    subscribe_to_push = _async_method("subscribe_to_push", "Folder")
+    subscribe_to_streaming = _async_method("subscribe_to_streaming", "Folder")
+    unsubscribe = _async_method("unsubscribe", "Folder")
+
+    def sync_items(self, *args, **kwargs):
+        """Async generator version of Folder.sync_items()."""
+        return self._iterate(self._wrapped.sync_items(*args, **kwargs))
+
+    def sync_hierarchy(self, *args, **kwargs):
+        """Async generator version of Folder.sync_hierarchy()."""
+        return self._iterate(self._wrapped.sync_hierarchy(*args, **kwargs))
+
+    def get_events(self, subscription_id, watermark):
+        """Async generator version of Folder.get_events()."""
+        return self._iterate(
+            self._wrapped.get_events(subscription_id=subscription_id, watermark=watermark), 1, dedicated=True
+        )
+
+    def get_streaming_events(self, subscription_id_or_ids, connection_timeout=1, max_notifications_returned=None):
+        """Async generator version of Folder.get_streaming_events(). Each notification is yielded as soon as it
+        arrives. The connection is held open on a thread of its own.
+        """
+        return self._iterate(
+            self._wrapped.get_streaming_events(
+                subscription_id_or_ids=subscription_id_or_ids,
+                connection_timeout=connection_timeout,
+                max_notifications_returned=max_notifications_returned,
+            ),
+            1,
+            dedicated=True,
+        )
+
+
+class AsyncAccount(AsyncBase):
+    """Asyncio wrapper around an Account. The bulk methods and fetch() are coroutines that return lists. Folder
+    attributes are awaitables that return an AsyncFolder:
+
+      account = AsyncAccount(Account(...))
+      items = await account.fetch(ids)
+      calendar = await account.calendar
+      async for item in calendar.view(start=start, end=end):
+          ...
+
+    Distinguished folders like 'account.calendar' may need a blocking GetFolder request the first time they are
+    accessed. That lookup runs in a worker, like any other request.
+    """
+
+    def __init__(self, account, workers=None):
+        super().__init__(wrapped=account, workers=workers)
+
+    @property
+    def account(self):
+        return self._wrapped
+
+    def __getattr__(self, name):
+        if isinstance(getattr(type(self._wrapped), name, None), threaded_cached_property):
+            # Folder attributes are resolved lazily, which may send a request
+            return self.folder(name)
+        return self._wrap(getattr(self._wrapped, name))
+
+    async def folder(self, name):
+        """Return the folder attribute 'name' of the account, e.g. 'calendar', as an AsyncFolder."""
+        if name in self._wrapped.__dict__:
+            # Already resolved. No need for a trip to a worker
+            return self._wrap(self._wrapped.__dict__[name])
+        return await self._resolve(getattr, self._wrapped, name)
+
+    export = _async_method("export", "Account")
+    upload = _async_method("upload", "Account")
+    bulk_create = _async_method("bulk_create", "Account")
+    bulk_update = _async_method("bulk_update", "Account")
+    bulk_delete = _async_method("bulk_delete", "Account")
+    bulk_send = _async_method("bulk_send", "Account")
+    bulk_copy = _async_method("bulk_copy", "Account")
+    bulk_move = _async_method("bulk_move", "Account")
+    bulk_archive = _async_method("bulk_archive", "Account")
+    bulk_mark_as_junk = _async_method("bulk_mark_as_junk", "Account")
+    fetch = _async_method("fetch", "Account")
+    fetch_personas = _async_method("fetch_personas", "Account")
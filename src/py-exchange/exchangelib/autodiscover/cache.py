@@ -2,9 +2,12 @@ import getpass
 import glob
 import logging
 import os
+import pickle  # nosec
 import shelve
+import sqlite3
 import sys
 import tempfile
+import time
 from contextlib import contextmanager, suppress
 from threading import RLock
 
@@ -14,10 +17,10 @@ from .protocol import AutodiscoverProtocol
 log = logging.getLogger(__name__)
 
 
-def shelve_filename():
+def shelve_filename(name="cache", version=2):
     # Add the version of the cache format to the filename. If we change the format of the cached data, this version
     # must be bumped. Otherwise, new versions of this package cannot open cache files generated by older versions.
-    version = 2
+    # Other persistent caches use their own 'name' and format 'version'.
     # 'shelve' may pickle objects using different pickle protocol versions. Append the python major+minor version
     # numbers to the filename. Also append the username, to avoid permission errors.
     major, minor = sys.version_info[:2]
@@ -26,10 +29,12 @@ def shelve_filename():
     except KeyError:
         # getuser() fails on some systems. Provide a sane default. See issue #448
         user = "exchangelib"
-    return f"exchangelib.{version}.cache.{user}.py{major}{minor}"
+    return f"exchangelib.{version}.{name}.{user}.py{major}{minor}"
 
 
-AUTODISCOVER_PERSISTENT_STORAGE = os.path.join(tempfile.gettempdir(), shelve_filename())
+AUTODISCOVER_PERSISTENT_STORAGE = os.path.join(
+    tempfile.gettempdir(), shelve_filename(name="autodiscover", version=3) + ".sqlite3"
+)
 
 
 @contextmanager
@@ -51,6 +56,45 @@ def shelve_open_with_failover(filename):
     yield shelve_handle
 
 
+@contextmanager
+def sqlite_open_with_failover(filename, schema, timeout):
+    """Yield a connection to the SQLite database 'filename', inside a transaction. The database is in WAL mode, which
+    allows many concurrent readers and serializes writers across processes. 'schema' is executed on every connect, so
+    it must be idempotent, e.g. 'CREATE TABLE IF NOT EXISTS ...'. Wait at most 'timeout' seconds for other writers.
+
+    Persistent caches that are shared between processes should use this instead of shelve_open_with_failover(). A
+    corrupt file is deleted and the database is created again. A database that is busy or locked by another process is
+    never deleted. The error is raised instead.
+    """
+
+    def _connect():
+        conn = sqlite3.connect(filename, timeout=timeout)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(schema)
+        except sqlite3.DatabaseError:
+            conn.close()
+            raise
+        return conn
+
+    try:
+        conn = _connect()
+    except sqlite3.OperationalError:
+        # E.g. 'database is locked'. The file is fine, and other processes are using it.
+        raise
+    except sqlite3.DatabaseError as e:
+        for f in glob.glob(filename + "*"):
+            log.warning("Deleting invalid cache file %s (%r)", f, e)
+            with suppress(FileNotFoundError):
+                os.unlink(f)
+        conn = _connect()
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
 class AutodiscoverCache:
     """Stores the translation from (email domain, credentials) -> AutodiscoverProtocol object so we can re-use TCP
     connections to an autodiscover server within the same process. Also persists the email domain -> (autodiscover
@@ -63,40 +107,96 @@ class AutodiscoverCache:
     unprivileged users. Domain, endpoint and auth_type are OK to cache since this info is make publicly available on
     HTTP and DNS servers via the autodiscover protocol. Just don't persist any credentials info.
 
-    If an autodiscover lookup fails for any reason, the corresponding cache entry must be purged.
+    If an autodiscover lookup fails for any reason, the corresponding cache entry must be purged. A domain where the
+    full autodiscover process failed is remembered for NEGATIVE_TTL seconds, so we don't repeat the slow process for
+    every account in that domain.
 
-    'shelve' is supposedly thread-safe and process-safe, which suits our needs.
+    The persistent storage is an SQLite database in WAL mode, which allows many concurrent readers and serializes
+    writers across processes. Entries are read through an in-process copy, so the database is only accessed on cache
+    misses, expired entries and updates.
     """
 
+    # Entries expire after this number of seconds. Expired entries are looked up again with the autodiscover protocol
+    TTL = 24 * 3600
+    # Failed domains are remembered for this number of seconds
+    NEGATIVE_TTL = 300
+    # Seconds to wait for another process holding a write lock on the database
+    DB_TIMEOUT = 10
+
     def __init__(self):
         self._protocols = {}  # Mapping from (domain, credentials) to AutodiscoverProtocol
+        self._entries = {}  # In-process copy of the persistent storage, mapping domain to a DB row
         self._lock = RLock()
 
     @property
     def _storage_file(self):
         return AUTODISCOVER_PERSISTENT_STORAGE
 
+    def _db(self):
+        # Yield a connection to the persistent storage, inside a transaction.
+        # Don't change this schema without bumping the cache file version in AUTODISCOVER_PERSISTENT_STORAGE
+        return sqlite_open_with_failover(
+            self._storage_file,
+            schema="CREATE TABLE IF NOT EXISTS autodiscover (domain TEXT PRIMARY KEY, endpoint TEXT, auth_type TEXT, "
+            "retry_policy BLOB, expires REAL NOT NULL)",
+            timeout=self.DB_TIMEOUT,
+        )
+
+    def _get_entry(self, domain):
+        # Return the (endpoint, auth_type, retry_policy, expires) row for 'domain', or None if there is no unexpired
+        # entry. 'endpoint' is None for failed domains.
+        domain = str(domain)
+        entry = self._entries.get(domain)
+        if entry is None or entry[3] < time.time():
+            with self._db() as db:
+                row = db.execute(
+                    "SELECT endpoint, auth_type, retry_policy, expires FROM autodiscover WHERE domain = ?", (domain,)
+                ).fetchone()
+            if row is None or row[3] < time.time():
+                self._entries.pop(domain, None)
+                return None
+            endpoint, auth_type, retry_policy, expires = row
+            try:
+                retry_policy = pickle.loads(retry_policy) if retry_policy else None  # nosec
+            except Exception as e:
+                log.warning("Ignoring invalid cache entry for domain %s (%r)", domain, e)
+                return None
+            entry = self._entries[domain] = endpoint, auth_type, retry_policy, expires
+        return entry
+
+    def _set_entry(self, domain, endpoint, auth_type, retry_policy, ttl):
+        domain = str(domain)
+        expires = time.time() + ttl
+        with self._db() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO autodiscover VALUES (?, ?, ?, ?, ?)",
+                (domain, endpoint, auth_type, pickle.dumps(retry_policy) if retry_policy else None, expires),
+            )
+        self._entries[domain] = endpoint, auth_type, retry_policy, expires
+
     def clear(self):
         # Wipe the entire cache
-        with shelve_open_with_failover(self._storage_file) as db:
-            db.clear()
+        with self._db() as db:
+            db.execute("DELETE FROM autodiscover")
+        self._entries.clear()
         self._protocols.clear()
 
     def __len__(self):
         return len(self._protocols)
 
     def __contains__(self, key):
-        domain = key[0]
-        with shelve_open_with_failover(self._storage_file) as db:
-            return str(domain) in db
+        entry = self._get_entry(key[0])
+        return entry is not None and entry[0] is not None
 
     def __getitem__(self, key):
         protocol = self._protocols.get(key)
         if protocol:
             return protocol
         domain, credentials = key
-        with shelve_open_with_failover(self._storage_file) as db:
-            endpoint, auth_type, retry_policy = db[str(domain)]  # It's OK to fail with KeyError here
+        entry = self._get_entry(domain)
+        if entry is None or entry[0] is None:
+            raise KeyError(key)
+        endpoint, auth_type, retry_policy, _ = entry
         protocol = AutodiscoverProtocol(
             config=Configuration(
                 service_endpoint=endpoint, credentials=credentials, auth_type=auth_type, retry_policy=retry_policy
@@ -107,19 +207,34 @@ class AutodiscoverCache:
 
     def __setitem__(self, key, protocol):
         # Populate both local and persistent cache
-        domain = key[0]
-        with shelve_open_with_failover(self._storage_file) as db:
-            # Don't change this payload without bumping the cache file version in shelve_filename()
-            db[str(domain)] = (protocol.service_endpoint, protocol.auth_type, protocol.retry_policy)
+        self._set_entry(
+            domain=key[0],
+            endpoint=protocol.service_endpoint,
+            auth_type=protocol.auth_type,
+            retry_policy=protocol.retry_policy,
+            ttl=self.TTL,
+        )
         self._protocols[key] = protocol
 
     def __delitem__(self, key):
         # Empty both local and persistent cache. Don't fail on non-existing entries because we could end here
         # multiple times due to race conditions.
-        domain = key[0]
-        with shelve_open_with_failover(self._storage_file) as db:
-            with suppress(KeyError):
-                del db[str(domain)]
+        domain = str(key[0])
+        with self._db() as db:
+            db.execute("DELETE FROM autodiscover WHERE domain = ?", (domain,))
+        self._entries.pop(domain, None)
+        with suppress(KeyError):
+            del self._protocols[key]
+
+    def has_failed(self, key):
+        """Return True if the autodiscover process recently failed for the domain in 'key'."""
+        entry = self._get_entry(key[0])
+        return entry is not None and entry[0] is None
+
+    def set_failed(self, key):
+        """Remember that the autodiscover process failed for the domain in 'key'."""
+        log.debug("Caching autodiscover failure for domain %s", key[0])
+        self._set_entry(domain=key[0], endpoint=None, auth_type=None, retry_policy=None, ttl=self.NEGATIVE_TTL)
         with suppress(KeyError):
             del self._protocols[key]
 
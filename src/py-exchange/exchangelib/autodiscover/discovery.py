@@ -124,11 +124,13 @@ class Autodiscovery:
                     # Autodiscover no longer works with this domain. Clear cache and try again after releasing the lock
                     log.debug("AD request failure. Removing cache for key %s", cache_key)
                     del autodiscover_cache[cache_key]
-                    ad_response = self._step_1(hostname=domain)
+                    ad_response = self._step_1_or_cache_failure(hostname=domain)
+            elif autodiscover_cache.has_failed(cache_key):
+                raise AutoDiscoverFailed(f"Autodiscover recently failed for domain {domain!r}")
             else:
                 # This will cache the result
                 log.debug("Cache miss for key %s", cache_key)
-                ad_response = self._step_1(hostname=domain)
+                ad_response = self._step_1_or_cache_failure(hostname=domain)
 
         log.debug("Released autodiscover_cache_lock")
         if ad_response.redirect_address:
@@ -307,6 +309,7 @@ class Autodiscovery:
                 url=protocol.service_endpoint,
                 headers=headers,
                 data=data,
+                service_name="Autodiscover",
             )
             protocol.release_session(session)
         except UnauthorizedError as e:
@@ -401,6 +404,14 @@ class Autodiscovery:
                 log.debug("Incompatible SRV record for %s (%s)", hostname, rdata.to_text())
         return records
 
+    def _step_1_or_cache_failure(self, hostname):
+        # Run the full autodiscover process, and remember the domain if the process fails
+        try:
+            return self._step_1(hostname=hostname)
+        except AutoDiscoverFailed:
+            autodiscover_cache.set_failed(self._cache_key)
+            raise
+
     def _step_1(self, hostname):
         """Perform step 1, where the client sends an Autodiscover request to
         https://example.com/autodiscover/autodiscover.xml and then does one of the following:
@@ -45,6 +45,11 @@ class Configuration:
 
     'max_connections' defines the max number of connections allowed for this server. This may be restricted by
     policies on the Exchange server.
+
+    With 'adaptive_connections', the number of connections starts at 'min_connections' and is adjusted between that
+    and 'max_connections' according to response times and throttling by the server:
+
+        config = Configuration(max_connections=16, min_connections=2, adaptive_connections=True, ...)
     """
 
     def __init__(
@@ -56,6 +61,8 @@ class Configuration:
         version=None,
         retry_policy=None,
         max_connections=None,
+        min_connections=None,
+        adaptive_connections=False,
     ):
         if not isinstance(credentials, (BaseCredentials, type(None))):
             raise InvalidTypeError("credentials", credentials, BaseCredentials)
@@ -76,6 +83,10 @@ class Configuration:
             raise InvalidTypeError("retry_policy", retry_policy, RetryPolicy)
         if not isinstance(max_connections, (int, type(None))):
             raise InvalidTypeError("max_connections", max_connections, int)
+        if not isinstance(min_connections, (int, type(None))):
+            raise InvalidTypeError("min_connections", min_connections, int)
+        if min_connections is not None and max_connections is not None and min_connections > max_connections:
+            raise ValueError(f"'min_connections' {min_connections} must not exceed 'max_connections' {max_connections}")
         self._credentials = credentials
         if server:
             self.service_endpoint = f"https://{server}/EWS/Exchange.asmx"
@@ -85,6 +96,8 @@ class Configuration:
         self.version = version
         self.retry_policy = retry_policy
         self.max_connections = max_connections
+        self.min_connections = min_connections
+        self.adaptive_connections = adaptive_connections
 
     @property
     def credentials(self):
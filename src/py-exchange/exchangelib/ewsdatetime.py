@@ -1,5 +1,6 @@
 import datetime
 import logging
+from contextlib import suppress
 
 try:
     import zoneinfo
@@ -58,6 +59,13 @@ class EWSDate(datetime.date):
 
     @classmethod
     def from_string(cls, date_string):
+        if (len(date_string) == 10 or (len(date_string) == 11 and date_string[10] == "Z")) and _has_date_layout(
+            date_string
+        ):
+            # Fast path for the common formats, e.g. '2009-01-15' and '2009-01-15Z'. strptime() below is more lenient.
+            with suppress(ValueError):
+                d = datetime.date.fromisoformat(date_string[:10])
+                return cls(d.year, d.month, d.day)
         # Sometimes, we'll receive a date string with timezone information. Not very useful.
         if date_string.endswith("Z"):
             date_fmt = "%Y-%m-%dZ"
@@ -74,6 +82,23 @@ class EWSDate(datetime.date):
         return cls.from_date(d)  # We want to return EWSDate objects
 
 
+# Creates datetime instances without the checks in EWSDateTime.__new__()
+_new_datetime = datetime.datetime.__new__
+
+
+def _has_date_layout(date_string):
+    # True if the string starts with 'YYYY-MM-DD'. On Python 3.11+, fromisoformat() also accepts other ISO 8601 forms,
+    # e.g. week dates and the basic format without separators, which the strptime() formats in from_string() reject.
+    return date_string[4] == "-" and date_string[7] == "-"
+
+
+def _has_datetime_layout(date_string):
+    # True if the string starts with 'YYYY-MM-DDTHH:MM:SS'. See _has_date_layout()
+    return (
+        _has_date_layout(date_string) and date_string[10] == "T" and date_string[13] == ":" and date_string[16] == ":"
+    )
+
+
 class EWSDateTime(datetime.datetime):
     """Extends the normal datetime implementation to satisfy EWS."""
 
@@ -157,6 +182,24 @@ class EWSDateTime(datetime.datetime):
     @classmethod
     def from_string(cls, date_string):
         # Parses several common datetime formats and returns timezone-aware EWSDateTime objects
+        if len(date_string) == 20 and date_string[19] == "Z" and _has_datetime_layout(date_string):
+            # Fast path for the format EWS uses for almost all values, e.g. '2009-01-15T13:45:56Z'. fromisoformat() is
+            # much faster than strptime(), and UTC needs none of the tzinfo checks in __new__(). strptime() below is
+            # more lenient.
+            with suppress(ValueError):
+                d = datetime.datetime.fromisoformat(date_string[:19])
+                return _new_datetime(cls, d.year, d.month, d.day, d.hour, d.minute, d.second, 0, UTC)
+        if (
+            len(date_string) == 25
+            and date_string[19] in "+-"
+            and date_string[22] == ":"
+            and _has_datetime_layout(date_string)
+        ):
+            # Fast path for values with a UTC offset, e.g. '2009-01-15T13:45:56+01:00'. Convert to UTC.
+            with suppress(ValueError):
+                d = datetime.datetime.fromisoformat(date_string)
+                d = d.replace(tzinfo=None) - d.utcoffset()
+                return _new_datetime(cls, d.year, d.month, d.day, d.hour, d.minute, d.second, 0, UTC)
         if date_string.endswith("Z"):
             # UTC datetime
             return super().strptime(date_string, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=UTC)
@@ -213,7 +256,18 @@ class EWSTimeZone(zoneinfo.ZoneInfo):
     IANA_TO_MS_MAP = IANA_TO_MS_TIMEZONE_MAP
     MS_TO_IANA_MAP = MS_TIMEZONE_TO_IANA_MAP
 
+    # Process-wide caches of instances. Timezones are parsed for every item, and creating an instance from scratch
+    # involves reading the timezone file. See clear_cache().
+    _key_cache = {}  # Maps (class, IANA key) to instance
+    _ms_id_cache = {}  # Maps (class, MS timezone ID) to instance
+    _localzone_cache = {}  # Maps class to instance
+
     def __new__(cls, *args, **kwargs):
+        if len(args) == 1 and not kwargs:
+            try:
+                return cls._key_cache[cls, args[0]]
+            except (KeyError, TypeError):
+                pass
         try:
             instance = super().__new__(cls, *args, **kwargs)
         except zoneinfo.ZoneInfoNotFoundError as e:
@@ -227,8 +281,24 @@ class EWSTimeZone(zoneinfo.ZoneInfo):
         # EWS happily accepts empty strings. For a full list of timezones supported by the target server, including
         # long-format names, see output of services.GetServerTimeZones(account.protocol).call()
         instance.ms_name = ""
+        if len(args) == 1 and not kwargs:
+            cls._key_cache[cls, args[0]] = instance
         return instance
 
+    @classmethod
+    def clear_cache(cls, *, only_keys=None):
+        """Clear the instance caches of this class, and the cache of ZoneInfo. Call this if the timezone files or the
+        local timezone of the host changed.
+        """
+        super().clear_cache(only_keys=only_keys)
+        for k in list(cls._key_cache):
+            if only_keys is None or k[1] in only_keys:
+                cls._key_cache.pop(k, None)
+        for k, v in list(cls._ms_id_cache.items()):
+            if only_keys is None or v.key in only_keys:
+                cls._ms_id_cache.pop(k, None)
+        cls._localzone_cache.clear()
+
     def __eq__(self, other):
         # Microsoft timezones are less granular than IANA, so an EWSTimeZone created from 'Europe/Copenhagen' may return
         # from the server as 'Europe/Copenhagen'. We're catering for Microsoft here, so base equality on the Microsoft
@@ -242,13 +312,19 @@ class EWSTimeZone(zoneinfo.ZoneInfo):
         # Create a timezone instance from a Microsoft timezone ID. This is lossy because there is not a 1:1 translation
         # from MS timezone ID to IANA timezone.
         try:
-            return cls(cls.MS_TO_IANA_MAP[ms_id])
+            return cls._ms_id_cache[cls, ms_id]
+        except KeyError:
+            pass
+        try:
+            instance = cls(cls.MS_TO_IANA_MAP[ms_id])
         except KeyError:
-            if "/" in ms_id:
-                # EWS sometimes returns an ID that has a region/location format, e.g. 'Europe/Copenhagen'. Try the
-                # string unaltered.
-                return cls(ms_id)
-            raise UnknownTimeZone(f"Windows timezone ID {ms_id!r} is unknown by CLDR")
+            if "/" not in ms_id:
+                raise UnknownTimeZone(f"Windows timezone ID {ms_id!r} is unknown by CLDR")
+            # EWS sometimes returns an ID that has a region/location format, e.g. 'Europe/Copenhagen'. Try the string
+            # unaltered.
+            instance = cls(ms_id)
+        cls._ms_id_cache[cls, ms_id] = instance
+        return instance
 
     @classmethod
     def from_pytz(cls, tz):
@@ -276,6 +352,8 @@ class EWSTimeZone(zoneinfo.ZoneInfo):
     def from_timezone(cls, tz):
         # Support multiple tzinfo implementations. We could use isinstance(), but then we'd have to have pytz
         # and dateutil as dependencies for this package.
+        if tz.__class__ is cls:
+            return tz
         tz_module = tz.__class__.__module__.split(".")[0]
         try:
             return {
@@ -292,13 +370,19 @@ class EWSTimeZone(zoneinfo.ZoneInfo):
 
     @classmethod
     def localzone(cls):
+        # The local timezone is looked up once per process. Use clear_cache() if the timezone of the host changed.
+        try:
+            return cls._localzone_cache[cls]
+        except KeyError:
+            pass
         try:
             tz = tzlocal.get_localzone()
         except zoneinfo.ZoneInfoNotFoundError:
             # Older versions of tzlocal will raise a pytz exception. Let's not depend on pytz just for that.
             raise UnknownTimeZone("Failed to guess local timezone")
         # Handle both old and new versions of tzlocal that may return pytz or zoneinfo objects, respectively
-        return cls.from_timezone(tz)
+        instance = cls._localzone_cache[cls] = cls.from_timezone(tz)
+        return instance
 
     def fromutc(self, dt):
         t = super().fromutc(dt)
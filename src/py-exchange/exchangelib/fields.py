@@ -294,6 +294,7 @@ class Field(metaclass=abc.ABCMeta):
         default=None,
         supported_from=None,
         deprecated_from=None,
+        is_complex=None,
     ):
         self.name = name  # Usually set by the EWSMeta metaclass
         self.default = default  # Default value if none is given
@@ -319,6 +320,10 @@ class Field(metaclass=abc.ABCMeta):
         if deprecated_from is not None and not isinstance(deprecated_from, Build):
             raise InvalidTypeError("deprecated_from", deprecated_from, Build)
         self.deprecated_from = deprecated_from
+        # Some fields have a complex type but are still returned in full by FindItem. Allow overriding the class
+        # default per field.
+        if is_complex is not None:
+            self.is_complex = is_complex
 
     def clean(self, value, version=None):
         if version and not self.supports_version(version):
@@ -348,6 +353,17 @@ class Field(metaclass=abc.ABCMeta):
     def from_xml(self, elem, account):
         """Read a value from the given element"""
 
+    def dispatch_tag(self):
+        """Return the tag of the only child element that from_xml() looks at, or None if from_xml() needs the whole
+        element. When the child is missing, from_xml() must return the default value. This lets EWSElement.from_xml()
+        parse all fields in one pass over the child elements.
+        """
+        return None
+
+    def from_child_xml(self, child, elem, account):
+        """Read a value from the child element matching dispatch_tag(), found by the caller"""
+        return self.from_xml(elem=elem, account=account)
+
     @abc.abstractmethod
     def to_xml(self, value, version):
         """Convert this field to an XML element"""
@@ -400,7 +416,9 @@ class FieldURIField(Field):
         return get_xml_attr(elem, self.response_tag())
 
     def from_xml(self, elem, account):
-        val = self._get_val_from_elem(elem)
+        return self._val_to_value(self._get_val_from_elem(elem))
+
+    def _val_to_value(self, val):
         if val is not None:
             try:
                 return xml_text_to_value(val, self.value_cls)
@@ -409,6 +427,21 @@ class FieldURIField(Field):
                 return None
         return self.default
 
+    def dispatch_tag(self):
+        if self.is_attribute:
+            return None
+        try:
+            return self.response_tag()
+        except ValueError:
+            # No 'field_uri'. Let from_xml() look for the value
+            return None
+
+    def from_child_xml(self, child, elem, account):
+        if type(self).from_xml is not FieldURIField.from_xml:
+            # Subclasses may need more than the text of the child element
+            return super().from_child_xml(child=child, elem=elem, account=account)
+        return self._val_to_value(child.text or None)
+
     def to_xml(self, value, version):
         field_elem = create_element(self.request_tag())
         return set_xml_value(field_elem, value, version=version)
@@ -575,6 +608,10 @@ class AppointmentStateField(IntegerField):
         CANCELLED: 0x0004,
     }
 
+    def dispatch_tag(self):
+        # from_xml() does not return the default value when the element is missing
+        return None
+
     def from_xml(self, elem, account):
         val = super().from_xml(elem=elem, account=account)
         if val is None:
@@ -626,6 +663,10 @@ class DateTimeBackedDateField(DateField):
     def date_to_datetime(self, value):
         return self._datetime_field.value_cls.combine(value, self._default_time).replace(tzinfo=UTC)
 
+    def dispatch_tag(self):
+        # from_xml() does not return the default value when the element is missing
+        return None
+
     def from_xml(self, elem, account):
         val = self._get_val_from_elem(elem)
         if val is not None and len(val) == 25:
@@ -821,6 +862,10 @@ class MessageField(TextField):
 
     INNER_ELEMENT_NAME = "Message"
 
+    def dispatch_tag(self):
+        # from_xml() does not return the default value when the element is missing
+        return None
+
     def from_xml(self, elem, account):
         reply = elem.find(self.response_tag())
         if reply is None:
@@ -1016,6 +1061,14 @@ class EWSElementField(FieldURIField):
             self._value_cls = getattr(import_module(self.__module__.split(".")[0]), self._value_cls)
         return self._value_cls
 
+    def dispatch_tag(self):
+        if not self.is_list and self.field_uri is None:
+            try:
+                return self.value_cls.response_tag()
+            except ValueError:
+                return None
+        return super().dispatch_tag()
+
     def from_xml(self, elem, account):
         if self.is_list:
             iter_elem = elem.find(self.response_tag())
@@ -1054,6 +1107,12 @@ class TransitionListField(EWSElementListField):
         kwargs["value_cls"] = BaseTransition
         super().__init__(*args, **kwargs)
 
+    def dispatch_tag(self):
+        if not self.field_uri:
+            # Values are read from all child elements
+            return None
+        return super().dispatch_tag()
+
     def from_xml(self, elem, account):
         iter_elem = elem.find(self.response_tag()) if self.field_uri else elem
         if iter_elem is not None:
@@ -1474,6 +1533,10 @@ class ItemField(FieldURIField):
 
         return Item
 
+    def dispatch_tag(self):
+        # The child element may have any of the item tags
+        return None
+
     def from_xml(self, elem, account):
         from .items import ITEM_CLASSES
 
@@ -1516,6 +1579,10 @@ class BuildField(CharField):
         super().__init__(*args, **kwargs)
         self.value_cls = Build
 
+    def dispatch_tag(self):
+        # from_xml() does not return the default value when the element is missing
+        return None
+
     def from_xml(self, elem, account):
         val = self._get_val_from_elem(elem)
         if val:
@@ -1534,6 +1601,10 @@ class ProtocolListField(EWSElementListField):
         kwargs["value_cls"] = Protocol
         super().__init__(*args, **kwargs)
 
+    def dispatch_tag(self):
+        # Values are read from multiple child elements
+        return None
+
     def from_xml(self, elem, account):
         return [self.value_cls.from_xml(elem=e, account=account) for e in elem.findall(self.value_cls.response_tag())]
 
@@ -1758,6 +1829,10 @@ class GenericEventListField(EWSElementField):
             FreeBusyChangedEvent,
         )
 
+    def dispatch_tag(self):
+        # Values are read from multiple child elements
+        return None
+
     def from_xml(self, elem, account):
         events = []
         for event in elem:
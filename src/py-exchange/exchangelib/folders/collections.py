@@ -9,7 +9,7 @@ from ..items import ID_ONLY, Persona
 from ..properties import CalendarView
 from ..queryset import Q, QuerySet, SearchableMixIn
 from ..restriction import Restriction
-from ..util import require_account
+from ..util import SingleFlight, require_account
 
 log = logging.getLogger(__name__)
 
@@ -27,6 +27,10 @@ class FolderCollection(SearchableMixIn):
 
     # These fields are required in a FindFolder or GetFolder call to properly identify folder types
     REQUIRED_FOLDER_FIELDS = ("name", "folder_class")
+    # If True, concurrent identical find_items() calls share a single FindItem request. Each caller receives the same
+    # item objects, so callers must not modify them. Items are returned when the last page has arrived.
+    COALESCE_FIND_ITEMS = False
+    _find_items_flights = SingleFlight()
 
     def __init__(self, account, folders):
         """Implement a search API on a collection of folders.
@@ -208,7 +212,7 @@ class FolderCollection(SearchableMixIn):
             additional_fields,
             restriction.q if restriction else None,
         )
-        yield from FindItem(account=self.account, page_size=page_size).call(
+        kwargs = dict(
             folders=self.folders,
             additional_fields=additional_fields,
             restriction=restriction,
@@ -220,6 +224,35 @@ class FolderCollection(SearchableMixIn):
             max_items=calendar_view.max_items if calendar_view else max_items,
             offset=offset,
         )
+        if not self.COALESCE_FIND_ITEMS:
+            yield from FindItem(account=self.account, page_size=page_size).call(**kwargs)
+            return
+        key = self._find_items_key(q=q, page_size=page_size, **kwargs)
+        yield from self._find_items_flights.do(
+            key, lambda: list(FindItem(account=self.account, page_size=page_size).call(**kwargs))
+        )
+
+    def _find_items_key(self, q, page_size, **kwargs):
+        # Identifies a FindItem request. Different credentials may have different access rights to the same folder, so
+        # the key includes the protocol, which is unique per service endpoint and credentials.
+        version = self.account.version
+        return (
+            self.account.protocol,
+            self.account.access_type,
+            self.account.primary_smtp_address,
+            version.build,
+            version.api_version,
+            tuple((f.DISTINGUISHED_FOLDER_ID, None) if f.is_distinguished else (None, f.id) for f in self.folders),
+            q,
+            frozenset(kwargs["additional_fields"] or ()),
+            tuple(kwargs["order_fields"] or ()),
+            kwargs["shape"],
+            kwargs["depth"],
+            kwargs["calendar_view"],
+            kwargs["max_items"],
+            kwargs["offset"],
+            page_size,
+        )
 
     def _get_single_folder(self):
         if len(self.folders) > 1:
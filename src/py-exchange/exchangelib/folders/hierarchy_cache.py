@@ -0,0 +1,145 @@
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+from threading import Lock, RLock
+
+log = logging.getLogger(__name__)
+
+
+class HierarchyCache:
+    """Persists the IDs of the distinguished folders of a mailbox to the filesystem, so short-lived processes don't
+    need a GetFolder request every time they access e.g. 'account.calendar'.
+
+    Each entry holds the folder class name, folder ID and changekey of the distinguished folders resolved so far in
+    one folder hierarchy, and the SyncFolderHierarchy sync state of that hierarchy. The roots use the sync state to
+    bring the entry up to date with a single, cheap SyncFolderHierarchy request when the entry is older than
+    SYNC_INTERVAL. Folder names and other folder content are not cached.
+
+    The persistent storage is an SQLite database in WAL mode, like the autodiscover cache, so many processes can use
+    it at the same time. Each entry is written in a single statement. If two processes sync the same hierarchy at the
+    same time, the last one wins, and both entries are valid. If the database stays locked by other processes for
+    more than DB_TIMEOUT seconds, the persistent storage is skipped.
+
+    This cache is opt-in. Set RootOfHierarchy.PERSISTENT_HIERARCHY_CACHE to True to enable it.
+    """
+
+    # Bump this if the format of the cached data changes
+    FORMAT_VERSION = 2
+    # Entries older than this number of seconds are synced with the server before they are used
+    SYNC_INTERVAL = 3600
+    # Seconds to wait for another process holding a write lock on the database
+    DB_TIMEOUT = 10
+
+    def __init__(self):
+        self._hierarchies = {}  # In-process copy of the persistent storage
+        self._lock = RLock()
+        self._key_locks = {}  # Serializes syncing of each hierarchy. See lock()
+
+    @property
+    def _storage_file(self):
+        from ..autodiscover.cache import shelve_filename
+
+        return os.path.join(
+            tempfile.gettempdir(), shelve_filename(name="hierarchies", version=self.FORMAT_VERSION) + ".sqlite3"
+        )
+
+    def _db(self):
+        from ..autodiscover.cache import sqlite_open_with_failover
+
+        # Don't change this schema without bumping FORMAT_VERSION. 'folders' is a JSON object mapping folder class
+        # names to [folder_id, changekey] lists.
+        return sqlite_open_with_failover(
+            self._storage_file,
+            schema="CREATE TABLE IF NOT EXISTS hierarchies (key TEXT PRIMARY KEY, sync_state TEXT, "
+            "synced_at REAL NOT NULL, folders TEXT NOT NULL)",
+            timeout=self.DB_TIMEOUT,
+        )
+
+    @staticmethod
+    def key(account, root_cls):
+        """Return the cache key of the folder hierarchy of type 'root_cls' in the mailbox of 'account'."""
+        return "|".join(
+            (str(account.protocol.service_endpoint), account.primary_smtp_address, root_cls.DISTINGUISHED_FOLDER_ID)
+        ).lower()
+
+    def lock(self, key):
+        """Return the lock that serializes syncing of the hierarchy 'key' within this process. Syncing one mailbox must
+        not hold back folder lookups in other mailboxes, so there is one lock per key instead of one lock for the whole
+        cache. Other processes are not held back. Their writes to the database are atomic.
+        """
+        with self._lock:
+            return self._key_locks.setdefault(key, Lock())
+
+    def clear(self):
+        # Wipe the entire cache
+        with self._lock:
+            with self._db() as db:
+                db.execute("DELETE FROM hierarchies")
+            self._hierarchies.clear()
+
+    def __len__(self):
+        return len(self._hierarchies)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def get(self, key):
+        """Return a (sync_state, synced_at, folders) tuple, or None if there is no entry for 'key'. 'folders' maps
+        folder class names to (folder_id, changekey) tuples. 'synced_at' is a timestamp as returned by time.time().
+        """
+        with self._lock:
+            entry = self._hierarchies.get(key)
+            if entry is None:
+                try:
+                    with self._db() as db:
+                        row = db.execute(
+                            "SELECT sync_state, synced_at, folders FROM hierarchies WHERE key = ?", (key,)
+                        ).fetchone()
+                except sqlite3.OperationalError as e:
+                    log.warning("Cannot read cached folder hierarchy %s (%r)", key, e)
+                    return None
+                if row is None:
+                    return None
+                try:
+                    sync_state, synced_at, folders = row
+                    entry = sync_state, float(synced_at), {k: (v[0], v[1]) for k, v in json.loads(folders).items()}
+                except (AttributeError, IndexError, TypeError, ValueError) as e:
+                    log.warning("Ignoring invalid cached folder hierarchy for %s (%r)", key, e)
+                    return None
+                self._hierarchies[key] = entry
+            sync_state, synced_at, folders = entry
+            return sync_state, synced_at, folders.copy()
+
+    def set(self, key, sync_state, folders, synced_at=None):
+        """Store the folders of a hierarchy. 'synced_at' defaults to now."""
+        entry = sync_state, time.time() if synced_at is None else synced_at, dict(folders)
+        with self._lock:
+            log.debug("Caching folder hierarchy %s: %s", key, entry[2])
+            try:
+                with self._db() as db:
+                    db.execute(
+                        "INSERT OR REPLACE INTO hierarchies VALUES (?, ?, ?, ?)",
+                        (key, entry[0], entry[1], json.dumps(entry[2])),
+                    )
+            except sqlite3.OperationalError as e:
+                log.warning("Cannot cache folder hierarchy %s (%r)", key, e)
+            self._hierarchies[key] = entry
+
+    def is_stale(self, synced_at):
+        return time.time() - synced_at > self.SYNC_INTERVAL
+
+    def __delitem__(self, key):
+        # Don't fail on non-existing entries
+        with self._lock:
+            with self._db() as db:
+                db.execute("DELETE FROM hierarchies WHERE key = ?", (key,))
+            self._hierarchies.pop(key, None)
+
+    def __str__(self):
+        return str(self._hierarchies)
+
+
+hierarchy_cache = HierarchyCache()
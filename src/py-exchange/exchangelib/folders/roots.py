@@ -2,12 +2,13 @@ import logging
 from contextlib import suppress
 from threading import Lock
 
-from ..errors import ErrorAccessDenied, ErrorFolderNotFound, ErrorInvalidOperation
+from ..errors import ErrorAccessDenied, ErrorFolderNotFound, ErrorInvalidOperation, ResponseMessageError
 from ..fields import EffectiveRightsField
 from ..properties import EWSMeta
 from ..version import EXCHANGE_2007_SP1, EXCHANGE_2010_SP1
 from .base import BaseFolder
 from .collections import FolderCollection
+from .hierarchy_cache import hierarchy_cache
 from .known_folders import (
     MISC_FOLDERS,
     NON_DELETABLE_FOLDERS,
@@ -28,6 +29,9 @@ class RootOfHierarchy(BaseFolder, metaclass=EWSMeta):
     # and https://docs.microsoft.com/en-us/exchange/client-developer/web-service-reference/distinguishedfolderid
     # 'RootOfHierarchy' subclasses must not be in this list.
     WELLKNOWN_FOLDERS = []
+    # If True, remember the IDs of distinguished folders between processes and keep them fresh with
+    # SyncFolderHierarchy. See HierarchyCache
+    PERSISTENT_HIERARCHY_CACHE = False
 
     _subfolders_lock = Lock()
 
@@ -38,13 +42,14 @@ class RootOfHierarchy(BaseFolder, metaclass=EWSMeta):
         field_uri="folder:EffectiveRights", is_read_only=True, supported_from=EXCHANGE_2007_SP1
     )
 
-    __slots__ = "_account", "_subfolders"
+    __slots__ = "_account", "_subfolders", "_cached_folders"
 
     # A special folder that acts as the top of a folder hierarchy. Finds and caches subfolders at arbitrary depth.
     def __init__(self, **kwargs):
         self._account = kwargs.pop("account", None)  # A pointer back to the account holding the folder hierarchy
         super().__init__(**kwargs)
         self._subfolders = None  # See self._folders_map()
+        self._cached_folders = None  # See self._load_hierarchy_cache()
 
     @property
     def account(self):
@@ -110,12 +115,20 @@ class RootOfHierarchy(BaseFolder, metaclass=EWSMeta):
         """
         if not cls.DISTINGUISHED_FOLDER_ID:
             raise ValueError(f"Class {cls} must have a DISTINGUISHED_FOLDER_ID value")
+        if cls.PERSISTENT_HIERARCHY_CACHE:
+            root = cls(account=account, name=cls.DISTINGUISHED_FOLDER_ID, is_distinguished=True)
+            cached = root._get_cached_folder(cls)
+            if cached is not None:
+                return cached
         try:
-            return cls.resolve(
+            root = cls.resolve(
                 account=account, folder=cls(account=account, name=cls.DISTINGUISHED_FOLDER_ID, is_distinguished=True)
             )
         except MISSING_FOLDER_ERRORS:
             raise ErrorFolderNotFound(f"Could not find distinguished folder {cls.DISTINGUISHED_FOLDER_ID}")
+        if cls.PERSISTENT_HIERARCHY_CACHE:
+            root._add_to_hierarchy_cache(root)
+        return root
 
     def get_default_folder(self, folder_cls):
         """Return the distinguished folder instance of type folder_cls belonging to this account. If no distinguished
@@ -131,9 +144,16 @@ class RootOfHierarchy(BaseFolder, metaclass=EWSMeta):
                 if f.__class__ == folder_cls and f.is_distinguished:
                     log.debug("Found cached distinguished %s folder", folder_cls)
                     return f
+        if self.PERSISTENT_HIERARCHY_CACHE:
+            f = self._get_cached_folder(folder_cls)
+            if f is not None:
+                return f
         try:
             log.debug("Requesting distinguished %s folder explicitly", folder_cls)
-            return folder_cls.get_distinguished(root=self)
+            f = folder_cls.get_distinguished(root=self)
+            if self.PERSISTENT_HIERARCHY_CACHE:
+                self._add_to_hierarchy_cache(f)
+            return f
         except ErrorAccessDenied:
             # Maybe we just don't have GetFolder access? Try FindItems instead
             log.debug("Testing default %s folder with FindItem", folder_cls)
@@ -145,6 +165,91 @@ class RootOfHierarchy(BaseFolder, metaclass=EWSMeta):
             pass
         raise ErrorFolderNotFound(f"No usable default {folder_cls} folders")
 
+    def _load_hierarchy_cache(self):
+        """Return the persisted distinguished folders of this hierarchy, as a dict mapping folder class names to
+        (folder_id, changekey) tuples. The persisted entry is synced with the server first if it is stale. This is only
+        done once per root instance.
+        """
+        if self._cached_folders is not None:
+            return self._cached_folders
+        key = hierarchy_cache.key(account=self.account, root_cls=self.__class__)
+        with hierarchy_cache.lock(key):
+            if self._cached_folders is not None:
+                return self._cached_folders
+            entry = hierarchy_cache.get(key)
+            if entry is None:
+                folders = {}
+            else:
+                sync_state, synced_at, folders = entry
+                if hierarchy_cache.is_stale(synced_at):
+                    folders = self._sync_hierarchy_cache(key=key, sync_state=sync_state, folders=folders)
+            self._cached_folders = folders
+            return folders
+
+    def _sync_hierarchy_cache(self, key, sync_state, folders):
+        # Apply the folder changes since 'sync_state' to the cached folders, and persist the result
+        from ..services import SyncFolderHierarchy
+
+        log.debug("Syncing cached folder hierarchy %s", key)
+        folder_names = {folder_id: name for name, (folder_id, _) in folders.items()}
+        try:
+            for change_type, f in self.sync_hierarchy(sync_state=sync_state, only_fields=[]):
+                if isinstance(f, Exception):
+                    raise f
+                if f.id not in folder_names:
+                    continue
+                if change_type == SyncFolderHierarchy.DELETE:
+                    del folders[folder_names[f.id]]
+                else:
+                    folders[folder_names[f.id]] = f.id, f.changekey
+        except ResponseMessageError as e:
+            # E.g. an expired sync state. Start over.
+            log.warning("Dropping cached folder hierarchy %s (%r)", key, e)
+            del hierarchy_cache[key]
+            return {}
+        hierarchy_cache.set(key, sync_state=self.folder_sync_state, folders=folders)
+        return folders
+
+    def _get_cached_folder(self, folder_cls):
+        """Return a distinguished folder instance of type 'folder_cls' from the persistent cache, or None."""
+        if not self.account:
+            return None
+        try:
+            folder_id, changekey = self._load_hierarchy_cache()[folder_cls.__name__]
+        except KeyError:
+            return None
+        log.debug("Found persisted distinguished %s folder", folder_cls)
+        if folder_cls is self.__class__:
+            self.id, self.changekey = folder_id, changekey
+            return self
+        return folder_cls(
+            root=self, name=folder_cls.DISTINGUISHED_FOLDER_ID, id=folder_id, changekey=changekey, is_distinguished=True
+        )
+
+    def _add_to_hierarchy_cache(self, folder):
+        """Persist a distinguished folder that was fetched from the server. The first folder of a hierarchy also needs
+        a full SyncFolderHierarchy to get the initial sync state.
+        """
+        if not self.account or not folder.is_distinguished:
+            return
+        folders = self._load_hierarchy_cache()
+        key = hierarchy_cache.key(account=self.account, root_cls=self.__class__)
+        with hierarchy_cache.lock(key):
+            folders[folder.__class__.__name__] = folder.id, folder.changekey
+            entry = hierarchy_cache.get(key)
+            if entry is None or entry[0] is None:
+                log.debug("Getting initial sync state of folder hierarchy %s", key)
+                try:
+                    for _ in self.sync_hierarchy(only_fields=[]):
+                        pass
+                except ResponseMessageError as e:
+                    log.warning("Cannot cache folder hierarchy %s (%r)", key, e)
+                    return
+                sync_state, synced_at = self.folder_sync_state, None
+            else:
+                sync_state, synced_at = entry[0], entry[1]
+            hierarchy_cache.set(key, sync_state=sync_state, folders=folders, synced_at=synced_at)
+
     @property
     def _folders_map(self):
         if self._subfolders is not None:
@@ -0,0 +1,124 @@
+import logging
+from collections import OrderedDict
+from copy import copy
+from threading import Lock
+
+log = logging.getLogger(__name__)
+
+
+class ItemCache:
+    """An in-memory cache of items fetched with GetItem, used by Account.fetch() to skip downloading items that have
+    not changed since the last fetch.
+
+    Items are keyed by item ID and validated by changekey. The server assigns a new changekey to an item every time it
+    changes, so a cached item is served only if the changekey we were asked for is the same as the one of the cached
+    item, and the cached item has all the requested fields. When 'max_entries' or 'max_size' is exceeded, the least
+    recently used items are evicted. Sizes are rough estimates of the memory used by the text fields of an item.
+
+    Items are shallow-copied when they go in and out of the cache, so changing an attribute of a returned item does
+    not change the cached item. Mutable field values, e.g. lists of attendees, are shared.
+
+    The cache is opt-in. Pass an instance to the Account, or set 'account.item_cache':
+
+      account = Account(..., item_cache=ItemCache(max_entries=5000, max_size=50 * 2**20))
+    """
+
+    # A guess at the memory used by an item, apart from its text fields
+    ITEM_OVERHEAD = 1024
+
+    def __init__(self, max_entries=10000, max_size=100 * 2**20):
+        """
+
+        :param max_entries: The max number of items to keep
+        :param max_size: The max estimated total size of the items to keep, in bytes
+        """
+        if max_entries < 1:
+            raise ValueError(f"'max_entries' {max_entries} must be a positive number")
+        if max_size < 1:
+            raise ValueError(f"'max_size' {max_size} must be a positive number")
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()  # Maps item ID to (changekey, fields, item, size). Least recently used first
+        self._lock = Lock()
+
+    def __getstate__(self):
+        # Locks cannot be pickled
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        # Restore the lock
+        self.__dict__.update(state)
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, item_id):
+        return item_id in self._items
+
+    @classmethod
+    def item_size(cls, item):
+        size = cls.ITEM_OVERHEAD
+        for f in item.FIELDS:
+            value = getattr(item, f.name, None)
+            if isinstance(value, (str, bytes)):
+                size += len(value)
+        return size
+
+    def get(self, item_id, changekey, fields):
+        """Return a copy of the cached item, or None if the item is not cached, has changed or lacks some of the
+        requested fields.
+
+        :param item_id: The ID of the item
+        :param changekey: The current changekey of the item. If None, we can't tell if the item has changed
+        :param fields: A set of FieldPath objects that the item must have
+        """
+        with self._lock:
+            entry = self._items.get(item_id)
+            if entry is None or changekey is None or entry[0] != changekey or not entry[1].issuperset(fields):
+                self.misses += 1
+                return None
+            self._items.move_to_end(item_id)
+            self.hits += 1
+            return copy(entry[2])
+
+    def put(self, item, fields):
+        """Cache a copy of 'item', which was fetched with the FieldPath objects in 'fields'."""
+        if not item.id or not item.changekey:
+            return
+        size = self.item_size(item)
+        if size > self.max_size:
+            log.debug("Item %s is too large to cache (%s bytes)", item.id, size)
+            return
+        with self._lock:
+            old = self._items.pop(item.id, None)
+            if old is not None:
+                self.size -= old[3]
+            self._items[item.id] = item.changekey, frozenset(fields), copy(item), size
+            self.size += size
+            while len(self._items) > self.max_entries or self.size > self.max_size:
+                _, (_, _, _, evicted_size) = self._items.popitem(last=False)
+                self.size -= evicted_size
+
+    def __delitem__(self, item_id):
+        # Don't fail on non-existing entries
+        with self._lock:
+            old = self._items.pop(item_id, None)
+            if old is not None:
+                self.size -= old[3]
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.size = 0
+
+    def __str__(self):
+        return (
+            f"{self.__class__.__name__}(entries={len(self)}/{self.max_entries}, size={self.size}/{self.max_size}, "
+            f"hits={self.hits}, misses={self.misses})"
+        )
@@ -74,7 +74,8 @@ class CalendarItem(Item, AcceptDeclineMixIn):
 
     ELEMENT_NAME = "CalendarItem"
 
-    uid = TextField(field_uri="calendar:UID", is_required_after_save=True, is_searchable=False)
+    # The UID is not a streamable property, so FindItem returns it in full
+    uid = TextField(field_uri="calendar:UID", is_required_after_save=True, is_searchable=False, is_complex=False)
     recurrence_id = DateTimeField(field_uri="calendar:RecurrenceId", is_read_only=True)
     start = DateOrDateTimeField(field_uri="calendar:Start", is_required=True)
     end = DateOrDateTimeField(field_uri="calendar:End", is_required=True)
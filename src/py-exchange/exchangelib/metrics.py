@@ -0,0 +1,141 @@
+import json
+import logging
+from bisect import bisect_left
+from threading import Lock
+
+log = logging.getLogger(__name__)
+
+
+class Histogram:
+    """A histogram with fixed buckets, like the Prometheus histogram type. Bucket counts are not cumulative internally,
+    but they are cumulative in snapshots.
+    """
+
+    # Upper bounds of the buckets, in seconds
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+    def __init__(self, buckets=None):
+        self.buckets = tuple(sorted(buckets or self.BUCKETS))
+        self.counts = [0] * (len(self.buckets) + 1)  # The last one is the +Inf bucket
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self):
+        buckets, total = {}, 0
+        for upper, count in zip(self.buckets + ("+Inf",), self.counts):
+            total += count
+            buckets[str(upper)] = total
+        return dict(buckets=buckets, sum=self.sum, count=self.count)
+
+
+class MetricsRegistry:
+    """Counters and histograms of the requests sent through a protocol, labelled by service name, e.g. 'FindItem'.
+
+    The protocol records these metrics:
+      * requests_total: HTTP requests, including retries
+      * retries_total: HTTP requests that were retried because the server failed or throttled us
+      * back_offs_total: ErrorServerBusy responses that made us back off
+      * back_off_waits_total: requests that were held back because the service endpoint was backing off
+      * request_bytes_total, response_bytes_total: size of the HTTP bodies. Streamed responses are not counted
+      * request_seconds: histogram of the duration of each HTTP request
+      * session_wait_seconds: histogram of the time spent waiting for a session from the session pool
+      * parse_seconds: histogram of the time spent parsing the SOAP envelope of responses. With incremental parsing,
+        only the part before the SOAP body is parsed up front
+
+    Read the values in-process with counter() and histogram(), or export them all with snapshot(), to_json() or
+    to_prometheus():
+
+      print(account.protocol.metrics.to_prometheus())
+    """
+
+    def __init__(self):
+        self._counters = {}  # Maps (name, service_name) to a number
+        self._histograms = {}  # Maps (name, service_name) to a Histogram
+        self._lock = Lock()
+
+    def __getstate__(self):
+        # Locks cannot be pickled
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        # Restore the lock
+        self.__dict__.update(state)
+        self._lock = Lock()
+
+    def inc(self, name, service_name, value=1):
+        key = name, service_name
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, service_name, value):
+        key = name, service_name
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def counter(self, name, service_name):
+        """Return the value of a counter, or 0 if nothing was counted yet."""
+        return self._counters.get((name, service_name), 0)
+
+    def histogram(self, name, service_name):
+        """Return a snapshot of a histogram, or None if nothing was observed yet."""
+        with self._lock:
+            histogram = self._histograms.get((name, service_name))
+            return None if histogram is None else histogram.snapshot()
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self):
+        """Return all metrics as a dict of {'counters': {name: {service_name: value}}, 'histograms': {name:
+        {service_name: {'buckets': ..., 'sum': ..., 'count': ...}}}}.
+        """
+        with self._lock:
+            counters, histograms = {}, {}
+            for (name, service_name), value in sorted(self._counters.items()):
+                counters.setdefault(name, {})[service_name] = value
+            for (name, service_name), histogram in sorted(self._histograms.items()):
+                histograms.setdefault(name, {})[service_name] = histogram.snapshot()
+        return dict(counters=counters, histograms=histograms)
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.snapshot(), **kwargs)
+
+    def to_prometheus(self, prefix="exchangelib_", labels=None):
+        """Return all metrics in the Prometheus text exposition format. 'labels' is a dict of extra labels to add to
+        all samples, e.g. {'endpoint': ...}.
+        """
+
+        def _labels(service_name, **extra):
+            pairs = dict(labels or {}, service=service_name, **extra)
+            escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in pairs.values())
+            return "{" + ",".join(f'{k}="{v}"' for k, v in zip(pairs, escaped)) + "}"
+
+        snapshot = self.snapshot()
+        lines = []
+        for name, values in snapshot["counters"].items():
+            lines.append(f"# TYPE {prefix}{name} counter")
+            for service_name, value in values.items():
+                lines.append(f"{prefix}{name}{_labels(service_name)} {value}")
+        for name, values in snapshot["histograms"].items():
+            lines.append(f"# TYPE {prefix}{name} histogram")
+            for service_name, histogram in values.items():
+                for upper, count in histogram["buckets"].items():
+                    lines.append(f"{prefix}{name}_bucket{_labels(service_name, le=upper)} {count}")
+                lines.append(f"{prefix}{name}_sum{_labels(service_name)} {histogram['sum']}")
+                lines.append(f"{prefix}{name}_count{_labels(service_name)} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+    def __str__(self):
+        return self.to_json()
@@ -61,6 +61,7 @@ class Fields(list):
     def __init__(self, *fields):
         super().__init__(fields)
         self._dict = {}
+        self._dispatch_map = None
         for f in fields:
             # Check for duplicate field names
             if f.name in self._dict:
@@ -92,6 +93,25 @@ class Fields(list):
     def copy(self):
         return self.__class__(*self)
 
+    @property
+    def dispatch_map(self):
+        """Return a (tag -> fields, other fields) tuple, used to parse all fields of an element in one pass over its
+        children. Fields are mapped by their Field.dispatch_tag(). Other fields need the whole element.
+
+        The map is built on first use and not in EWSMeta, because some fields resolve their 'value_cls' lazily. It is
+        stored here and not on the class, because subclasses share their FIELDS with the base class.
+        """
+        if self._dispatch_map is None:
+            tag_map, other_fields = {}, []
+            for f in self:
+                tag = f.dispatch_tag()
+                if tag is None:
+                    other_fields.append(f)
+                else:
+                    tag_map.setdefault(tag, []).append(f)
+            self._dispatch_map = tag_map, tuple(other_fields)
+        return self._dispatch_map
+
     def index_by_name(self, field_name):
         for i, f in enumerate(self):
             if f.name == field_name:
@@ -103,14 +123,17 @@ class Fields(list):
             raise ValueError(f"Field {field!r} is a duplicate")
         super().insert(index, field)
         self._dict[field.name] = field
+        self._dispatch_map = None
 
     def remove(self, field):
         super().remove(field)
         del self._dict[field.name]
+        self._dispatch_map = None
 
     def append(self, field):
         super().append(field)
         self._dict[field.name] = field
+        self._dispatch_map = None
 
 
 class Body(str):
@@ -301,7 +324,24 @@ class EWSElement(metaclass=EWSMeta):
 
     @classmethod
     def from_xml(cls, elem, account):
-        kwargs = {f.name: f.from_xml(elem=elem, account=account) for f in cls.FIELDS}
+        tag_map, other_fields = cls.FIELDS.dispatch_map
+        kwargs = {}
+        # Walk the children once and hand each child to the fields reading it. Like elem.find(), only consider the
+        # first child with a given tag.
+        for child in elem:
+            fields = tag_map.get(child.tag)
+            if fields is None or fields[0].name in kwargs:
+                continue
+            for f in fields:
+                kwargs[f.name] = f.from_child_xml(child=child, elem=elem, account=account)
+        # Fields with no matching child get their default value
+        if len(kwargs) < len(cls.FIELDS) - len(other_fields):
+            for fields in tag_map.values():
+                for f in fields:
+                    if f.name not in kwargs:
+                        kwargs[f.name] = f.default
+        for f in other_fields:
+            kwargs[f.name] = f.from_xml(elem=elem, account=account)
         cls._clear(elem)
         return cls(**kwargs)
 
@@ -10,7 +10,7 @@ import logging
 import random
 from contextlib import suppress
 from queue import Empty, LifoQueue
-from threading import Lock
+from threading import Condition, Lock
 
 import requests.adapters
 import requests.sessions
@@ -29,6 +29,7 @@ from .errors import (
     TransportError,
     UnauthorizedError,
 )
+from .metrics import MetricsRegistry
 from .properties import DLMailbox, FreeBusyViewOptions, MailboxData, RoomList, TimeWindow, TimeZone
 from .services import (
     ConvertId,
@@ -40,8 +41,10 @@ from .services import (
     GetUserAvailability,
     ResolveNames,
 )
+from .tracing import trace
 from .transport import CREDENTIALS_REQUIRED, DEFAULT_HEADERS, NTLM, OAUTH2, get_auth_instance, get_service_authtype
 from .version import API_VERSIONS, Version
+from .version_cache import version_cache
 
 log = logging.getLogger(__name__)
 
@@ -75,12 +78,24 @@ class BaseProtocol:
     # The User-Agent header to use for HTTP requests. Override this to set an app-specific one
     USERAGENT = None
 
+    # Persist the server version of each service endpoint to the filesystem, to avoid guessing the version in every new
+    # process. See VersionCache
+    PERSISTENT_VERSION_CACHE = False
+
     def __init__(self, config):
         self.config = config
         self._api_version_hint = None
 
         self._session_pool_size = 0
         self._session_pool_maxsize = config.max_connections or self.SESSION_POOLSIZE
+        # Adjusts the number of sessions we may use, between the min and max size. See AdaptivePoolSize
+        if config.adaptive_connections:
+            self._pool_controller = AdaptivePoolSize(
+                min_size=min(config.min_connections or 1, self._session_pool_maxsize),
+                max_size=self._session_pool_maxsize,
+            )
+        else:
+            self._pool_controller = None
 
         # Try to behave nicely with the remote server. We want to keep the connection open between requests.
         # We also want to re-use sessions, to avoid the NTLM auth handshake on every request. We must know the
@@ -88,6 +103,9 @@ class BaseProtocol:
         self._session_pool = LifoQueue()
         self._session_pool_lock = Lock()
 
+        # Request counts, latencies, sizes and retries per service. See MetricsRegistry
+        self.metrics = MetricsRegistry()
+
     @property
     def service_endpoint(self):
         return self.config.service_endpoint
@@ -119,6 +137,15 @@ class BaseProtocol:
     def server(self):
         return self.config.server
 
+    @property
+    def back_off_scheduler(self):
+        return BackOffScheduler.for_endpoint(self.service_endpoint)
+
+    def back_off(self, seconds):
+        """Back off according to the retry policy, and hold back all other requests to the service endpoint."""
+        self.retry_policy.back_off(seconds)
+        self.back_off_scheduler.back_off(self.retry_policy.back_off_until)
+
     def get_auth_type(self):
         # Autodetect authentication type. We also set version hint here.
         name = str(self.credentials) if self.credentials and str(self.credentials) else "DUMMY"
@@ -173,14 +200,35 @@ class BaseProtocol:
     def session_pool_size(self):
         return self._session_pool_size
 
+    @property
+    def session_pool_maxsize(self):
+        return self._session_pool_maxsize
+
+    @property
+    def session_pool_limit(self):
+        """The number of sessions we may currently use. This is the max size, unless the pool size is adaptive."""
+        if self._pool_controller:
+            return self._pool_controller.limit
+        return self._session_pool_maxsize
+
+    def register_response_time(self, seconds):
+        """Feed the response time of a successful request to the adaptive pool size controller, if any."""
+        if self._pool_controller:
+            self._pool_controller.register_response_time(seconds)
+
+    def register_throttling(self):
+        """Tell the adaptive pool size controller, if any, that the server wants us to slow down."""
+        if self._pool_controller:
+            self._pool_controller.register_throttling()
+
     def increase_poolsize(self):
         """Increases the session pool size. We increase by one session per call."""
         # Create a single session and insert it into the pool. We need to protect this with a lock while we are changing
         # the pool size variable, to avoid race conditions. We must not exceed the pool size limit.
-        if self._session_pool_size >= self._session_pool_maxsize:
+        if self._session_pool_size >= self.session_pool_limit:
             raise SessionPoolMaxSizeReached("Session pool size cannot be increased further")
         with self._session_pool_lock:
-            if self._session_pool_size >= self._session_pool_maxsize:
+            if self._session_pool_size >= self.session_pool_limit:
                 log.debug("Session pool size was increased in another thread")
                 return
             log.debug(
@@ -195,7 +243,15 @@ class BaseProtocol:
     def decrease_poolsize(self):
         """Decreases the session pool size in response to error messages from the server requesting to rate-limit
         requests. We decrease by one session per call.
+
+        With an adaptive pool size, the limit is decreased multiplicatively instead, and surplus sessions are closed
+        when they are released.
         """
+        if self._pool_controller:
+            if self._pool_controller.limit <= self._pool_controller.min_size:
+                raise SessionPoolMinSizeReached("Session pool size cannot be decreased further")
+            self._pool_controller.register_throttling()
+            return
         # Take a single session from the pool and discard it. We need to protect this with a lock while we are changing
         # the pool size variable, to avoid race conditions. We must keep at least one session in the pool.
         if self._session_pool_size <= 1:
@@ -242,6 +298,13 @@ class BaseProtocol:
         if self.MAX_SESSION_USAGE_COUNT and session.usage_count >= self.MAX_SESSION_USAGE_COUNT:
             log.debug("Server %s: session %s usage exceeded limit. Discarding", self.server, session.session_id)
             session = self.renew_session(session)
+        if self._session_pool_size > self.session_pool_limit:
+            with self._session_pool_lock:
+                if self._session_pool_size > self.session_pool_limit:
+                    log.debug("Server %s: Closing surplus session %s", self.server, session.session_id)
+                    self.close_session(session)
+                    self._session_pool_size -= 1
+                    return
         self._session_pool.put(session, block=False)
 
     def close_session(self, session):
@@ -312,6 +375,11 @@ class BaseProtocol:
         return session
 
     def create_oauth2_session(self):
+        with trace("ews.oauth2_session", service_endpoint=self.service_endpoint) as span:
+            session = self._create_oauth2_session(span)
+        return session
+
+    def _create_oauth2_session(self, span):
         session_params = {"token": self.credentials.access_token}  # Token may be None
         token_params = {"include_client_id": True}
 
@@ -348,6 +416,7 @@ class BaseProtocol:
             oauth2_session_params=session_params,
             oauth2_token_endpoint=self.credentials.token_url,
         )
+        span.set_attribute("fetched_token", not session.token)
         if not session.token:
             # Fetch the token explicitly -- it doesn't occur implicitly
             token = session.fetch_token(
@@ -382,6 +451,169 @@ class BaseProtocol:
         return self.__class__.__name__ + repr((self.service_endpoint, self.credentials, self.auth_type))
 
 
+class AdaptivePoolSize:
+    """Adjust the number of concurrent sessions to a server with additive increase, multiplicative decrease (AIMD).
+
+    Response times are collected in windows of WINDOW requests. If the 95th percentile response time of a window stays
+    within LATENCY_TOLERANCE of the baseline, we allow one more session. If it rises above that, or the server throttles
+    us, we cut the limit by DECREASE_FACTOR. The baseline is the best p95 seen since the limit was last decreased. It is
+    deliberately kept when the limit grows, so latency that creeps up one session at a time is still noticed. The limit
+    stays between 'min_size' and 'max_size', which are set by 'min_connections' and 'max_connections' on the
+    Configuration.
+    """
+
+    # The number of response times to collect before deciding on the limit
+    WINDOW = 20
+    # Back off if the p95 response time grows more than this factor over the baseline
+    LATENCY_TOLERANCE = 1.5
+    DECREASE_FACTOR = 0.5
+
+    def __init__(self, min_size, max_size):
+        if min_size < 1 or min_size > max_size:
+            raise ValueError(f"'min_size' {min_size} must be between 1 and 'max_size' {max_size}")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.limit = min_size
+        self._response_times = []
+        self._baseline = None  # The best p95 response time seen since the limit was last decreased
+        self._lock = Lock()
+
+    def __getstate__(self):
+        # Locks cannot be pickled
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        # Restore the lock
+        self.__dict__.update(state)
+        self._lock = Lock()
+
+    def register_response_time(self, seconds):
+        with self._lock:
+            self._response_times.append(seconds)
+            if len(self._response_times) < self.WINDOW:
+                return
+            response_times = sorted(self._response_times)
+            self._response_times = []
+            p95 = response_times[int(0.95 * (len(response_times) - 1))]
+            if self._baseline is not None and p95 > self._baseline * self.LATENCY_TOLERANCE:
+                log.debug("p95 response time increased from %.3fs to %.3fs", self._baseline, p95)
+                self._decrease()
+                return
+            self._baseline = p95 if self._baseline is None else min(self._baseline, p95)
+            if self.limit < self.max_size:
+                log.debug("p95 response time is %.3fs. Increasing session limit to %s", p95, self.limit + 1)
+                self.limit += 1
+
+    def register_throttling(self):
+        with self._lock:
+            self._response_times = []
+            self._decrease()
+
+    def _decrease(self):
+        limit = max(self.min_size, int(self.limit * self.DECREASE_FACTOR))
+        if limit < self.limit:
+            log.warning("Decreasing session limit from %s to %s", self.limit, limit)
+            self.limit = limit
+        # Response times at the new limit may be different. Start over.
+        self._baseline = None
+
+
+class BackOffScheduler:
+    """Coordinate back off windows across all threads sending requests to the same service endpoint.
+
+    When the server asks one thread to back off, all other requests to the endpoint are held back until the back off
+    window has ended, instead of hammering the server until they get throttled themselves. Requests that are held back
+    are released with a random delay of up to MAX_JITTER seconds after the window has ended, so they don't all hit the
+    server at the same time. The asyncio wrappers run requests in executor threads, so they are held back, too.
+
+    There is one scheduler per service endpoint, shared by all protocols in the process. Use for_endpoint() to get it.
+    """
+
+    # Spread requests that were held back over this many seconds when the back off window ends
+    MAX_JITTER = 2
+
+    _schedulers = {}
+    _schedulers_lock = Lock()
+
+    def __init__(self, service_endpoint):
+        self.service_endpoint = service_endpoint
+        self._back_off_until = None
+        self._queue_depth = 0
+        self._condition = Condition()
+
+    @classmethod
+    def for_endpoint(cls, service_endpoint):
+        key = str(service_endpoint).lower()
+        scheduler = cls._schedulers.get(key)
+        if scheduler is None:
+            with cls._schedulers_lock:
+                scheduler = cls._schedulers.setdefault(key, cls(service_endpoint=service_endpoint))
+        return scheduler
+
+    @property
+    def back_off_until(self):
+        """Return the end of the current back off window as a datetime, or None if we are not backing off."""
+        with self._condition:
+            if self._back_off_until is not None and self._back_off_until < datetime.datetime.now():
+                self._back_off_until = None  # The back off value has expired. Reset
+            return self._back_off_until
+
+    @property
+    def queue_depth(self):
+        """Return the number of requests currently held back."""
+        return self._queue_depth
+
+    def back_off(self, until):
+        """Extend the back off window to 'until', a datetime. A shorter window never cuts an existing one short."""
+        if until is None:
+            return
+        with self._condition:
+            if self._back_off_until is not None and self._back_off_until >= until:
+                return
+            log.warning(
+                "Server %s requested back off until %s. Holding back %s queued requests",
+                self.service_endpoint,
+                until,
+                self._queue_depth,
+            )
+            self._back_off_until = until
+
+    def reset(self):
+        """End the back off window now and release all requests that are held back."""
+        with self._condition:
+            self._back_off_until = None
+            self._condition.notify_all()
+
+    def wait(self, until=None):
+        """Block until the back off window has ended. 'until' is an optional back off value from elsewhere, e.g. the
+        retry policy, which extends the window for everyone. Return True if we had to wait.
+        """
+        self.back_off(until)
+        if self.back_off_until is None:
+            return False
+        jitter = datetime.timedelta(seconds=random.uniform(0, self.MAX_JITTER))  # nosec
+        with self._condition:
+            self._queue_depth += 1
+            try:
+                while self._back_off_until is not None:
+                    sleep_secs = (self._back_off_until + jitter - datetime.datetime.now()).total_seconds()
+                    if sleep_secs <= 0:
+                        break
+                    log.debug(
+                        "Holding back request to %s for %s seconds (%s queued)",
+                        self.service_endpoint,
+                        sleep_secs,
+                        self._queue_depth,
+                    )
+                    # The window may be extended or reset while we wait. Check again when we wake up.
+                    self._condition.wait(timeout=sleep_secs)
+            finally:
+                self._queue_depth -= 1
+        return True
+
+
 class CachingProtocol(type):
     """A metaclass for Protocol that caches Protocol instances based on a server+username key."""
 
@@ -403,42 +635,46 @@ class CachingProtocol(type):
         if not config.service_endpoint:
             raise AttributeError("'config.service_endpoint' must be set")
         _protocol_cache_key = cls._cache_key(config)
+        with trace("ews.protocol", service_endpoint=config.service_endpoint) as span:
 
-        try:
-            protocol, _ = cls._protocol_cache[_protocol_cache_key]
-        except KeyError:
-            pass
-        else:
-            if isinstance(protocol, Exception):
-                # The input data leads to a TransportError. Re-throw
-                raise protocol
-            return protocol
-
-        # Acquire lock to guard against multiple threads competing to cache information. Having a per-server lock is
-        # probably overkill although it would reduce lock contention.
-        log.debug("Waiting for _protocol_cache_lock")
-        with cls._protocol_cache_lock:
             try:
                 protocol, _ = cls._protocol_cache[_protocol_cache_key]
             except KeyError:
                 pass
             else:
                 if isinstance(protocol, Exception):
-                    # We already tried this combination, possibly in a different competing thread, but the input
-                    # data leads to a TransportError.
+                    # The input data leads to a TransportError. Re-throw
                     raise protocol
+                span.set_attribute("cached", True)
                 return protocol
 
-            log.debug("Protocol __call__ cache miss. Adding key '%s'", str(_protocol_cache_key))
-            try:
-                protocol = super().__call__(*args, **kwargs)
-            except TransportError as e:
-                # This can happen if, for example, autodiscover supplies us with a bogus EWS endpoint
-                log.warning("Failed to create cached protocol with key %s: %s", _protocol_cache_key, e)
-                cls._protocol_cache[_protocol_cache_key] = e, datetime.datetime.now()
-                raise e
-            cls._protocol_cache[_protocol_cache_key] = protocol, datetime.datetime.now()
-        return protocol
+            # Acquire lock to guard against multiple threads competing to cache information. Having a per-server lock is
+            # probably overkill although it would reduce lock contention.
+            log.debug("Waiting for _protocol_cache_lock")
+            with cls._protocol_cache_lock:
+                try:
+                    protocol, _ = cls._protocol_cache[_protocol_cache_key]
+                except KeyError:
+                    pass
+                else:
+                    if isinstance(protocol, Exception):
+                        # We already tried this combination, possibly in a different competing thread, but the input
+                        # data leads to a TransportError.
+                        raise protocol
+                    span.set_attribute("cached", True)
+                    return protocol
+
+                span.set_attribute("cached", False)
+                log.debug("Protocol __call__ cache miss. Adding key '%s'", str(_protocol_cache_key))
+                try:
+                    protocol = super().__call__(*args, **kwargs)
+                except TransportError as e:
+                    # This can happen if, for example, autodiscover supplies us with a bogus EWS endpoint
+                    log.warning("Failed to create cached protocol with key %s: %s", _protocol_cache_key, e)
+                    cls._protocol_cache[_protocol_cache_key] = e, datetime.datetime.now()
+                    raise e
+                cls._protocol_cache[_protocol_cache_key] = protocol, datetime.datetime.now()
+            return protocol
 
     @staticmethod
     def _cache_key(config):
@@ -481,7 +717,11 @@ class Protocol(BaseProtocol, metaclass=CachingProtocol):
         if not self.config.version or not self.config.version.build:
             with self._version_lock:
                 if not self.config.version or not self.config.version.build:
-                    # Version.guess() needs auth objects and a working session pool
+                    if self.PERSISTENT_VERSION_CACHE:
+                        self.config.version = version_cache.get(self.service_endpoint)
+                if not self.config.version or not self.config.version.build:
+                    # Version.guess() needs auth objects and a working session pool. Services update the persistent
+                    # version cache with the version found in the response headers.
                     self.config.version = Version.guess(self, api_version_hint=self._api_version_hint)
         return self.config.version
 
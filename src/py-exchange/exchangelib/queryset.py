@@ -9,6 +9,8 @@ from .fields import FieldOrder, FieldPath
 from .items import ID_ONLY, CalendarItem
 from .properties import InvalidField
 from .restriction import Q
+from .tracing import get_tracer, trace, trace_iter
+from .util import prefetch
 from .version import EXCHANGE_2010
 
 log = logging.getLogger(__name__)
@@ -167,6 +169,8 @@ class QuerySet(SearchableMixIn):
         }[return_format](items)
 
     def _query(self):
+        from .services import GetItem
+
         if self.only_fields is None:
             # We didn't restrict list of field paths. Get all fields from the server, including extended properties.
             if self.request_type == self.PERSONA:
@@ -221,8 +225,14 @@ class QuerySet(SearchableMixIn):
                 # The FindItem service does not support complex field types. Tell find_items() to return
                 # (id, changekey) tuples, and pass that to fetch().
                 find_kwargs["additional_fields"] = None
+                ids = self.folder_collection.find_items(self.q, **find_kwargs)
+                protocol = self.folder_collection.account.protocol
+                if protocol.session_pool_limit > 1:
+                    # Keep paging in the background while fetch() sends GetItem requests for the IDs we already have.
+                    # Only buffer IDs for the sessions that the adaptive pool size currently allows.
+                    ids = prefetch(ids, maxsize=(self.chunk_size or GetItem.CHUNK_SIZE) * protocol.session_pool_limit)
                 unfiltered_items = self.folder_collection.account.fetch(
-                    ids=self.folder_collection.find_items(self.q, **find_kwargs),
+                    ids=ids,
                     only_fields=additional_fields,
                     chunk_size=self.chunk_size,
                 )
@@ -267,7 +277,23 @@ class QuerySet(SearchableMixIn):
             return
 
         log.debug("Initializing cache")
-        yield from self._format_items(items=self._query(), return_format=self.return_format)
+        if get_tracer() is None:
+            yield from self._format_items(items=self._query(), return_format=self.return_format)
+            return
+        # All requests sent while iterating become children of this span
+        yield from trace_iter(
+            trace("ews.queryset", **self._span_attributes()),
+            self._format_items(items=self._query(), return_format=self.return_format),
+        )
+
+    def _span_attributes(self):
+        # Attributes of the tracing span of an iteration
+        account = self.folder_collection.account
+        return dict(
+            mailbox=account.primary_smtp_address if account else None,
+            folders=[f.name or f.__class__.__name__ for f in self.folder_collection.folders],
+            request_type=self.request_type,
+        )
 
     # Do not implement __len__. The implementation of list() tries to preallocate memory by calling __len__ on the
     # given sequence, before calling __iter__. If we implemented __len__, we would end up calling FindItems twice, once
@@ -442,6 +468,21 @@ class QuerySet(SearchableMixIn):
         new_qs.only_fields = only_fields
         return new_qs
 
+    def find_only(self, *args):
+        """Like only(), but guarantee that the query is answered by FindItem alone, without fetching the items
+        afterwards with GetItem. Raise ValueError if one of the fields is a complex field that FindItem cannot return.
+        """
+        try:
+            only_fields = tuple(self._get_field_path(arg) for arg in args)
+        except ValueError as e:
+            raise ValueError(f"{e.args[0]} in find_only()")
+        complex_fields = [f.path for f in only_fields if f.field.is_complex]
+        if complex_fields:
+            raise ValueError(f"Fields {complex_fields} are complex fields and would require a GetItem request")
+        new_qs = self._copy_self()
+        new_qs.only_fields = only_fields
+        return new_qs
+
     def order_by(self, *args):
         """
 
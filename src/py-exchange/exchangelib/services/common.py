@@ -1,6 +1,8 @@
 import abc
 import logging
+import time
 from contextlib import suppress
+from copy import copy
 from itertools import chain
 
 from .. import errors
@@ -47,6 +49,7 @@ from ..properties import (
     IndexedFieldURI,
     ItemId,
 )
+from ..tracing import get_tracer, trace
 from ..transport import wrap
 from ..util import (
     ENS,
@@ -54,6 +57,7 @@ from ..util import (
     SOAPNS,
     TNS,
     DummyResponse,
+    IncrementalDocument,
     ParseError,
     add_xml_child,
     chunkify,
@@ -61,10 +65,12 @@ from ..util import (
     get_xml_attr,
     post_ratelimited,
     set_xml_value,
+    threaded_map,
     to_xml,
     xml_to_str,
 )
 from ..version import API_VERSIONS, Version
+from ..version_cache import version_cache
 
 log = logging.getLogger(__name__)
 
@@ -105,6 +111,13 @@ class EWSService(metaclass=abc.ABCMeta):
     supported_from = None
     # Marks services that support paging of requested items
     supports_paging = False
+    # Send the chunks of a chunked request concurrently, if the session pool of the protocol currently allows more than
+    # one session. Results are still returned in the order of the input. Off by default, because it starts threads.
+    CONCURRENT_CHUNKS = False
+    # Parse responses incrementally and return each element as soon as it has been received. This keeps only one
+    # element at a time in the XML tree instead of the whole response. Only for services that use the default
+    # implementation of _get_elements_in_container().
+    INCREMENTAL_PARSING = False
 
     def __init__(self, protocol, chunk_size=None, timeout=None):
         self.chunk_size = chunk_size or self.CHUNK_SIZE
@@ -125,6 +138,8 @@ class EWSService(metaclass=abc.ABCMeta):
         # Streaming connection variables
         self._streaming_session = None
         self._streaming_response = None
+        # The document of the response currently being parsed, in incremental parsing mode
+        self._incremental_document = None
 
     def __del__(self):
         # pylint: disable=bare-except
@@ -180,11 +195,15 @@ class EWSService(metaclass=abc.ABCMeta):
     def parse(self, xml):
         """Used mostly for testing, when we want to parse static XML data."""
         resp = DummyResponse(content=xml, streaming=self.streaming)
-        _, body = self._get_soap_parts(response=resp)
-        return self._elems_to_objs(self._get_elements_in_response(response=self._get_soap_messages(body=body)))
+        _, body = self._get_soap_parts(response=resp, incremental=self.INCREMENTAL_PARSING)
+        messages = self._get_soap_messages(body=body, incremental=self.INCREMENTAL_PARSING)
+        return self._elems_to_objs(self._get_elements_in_response(response=messages))
 
     def _elems_to_objs(self, elems):
         """Takes a generator of XML elements and exceptions. Returns the equivalent Python objects (or exceptions)."""
+        if get_tracer() is not None:
+            yield from self._traced_elems_to_objs(elems)
+            return
         for elem in elems:
             # Allow None here. Some services don't return an ID if the target folder is outside the mailbox.
             if isinstance(elem, (Exception, type(None))):
@@ -192,6 +211,31 @@ class EWSService(metaclass=abc.ABCMeta):
                 continue
             yield self._elem_to_obj(elem)
 
+    def _traced_elems_to_objs(self, elems):
+        # Like _elems_to_objs(), but in a span. The span is never active, so requests for later pages, which happen
+        # while we wait for the next element, are siblings of this span instead of children. Only the time spent
+        # converting elements is recorded in 'convert_seconds'.
+        count, busy, error = 0, 0.0, None
+        span = trace("ews.convert", **self._span_attributes())
+        span.start()
+        try:
+            for elem in elems:
+                if isinstance(elem, (Exception, type(None))):
+                    yield elem
+                    continue
+                t_start = time.monotonic()
+                obj = self._elem_to_obj(elem)
+                busy += time.monotonic() - t_start
+                count += 1
+                yield obj
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            span.set_attribute("count", count)
+            span.set_attribute("convert_seconds", busy)
+            span.end(error=error)
+
     def _elem_to_obj(self, elem):
         if not self.returns_elements:
             raise RuntimeError("Incorrect call to method when 'returns_elements' is False")
@@ -209,6 +253,10 @@ class EWSService(metaclass=abc.ABCMeta):
     def _extra_headers(self, session):
         return {}
 
+    def _span_attributes(self):
+        # Attributes of the tracing spans of this service
+        return dict(service=self.SERVICE_NAME)
+
     @property
     def _account_to_impersonate(self):
         if isinstance(self.protocol.credentials, OAuth2Credentials):
@@ -225,7 +273,7 @@ class EWSService(metaclass=abc.ABCMeta):
         :param payload: payload as an XML object
         :return: the response, as XML objects
         """
-        response = self._get_response_xml(payload=payload)
+        response = self._get_response_xml(payload=payload, incremental=self.INCREMENTAL_PARSING)
         if self.supports_paging:
             return (self._get_page(message) for message in response)
         return self._get_elements_in_response(response=response)
@@ -241,9 +289,29 @@ class EWSService(metaclass=abc.ABCMeta):
         """
         # If the input for a service is a QuerySet, it can be difficult to remove exceptions before now
         filtered_items = filter(lambda i: not isinstance(i, Exception), items)
-        for i, chunk in enumerate(chunkify(filtered_items, self.chunk_size), start=1):
-            log.debug("Processing chunk %s containing %s items", i, len(chunk))
-            yield from self._get_elements(payload=payload_func(chunk, **kwargs))
+        chunks = chunkify(filtered_items, self.chunk_size)
+        # Don't start more threads than the adaptive pool size allows sessions. They would only wait in get_session()
+        workers = self.protocol.session_pool_limit
+        if not self.CONCURRENT_CHUNKS or self.streaming or workers <= 1:
+            for i, chunk in enumerate(chunks, start=1):
+                log.debug("Processing chunk %s containing %s items", i, len(chunk))
+                yield from self._get_elements(payload=payload_func(chunk, **kwargs))
+            return
+
+        def _process_chunk(chunk):
+            log.debug("Processing chunk containing %s items", len(chunk))
+            return list(self._worker_copy()._get_elements(payload=payload_func(chunk, **kwargs)))
+
+        # Back off requests from the server are shared by all workers via the retry policy of the protocol
+        for elems in threaded_map(_process_chunk, chunks, max_workers=workers):
+            yield from elems
+
+    def _worker_copy(self):
+        """Return a copy of the service for use in a worker thread, which doesn't share parsing state with us."""
+        svc = copy(self)
+        svc.INCREMENTAL_PARSING = False
+        svc._incremental_document = None
+        return svc
 
     def stop_streaming(self):
         if not self.streaming:
@@ -294,7 +362,9 @@ class EWSService(metaclass=abc.ABCMeta):
         if self.streaming:
             # Make sure to clean up lingering resources
             self.stop_streaming()
+        t_start = time.monotonic()
         session = self.protocol.get_session()
+        self.protocol.metrics.observe("session_wait_seconds", self.SERVICE_NAME, time.monotonic() - t_start)
         r, session = post_ratelimited(
             protocol=self.protocol,
             session=session,
@@ -308,6 +378,7 @@ class EWSService(metaclass=abc.ABCMeta):
             ),
             stream=self.streaming,
             timeout=self.timeout or self.protocol.TIMEOUT,
+            service_name=self.SERVICE_NAME,
         )
         self._handle_response_cookies(session)
         if self.streaming:
@@ -338,46 +409,51 @@ class EWSService(metaclass=abc.ABCMeta):
         # guessing tango, but then the server may decide that any arbitrary legacy backend server may actually process
         # the request for an account. Prepare to handle version-related errors and set the server version per-account.
         log.debug("Calling service %s", self.SERVICE_NAME)
-        for api_version in self._api_versions_to_try:
-            log.debug("Trying API version %s", api_version)
-            r = self._get_response(payload=payload, api_version=api_version)
-            if self.streaming:
-                # Let 'requests' decode raw data automatically
-                r.raw.decode_content = True
-            try:
-                header, body = self._get_soap_parts(response=r, **parse_opts)
-            except Exception:
-                r.close()  # Release memory
-                raise
-            # The body may contain error messages from Exchange, but we still want to collect version info
-            if header is not None:
-                self._update_api_version(api_version=api_version, header=header, **parse_opts)
-            try:
-                return self._get_soap_messages(body=body, **parse_opts)
-            except (
-                ErrorInvalidServerVersion,
-                ErrorIncorrectSchemaVersion,
-                ErrorInvalidRequest,
-                ErrorInvalidSchemaVersionForMailboxVersion,
-            ):
-                # The guessed server version is wrong. Try the next version
-                log.debug("API version %s was invalid", api_version)
-                continue
-            except ErrorExceededConnectionCount as e:
-                # This indicates that the connecting user has too many open TCP connections to the server. Decrease
-                # our session pool size.
+        with trace("ews.service", **self._span_attributes()) as span:
+            for api_version in self._api_versions_to_try:
+                log.debug("Trying API version %s", api_version)
+                r = self._get_response(payload=payload, api_version=api_version)
+                if self.streaming:
+                    # Let 'requests' decode raw data automatically
+                    r.raw.decode_content = True
+                t_start = time.monotonic()
                 try:
-                    self.protocol.decrease_poolsize()
-                    continue
-                except SessionPoolMinSizeReached:
-                    # We're already as low as we can go. Let the user handle this.
-                    raise e
-            finally:
-                if not self.streaming:
-                    # In streaming mode, we may not have accessed the raw stream yet. Caller must handle this.
+                    header, body = self._get_soap_parts(response=r, **parse_opts)
+                except Exception:
                     r.close()  # Release memory
-
-        raise self.NO_VALID_SERVER_VERSIONS(f"Tried versions {self._api_versions_to_try} but all were invalid")
+                    raise
+                self.protocol.metrics.observe("parse_seconds", self.SERVICE_NAME, time.monotonic() - t_start)
+                # The body may contain error messages from Exchange, but we still want to collect version info
+                if header is not None:
+                    self._update_api_version(api_version=api_version, header=header, **parse_opts)
+                try:
+                    messages = self._get_soap_messages(body=body, **parse_opts)
+                    span.set_attribute("api_version", api_version)
+                    return messages
+                except (
+                    ErrorInvalidServerVersion,
+                    ErrorIncorrectSchemaVersion,
+                    ErrorInvalidRequest,
+                    ErrorInvalidSchemaVersionForMailboxVersion,
+                ):
+                    # The guessed server version is wrong. Try the next version
+                    log.debug("API version %s was invalid", api_version)
+                    continue
+                except ErrorExceededConnectionCount as e:
+                    # This indicates that the connecting user has too many open TCP connections to the server. Decrease
+                    # our session pool size.
+                    try:
+                        self.protocol.decrease_poolsize()
+                        continue
+                    except SessionPoolMinSizeReached:
+                        # We're already as low as we can go. Let the user handle this.
+                        raise e
+                finally:
+                    if not self.streaming:
+                        # In streaming mode, we may not have accessed the raw stream yet. Caller must handle this.
+                        r.close()  # Release memory
+
+            raise self.NO_VALID_SERVER_VERSIONS(f"Tried versions {self._api_versions_to_try} but all were invalid")
 
     def _handle_backoff(self, e):
         """Take a request from the server to back off and checks the retry policy for what to do. Re-raise the
@@ -390,9 +466,10 @@ class EWSService(metaclass=abc.ABCMeta):
         # ErrorServerBusy is very often a symptom of sending too many requests. Scale back connections if possible.
         with suppress(SessionPoolMinSizeReached):
             self.protocol.decrease_poolsize()
+        self.protocol.metrics.inc("back_offs_total", self.SERVICE_NAME)
         if self.protocol.retry_policy.fail_fast:
             raise e
-        self.protocol.retry_policy.back_off(e.back_off)
+        self.protocol.back_off(e.back_off)
         # We'll warn about this later if we actually need to sleep
 
     def _update_api_version(self, api_version, header, **parse_opts):
@@ -411,6 +488,8 @@ class EWSService(metaclass=abc.ABCMeta):
         # The api_version that worked was different than our hint, or we never got a build version. Store the working
         # version.
         self._version_hint = head_version
+        if self.protocol.PERSISTENT_VERSION_CACHE:
+            version_cache[self.protocol.service_endpoint] = head_version
 
     @classmethod
     def _response_tag(cls):
@@ -430,21 +509,51 @@ class EWSService(metaclass=abc.ABCMeta):
     @classmethod
     def _get_soap_parts(cls, response, **parse_opts):
         """Split the SOAP response into its headers an body elements."""
+        with trace("ews.parse", service=cls.SERVICE_NAME, incremental=bool(parse_opts.get("incremental"))):
+            if parse_opts.get("incremental"):
+                return cls._get_incremental_soap_parts(response=response)
+            try:
+                root = to_xml(response.iter_content())
+            except ParseError as e:
+                raise SOAPError(f"Bad SOAP response: {e}")
+            header = root.find(f"{{{SOAPNS}}}Header")
+            if header is None:
+                # This is normal when the response contains SOAP-level errors
+                log.debug("No header in XML response")
+            body = root.find(f"{{{SOAPNS}}}Body")
+            if body is None:
+                raise MalformedResponseError("No Body element in SOAP response")
+            return header, body
+
+    @classmethod
+    def _get_incremental_soap_parts(cls, response):
+        """Like _get_soap_parts(), but only parse the response until the Body element starts. 'body' is actually the
+        IncrementalDocument which is passed on to _get_soap_messages().
+        """
+        doc = IncrementalDocument(response.iter_content())
+        header = None
         try:
-            root = to_xml(response.iter_content())
+            root = doc.next_child(None)
+            if root is None:
+                raise ParseError("No root element found", "<not from file>", -1, 0)
+            child = doc.next_child(root)
+            while child is not None and child.tag != f"{{{SOAPNS}}}Body":
+                if child.tag == f"{{{SOAPNS}}}Header":
+                    header = doc.complete(child)
+                child = doc.next_child(root)
         except ParseError as e:
             raise SOAPError(f"Bad SOAP response: {e}")
-        header = root.find(f"{{{SOAPNS}}}Header")
         if header is None:
             # This is normal when the response contains SOAP-level errors
             log.debug("No header in XML response")
-        body = root.find(f"{{{SOAPNS}}}Body")
-        if body is None:
+        if child is None:
             raise MalformedResponseError("No Body element in SOAP response")
-        return header, body
+        return header, doc
 
     def _get_soap_messages(self, body, **parse_opts):
         """Return the elements in the response containing the response messages. Raises any SOAP exceptions."""
+        if parse_opts.get("incremental"):
+            return self._get_incremental_soap_messages(doc=body)
         response = body.find(self._response_tag())
         if response is None:
             fault = body.find(f"{{{SOAPNS}}}Fault")
@@ -458,6 +567,45 @@ class EWSService(metaclass=abc.ABCMeta):
             return [response]
         return response_messages.findall(self._response_message_tag())
 
+    def _get_incremental_soap_messages(self, doc):
+        """Like _get_soap_messages(), but return a generator of response messages that is only parsed as far as
+        necessary. SOAP errors are still raised here, so the API version negotiation in _get_response_xml() works.
+        """
+        body = doc.root.find(f"{{{SOAPNS}}}Body")
+        try:
+            response = doc.next_child(body)
+            if response is None or response.tag != self._response_tag():
+                # Faults and other errors are small. Parse the rest of the document and handle them the normal way.
+                doc.complete(doc.root)
+                return self._get_soap_messages(body=body)
+            response_messages = doc.next_child(response, self._response_messages_tag())
+        except ParseError as e:
+            raise SOAPError(f"Bad SOAP response: {e}")
+        self._incremental_document = doc
+        if response_messages is None:
+            # Result isn't delivered in a list of FooResponseMessages, but directly in the FooResponse
+            return [doc.complete(response)]
+        return self._iter_incremental_messages(doc=doc, response_messages=response_messages)
+
+    def _iter_incremental_messages(self, doc, response_messages):
+        # A message is returned as soon as the element we want from it has started. The children of that element are
+        # parsed later, when the caller iterates over them. Messages without that element, e.g. error messages, are
+        # returned when they are complete.
+        container_name = self.paging_container_name if self.supports_paging else self.element_container_name
+        message_tag = self._response_message_tag()
+        try:
+            message = doc.next_child(response_messages)
+            while message is not None:
+                if message.tag == message_tag:
+                    if container_name is None:
+                        doc.complete(message)
+                    else:
+                        doc.next_child(message, container_name)
+                    yield message
+                message = doc.next_child(response_messages)
+        except ParseError as e:
+            raise SOAPError(f"Bad SOAP response: {e}")
+
     @classmethod
     def _raise_soap_errors(cls, fault):
         """Parse error messages contained in SOAP headers and raise as exceptions defined in this package."""
@@ -632,9 +780,17 @@ class EWSService(metaclass=abc.ABCMeta):
             if isinstance(container_or_exc, (bool, Exception)):
                 yield container_or_exc
             else:
-                for c in self._get_elements_in_container(container=container_or_exc):
+                for c in self._iter_elements_in_container(container=container_or_exc):
                     yield c
 
+    def _iter_elements_in_container(self, container):
+        """Return the response elements of the container. In incremental parsing mode, the elements are parsed one by
+        one while iterating.
+        """
+        if self._incremental_document is None or not self.returns_elements:
+            return self._get_elements_in_container(container=container)
+        return self._incremental_document.iter_children(container)
+
     @classmethod
     def _get_elements_in_container(cls, container):
         """Return a list of response elements from an XML response element container. With e.g.
@@ -674,6 +830,9 @@ class EWSAccountService(EWSService, metaclass=abc.ABCMeta):
     def _version_hint(self, value):
         self.account.version = value
 
+    def _span_attributes(self):
+        return dict(super()._span_attributes(), mailbox=self.account.primary_smtp_address)
+
     def _handle_response_cookies(self, session):
         super()._handle_response_cookies(session=session)
 
@@ -710,6 +869,10 @@ class EWSAccountService(EWSService, metaclass=abc.ABCMeta):
 
 
 class EWSPagingService(EWSAccountService):
+    # Request the remaining pages of a single folder concurrently, once the first page has told us the size of the
+    # view. The number of concurrent requests is bounded by the session pool size of the protocol.
+    CONCURRENT_PAGING = False
+
     def __init__(self, *args, **kwargs):
         self.page_size = kwargs.pop("page_size", None) or self.PAGE_SIZE
         if not isinstance(self.page_size, int):
@@ -722,7 +885,7 @@ class EWSPagingService(EWSAccountService):
         """Call a service that supports paging requests. Return a generator over all response items. Keeps track of
         all paging-related counters.
         """
-        paging_infos = {f: dict(item_count=0, next_offset=None) for f in folders}
+        paging_infos = {f: dict(item_count=0, next_offset=None, view_size=None) for f in folders}
         common_next_offset = kwargs["offset"]
         total_item_count = 0
         while True:
@@ -742,6 +905,8 @@ class EWSPagingService(EWSAccountService):
                     yield page
                     continue
                 if page is not None:
+                    if self.CONCURRENT_PAGING:
+                        paging_info["view_size"], _ = self._get_paging_values(page)
                     for elem in self._get_elems_from_page(page, max_items, total_item_count):
                         paging_info["item_count"] += 1
                         total_item_count += 1
@@ -776,6 +941,19 @@ class EWSPagingService(EWSAccountService):
             if common_next_offset is None:
                 # Paging is done for all folders
                 break
+            if self.CONCURRENT_PAGING and len(paging_infos) == 1 and self.protocol.session_pool_limit > 1:
+                # All remaining offsets are known now. Get the rest of the pages in one go.
+                (paging_info,) = paging_infos.values()
+                kwargs["folders"] = list(paging_infos.keys())
+                yield from self._get_elems_concurrently(
+                    payload_func=payload_func,
+                    max_items=max_items,
+                    kwargs=kwargs,
+                    next_offset=common_next_offset,
+                    view_size=paging_info["view_size"],
+                    total_item_count=total_item_count,
+                )
+                break
 
     @staticmethod
     def _get_paging_values(elem):
@@ -812,12 +990,15 @@ class EWSPagingService(EWSAccountService):
         return paging_elem, next_offset
 
     def _get_elems_from_page(self, elem, max_items, total_item_count):
-        container = elem.find(self.element_container_name)
+        if self._incremental_document is None:
+            container = elem.find(self.element_container_name)
+        else:
+            container = self._incremental_document.next_child(elem, self.element_container_name)
         if container is None:
             raise MalformedResponseError(
                 f"No {self.element_container_name} elements in ResponseMessage ({xml_to_str(elem)})"
             )
-        for e in self._get_elements_in_container(container=container):
+        for e in self._iter_elements_in_container(container=container):
             if max_items and total_item_count >= max_items:
                 # No need to continue. Break out of elements loop
                 log.debug("'max_items' count reached (elements)")
@@ -829,6 +1010,9 @@ class EWSPagingService(EWSAccountService):
         page.
         """
         payload = payload_func(**kwargs)
+        if self.INCREMENTAL_PARSING:
+            # Don't parse the next page before the items of the current page have been consumed
+            return self._iter_pages(payload=payload, expected_message_count=expected_message_count)
         page_elems = list(self._get_elements(payload=payload))
         if len(page_elems) != expected_message_count:
             raise MalformedResponseError(
@@ -836,6 +1020,54 @@ class EWSPagingService(EWSAccountService):
             )
         return page_elems
 
+    def _iter_pages(self, payload, expected_message_count):
+        # Like _get_pages(), but the message count can only be checked while iterating
+        page_count = 0
+        for page in self._get_elements(payload=payload):
+            page_count += 1
+            if page_count > expected_message_count:
+                break
+            yield page
+        if page_count != expected_message_count:
+            raise MalformedResponseError(f"Expected {expected_message_count} items in 'response', got {page_count}")
+
+    def _get_elems_concurrently(self, payload_func, max_items, kwargs, next_offset, view_size, total_item_count):
+        """Request the pages from 'next_offset' to the end of the view concurrently. Return a generator of the elements
+        in the pages, in the order of the pages.
+        """
+        end_offset = view_size
+        if max_items:
+            end_offset = min(end_offset, next_offset + max_items - total_item_count)
+        offsets = range(next_offset, end_offset, kwargs["page_size"])
+        if not offsets:
+            return
+        # Follow the adaptive pool size, which may have backed off after throttling
+        workers = min(self.protocol.session_pool_limit, len(offsets))
+        log.debug("Getting %s pages from offset %s with %s workers", len(offsets), next_offset, workers)
+        for elems in threaded_map(
+            lambda offset: self._get_page_elems(payload_func, dict(kwargs, offset=offset)), offsets, max_workers=workers
+        ):
+            for elem in elems:
+                if isinstance(elem, Exception):
+                    # Like in _paged_call(), don't attempt to page this folder again
+                    yield elem
+                    return
+                if max_items and total_item_count >= max_items:
+                    log.debug("'max_items' count reached (concurrent)")
+                    return
+                total_item_count += 1
+                yield elem
+
+    def _get_page_elems(self, payload_func, kwargs):
+        """Request a single page and return a list of its elements. This runs in a worker thread."""
+        svc = self._worker_copy()
+        ((page, _),) = svc._get_pages(payload_func, kwargs, 1)
+        if isinstance(page, Exception):
+            return [page]
+        if page is None:
+            return []
+        return list(svc._get_elems_from_page(page, None, 0))
+
     @staticmethod
     def _get_next_offset(paging_infos):
         next_offsets = {p["next_offset"] for p in paging_infos if p["next_offset"] is not None}
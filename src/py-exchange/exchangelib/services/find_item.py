@@ -12,6 +12,7 @@ class FindItem(EWSPagingService):
     element_container_name = f"{{{TNS}}}Items"
     paging_container_name = f"{{{MNS}}}RootFolder"
     supports_paging = True
+    CONCURRENT_PAGING = True
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
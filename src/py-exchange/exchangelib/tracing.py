@@ -0,0 +1,247 @@
+import itertools
+import logging
+import time
+from functools import wraps
+from threading import local
+
+log = logging.getLogger(__name__)
+
+
+class Tracer:
+    """Base class for tracers. A tracer is told when spans start and end, and can e.g. forward them to a tracing
+    library or log them. Override start_span() and end_span(). Both are called in the thread that runs the span.
+
+    Spans are created in these places:
+      * ews.queryset: iteration of a QuerySet
+      * ews.service: a call to a service, from sending the request to parsing the SOAP envelope of the response
+      * ews.http: each HTTP request, including retries
+      * ews.parse: parsing of the SOAP envelope
+      * ews.convert: conversion of the response XML elements to Python objects
+      * ews.protocol: creating or looking up the cached Protocol instance of a service endpoint
+      * ews.oauth2_session: creating an OAuth 2.0 session, including fetching a token
+
+    Spans that run while another span is active are its children, so e.g. all HTTP requests caused by iterating a
+    QuerySet share the trace ID of the QuerySet span. Spans of generators are only active while the generator runs, so
+    work done by the consumer between elements is never attributed to them. Child spans that run in threads started by
+    exchangelib are linked to the span that was active when the thread was started.
+
+    Tracing is disabled by default. Enable it with set_tracer():
+
+      from exchangelib.tracing import LogTracer, set_tracer
+      set_tracer(LogTracer())
+    """
+
+    def start_span(self, span):
+        pass
+
+    def end_span(self, span):
+        pass
+
+
+class LogTracer(Tracer):
+    """Logs finished spans with their duration and attributes."""
+
+    def __init__(self, level=logging.DEBUG):
+        self.level = level
+
+    def end_span(self, span):
+        log.log(
+            self.level,
+            "Span %s trace %s parent %s: %s took %.3fs %s%s",
+            span.span_id,
+            span.trace_id,
+            span.parent.span_id if span.parent else None,
+            span.name,
+            span.duration,
+            span.attributes,
+            f" (error: {span.error!r})" if span.error else "",
+        )
+
+
+_span_ids = itertools.count(1)
+_state = local()  # Holds the active span of each thread
+_tracer = None
+
+
+def set_tracer(tracer):
+    """Set the Tracer instance that receives spans. None disables tracing."""
+    global _tracer
+    if tracer is not None and not isinstance(tracer, Tracer):
+        raise TypeError(f"'tracer' {tracer!r} must be a Tracer instance")
+    _tracer = tracer
+
+
+def get_tracer():
+    return _tracer
+
+
+def current_span():
+    """Return the active span of this thread, or None."""
+    return getattr(_state, "span", None)
+
+
+class Span:
+    """A timed operation with attributes. Use it as a context manager. The span is active in the current thread until
+    it exits.
+
+    Generators must not hold a span active while they are suspended, or work that the consumer does between elements
+    would get the wrong parent. Use trace_iter() for them, which only activates the span while the generator runs.
+    """
+
+    __slots__ = (
+        "name",
+        "attributes",
+        "parent",
+        "span_id",
+        "trace_id",
+        "start_time",
+        "end_time",
+        "error",
+        "_tracer",
+        "_previous",
+    )
+
+    def __init__(self, name, attributes, tracer):
+        self.name = name
+        self.attributes = attributes
+        self.parent = None
+        self.span_id = next(_span_ids)
+        self.trace_id = self.span_id
+        self.start_time = None
+        self.end_time = None
+        self.error = None
+        self._tracer = tracer
+        self._previous = None
+
+    @property
+    def duration(self):
+        if self.start_time is None:
+            return None
+        return (self.end_time or time.monotonic()) - self.start_time
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def start(self):
+        """Start the span as a child of the active span of this thread, without activating it."""
+        self.parent = current_span()
+        if self.parent is not None:
+            self.trace_id = self.parent.trace_id
+        self.start_time = time.monotonic()
+        try:
+            self._tracer.start_span(self)
+        except Exception as e:
+            log.warning("Tracer %s failed to start span %s: %r", self._tracer, self.name, e)
+
+    def end(self, error=None):
+        self.end_time = time.monotonic()
+        if error is not None:
+            self.error = error
+        try:
+            self._tracer.end_span(self)
+        except Exception as e:
+            log.warning("Tracer %s failed to end span %s: %r", self._tracer, self.name, e)
+
+    def activate(self):
+        """Make this span the parent of spans started in this thread, until deactivate() is called."""
+        self._previous = current_span()
+        _state.span = self
+
+    def deactivate(self):
+        _state.span = self._previous
+        self._previous = None
+
+    def __enter__(self):
+        self.start()
+        self.activate()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.deactivate()
+        self.end(error=None if isinstance(exc_val, GeneratorExit) else exc_val)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.name!r}, span_id={self.span_id}, trace_id={self.trace_id})"
+
+
+class _NoopSpan:
+    """Stands in for a Span when tracing is disabled."""
+
+    __slots__ = ()
+
+    def set_attribute(self, key, value):
+        pass
+
+    def start(self):
+        pass
+
+    def end(self, error=None):
+        pass
+
+    def activate(self):
+        pass
+
+    def deactivate(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def trace(name, **attributes):
+    """Return a span context manager. This is cheap when tracing is disabled."""
+    tracer = _tracer
+    if tracer is None:
+        return NOOP_SPAN
+    return Span(name, attributes, tracer)
+
+
+def trace_iter(span, iterable):
+    """Iterate 'iterable' in 'span'. The span is only active while the next element is produced, not while the
+    consumer holds on to it. The span starts when the first element is requested, and ends when the iterable is
+    exhausted or closed.
+    """
+    iterator = iter(iterable)
+    span.start()
+    error = None
+    try:
+        while True:
+            span.activate()
+            try:
+                elem = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                span.deactivate()
+            yield elem
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        span.end(error=error)
+
+
+def bind(func):
+    """Wrap 'func' so it runs with the span that is active now as its parent span. Use this for functions that are
+    called in other threads.
+    """
+    parent = current_span()
+    if parent is None:
+        return func
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        previous = current_span()
+        _state.span = parent
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _state.span = previous
+
+    return wrapper
@@ -8,10 +8,13 @@ import time
 import xml.sax.handler  # nosec
 from base64 import b64decode, b64encode
 from codecs import BOM_UTF8
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import suppress
 from decimal import Decimal
 from functools import wraps
-from threading import get_ident
+from queue import Full, Queue
+from threading import Event, Lock, Thread, get_ident
 from urllib.parse import urlparse
 
 import isodate
@@ -33,6 +36,7 @@ from .errors import (
     RelativeRedirect,
     TransportError,
 )
+from .tracing import bind, trace
 
 log = logging.getLogger(__name__)
 xml_log = logging.getLogger(f"{__name__}.xml")
@@ -137,6 +141,121 @@ def chunkify(iterable, chunksize):
             yield chunk
 
 
+def threaded_map(func, iterable, max_workers):
+    """Like map(), but call 'func' in a pool of 'max_workers' threads. Results are yielded in the order of
+    'iterable'. Only 'max_workers' calls are in flight at any time, so results don't pile up if the consumer is slower
+    than the workers, and 'iterable' is consumed lazily. An exception in 'func' is raised when its result is due.
+
+    :param func: A function taking a single argument
+    :param iterable: The arguments to call 'func' with
+    :param max_workers: The number of threads
+    :return: A generator of results
+    """
+    args = iter(iterable)
+    func = bind(func)  # Link the spans of the workers to the span of the caller
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = deque(executor.submit(func, arg) for arg in itertools.islice(args, max_workers))
+        try:
+            while futures:
+                res = futures.popleft().result()
+                for arg in itertools.islice(args, 1):
+                    futures.append(executor.submit(func, arg))
+                yield res
+        finally:
+            for f in futures:
+                f.cancel()
+
+
+def prefetch(iterable, maxsize):
+    """Consume 'iterable' in a background thread and yield its elements. Up to 'maxsize' elements are fetched ahead of
+    the consumer, so e.g. paging can continue while the consumer is busy sending requests for the elements it already
+    has. Exceptions in the background thread are raised in the consumer. The background thread stops when the consumer
+    stops iterating.
+
+    :param iterable: The iterable to consume
+    :param maxsize: The max number of elements to fetch ahead of the consumer
+    :return: A generator of the elements in 'iterable'
+    """
+    queue = Queue(maxsize=maxsize)
+    stopped = Event()
+    end = object()  # Marks the end of 'iterable'
+
+    def _put(value):
+        # Don't block forever on a full queue if the consumer has gone away
+        while not stopped.is_set():
+            with suppress(Full):
+                queue.put(value, timeout=1)
+                return True
+        return False
+
+    def _produce():
+        try:
+            for i in iterable:
+                if not _put((i, None)):
+                    return
+        except Exception as e:
+            _put((end, e))
+        else:
+            _put((end, None))
+
+    Thread(target=bind(_produce), name="prefetch", daemon=True).start()
+    try:
+        while True:
+            i, exc = queue.get()
+            if i is end:
+                if exc is not None:
+                    raise exc
+                return
+            yield i
+    finally:
+        stopped.set()
+
+
+class SingleFlight:
+    """Let concurrent callers share a single call. While a call for a key is in flight, other callers asking for the
+    same key wait for it to finish and receive its result, or its exception, instead of making the call themselves.
+    Results are not cached. A caller arriving after the call has finished makes a new call.
+    """
+
+    def __init__(self):
+        self._calls = {}  # Maps key to (done Event, result list)
+        self._lock = Lock()
+
+    def __len__(self):
+        # The number of calls in flight
+        return len(self._calls)
+
+    def do(self, key, func):
+        """Return the result of func(). If a call for 'key' is already in flight, wait for that call instead.
+
+        :param key: A hashable identifying the call
+        :param func: A callable taking no arguments
+        :return: The return value of the call
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self._calls[key] = (Event(), [])
+        done, outcome = call
+        if is_leader:
+            try:
+                outcome.append((func(), None))
+            except Exception as e:
+                outcome.append((None, e))
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                done.set()
+        else:
+            log.debug("Waiting for call %s in flight", key)
+            done.wait()
+        result, exc = outcome[0]
+        if exc is not None:
+            raise exc
+        return result
+
+
 def peek(iterable):
     """Check if an iterable is empty and return status and the rewinded iterable.
 
@@ -553,6 +672,93 @@ def to_xml(bytes_content):
     return res
 
 
+class IncrementalDocument:
+    """Parse an XML document incrementally from bytes or a generator of bytes, using lxml.etree.iterparse(). Elements
+    are available as soon as they have started (attributes only) or ended (complete subtree), long before the whole
+    document has been received.
+
+    lxml may build the tree ahead of the events that have been handed to us, so all navigation must be done with the
+    methods of this class, which only look at the parse events. Elements found in the tree by other means may be
+    incomplete.
+
+    The document is built as a normal lxml tree, so elements must be removed when they have been consumed to keep memory
+    usage bounded. iter_children() does this for elements that are still attached to the tree when the consumer asks
+    for the next element.
+    """
+
+    def __init__(self, bytes_content):
+        if isinstance(bytes_content, bytes):
+            stream = io.BytesIO(bytes_content)
+        else:
+            stream = BytesGeneratorIO(bytes_content)
+        # Use the same settings as _forgiving_parser
+        self._events = lxml.etree.iterparse(
+            stream, events=("start", "end"), resolve_entities=False, recover=True, huge_tree=True
+        )  # nosec
+        self._open = []  # The elements that have started but not yet ended, from the root down
+        self._done = False
+        self.root = None
+
+    def _next_event(self):
+        """Parse the next start or end event. Returns (None, None) at the end of the document."""
+        if self._done:
+            return None, None
+        try:
+            event, elem = next(self._events)
+        except StopIteration:
+            self._done = True
+            self._open.clear()
+            return None, None
+        except lxml.etree.ParseError as e:
+            self._done = True
+            self._open.clear()
+            lineno, offset = getattr(e, "position", (-1, 0))
+            raise ParseError(str(e), "<not from file>", lineno, offset)
+        if event == "start":
+            if self.root is None:
+                self.root = elem
+            self._open.append(elem)
+        else:
+            self._open.pop()
+        return event, elem
+
+    def is_complete(self, elem):
+        """Return True if 'elem' has started and ended, or the document has ended."""
+        return elem not in self._open
+
+    def complete(self, elem):
+        """Parse until 'elem' has ended and return it. 'elem' must be an element that has already started."""
+        while not self.is_complete(elem):
+            event, _ = self._next_event()
+            if event is None:
+                break
+        return elem
+
+    def next_child(self, parent, tag=None):
+        """Parse until the next child of 'parent' starts and return it. Children with another tag than 'tag' are
+        skipped, if 'tag' is set. Return None if 'parent' ends first. Use None as 'parent' to get the root element.
+        """
+        while parent is None or not self.is_complete(parent):
+            event, elem = self._next_event()
+            if event is None:
+                break
+            if event == "start" and elem.getparent() is parent and (tag is None or elem.tag == tag):
+                return elem
+        return None
+
+    def iter_children(self, parent):
+        """Yield the children of 'parent' that end from now on, each as soon as it is complete."""
+        while not self.is_complete(parent):
+            event, elem = self._next_event()
+            if event is None:
+                break
+            if event == "end" and elem.getparent() is parent:
+                yield elem
+                # The consumer may hold on to the element, so don't clear it. Just don't let the tree keep growing.
+                if elem.getparent() is parent:
+                    parent.remove(elem)
+
+
 def is_xml(text, expected_prefix=b"<?xml"):
     """Lightweight test if response is an XML doc. It's better to be fast than correct here.
 
@@ -736,7 +942,9 @@ with suppress(ImportError):
     TLS_ERRORS += (OpenSSL.SSL.Error,)
 
 
-def post_ratelimited(protocol, session, url, headers, data, allow_redirects=False, stream=False, timeout=None):
+def post_ratelimited(
+    protocol, session, url, headers, data, allow_redirects=False, stream=False, timeout=None, service_name=None
+):
     """There are two error-handling policies implemented here: a fail-fast policy intended for stand-alone scripts which
     fails on all responses except HTTP 200. The other policy is intended for long-running tasks that need to respect
     rate-limiting errors from the server and paper over outages of up to 1 hour.
@@ -769,11 +977,13 @@ def post_ratelimited(protocol, session, url, headers, data, allow_redirects=Fals
     :param allow_redirects:  (Default value = False)
     :param stream:  (Default value = False)
     :param timeout:
+    :param service_name: The name of the service we are calling, used to label the metrics of the protocol
 
     :return:
     """
     if not timeout:
         timeout = protocol.TIMEOUT
+    metrics, metrics_label = protocol.metrics, service_name or "unknown"
     thread_id = get_ident()
     wait = RETRY_WAIT  # Initial retry wait. We double the value on each retry
     retry = 0
@@ -819,8 +1029,9 @@ Response XML: %(xml_response)s"""
     t_start = time.monotonic()
     try:
         while True:
-            backed_off = _back_off_if_needed(protocol.retry_policy.back_off_until)
+            backed_off = protocol.back_off_scheduler.wait(until=protocol.retry_policy.back_off_until)
             if backed_off:
+                metrics.inc("back_off_waits_total", metrics_label)
                 # We may have slept for a long time. Renew the session.
                 session = protocol.renew_session(session)
             log.debug(
@@ -832,44 +1043,61 @@ Response XML: %(xml_response)s"""
                 url,
                 wait,
             )
-            d_start = time.monotonic()
-            # Always create a dummy response for logging purposes, in case we fail in the following
-            r = DummyResponse(url=url, request_headers=headers)
-            kwargs = dict(url=url, headers=headers, data=data, allow_redirects=False, timeout=timeout, stream=stream)
-            if isinstance(session, OAuth2Session):
-                # Fix token refreshing bug. Reported as https://github.com/requests/requests-oauthlib/issues/498
-                kwargs.update(session.auto_refresh_kwargs)
-            try:
-                r = session.post(**kwargs)
-            except TLS_ERRORS as e:
-                # Don't retry on TLS errors. They will most likely be persistent.
-                raise TransportError(str(e))
-            except CONNECTION_ERRORS as e:
-                log.debug("Session %s thread %s: connection error POST'ing to %s", session.session_id, thread_id, url)
-                r = DummyResponse(url=url, headers={"TimeoutException": e}, request_headers=headers)
-            except TokenExpiredError as e:
-                log.debug("Session %s thread %s: OAuth token expired; refreshing", session.session_id, thread_id)
-                r = DummyResponse(url=url, headers={"TokenExpiredError": e}, request_headers=headers, status_code=401)
-            except KeyError as e:
-                if e.args[0] != "www-authenticate":
-                    raise
-                log.debug("Session %s thread %s: auth headers missing from %s", session.session_id, thread_id, url)
-                r = DummyResponse(url=url, headers={"KeyError": e}, request_headers=headers)
-            finally:
-                log_vals.update(
-                    retry=retry,
-                    wait=wait,
-                    session_id=session.session_id,
-                    url=str(r.url),
-                    response_time=time.monotonic() - d_start,
-                    status_code=r.status_code,
-                    request_headers=r.request.headers,
-                    response_headers=r.headers,
-                )
-                xml_log_vals.update(
-                    xml_request=data,
-                    xml_response="[STREAMING]" if stream else r.content,
+            with trace(
+                "ews.http", service=service_name, url=url, retry=retry, session_id=session.session_id
+            ) as span:
+                d_start = time.monotonic()
+                # Always create a dummy response for logging purposes, in case we fail in the following
+                r = DummyResponse(url=url, request_headers=headers)
+                kwargs = dict(
+                    url=url, headers=headers, data=data, allow_redirects=False, timeout=timeout, stream=stream
                 )
+                if isinstance(session, OAuth2Session):
+                    # Fix token refreshing bug. Reported as https://github.com/requests/requests-oauthlib/issues/498
+                    kwargs.update(session.auto_refresh_kwargs)
+                try:
+                    r = session.post(**kwargs)
+                except TLS_ERRORS as e:
+                    # Don't retry on TLS errors. They will most likely be persistent.
+                    raise TransportError(str(e))
+                except CONNECTION_ERRORS as e:
+                    log.debug(
+                        "Session %s thread %s: connection error POST'ing to %s", session.session_id, thread_id, url
+                    )
+                    r = DummyResponse(url=url, headers={"TimeoutException": e}, request_headers=headers)
+                except TokenExpiredError as e:
+                    log.debug("Session %s thread %s: OAuth token expired; refreshing", session.session_id, thread_id)
+                    r = DummyResponse(
+                        url=url, headers={"TokenExpiredError": e}, request_headers=headers, status_code=401
+                    )
+                except KeyError as e:
+                    if e.args[0] != "www-authenticate":
+                        raise
+                    log.debug("Session %s thread %s: auth headers missing from %s", session.session_id, thread_id, url)
+                    r = DummyResponse(url=url, headers={"KeyError": e}, request_headers=headers)
+                finally:
+                    log_vals.update(
+                        retry=retry,
+                        wait=wait,
+                        session_id=session.session_id,
+                        url=str(r.url),
+                        response_time=time.monotonic() - d_start,
+                        status_code=r.status_code,
+                        request_headers=r.request.headers,
+                        response_headers=r.headers,
+                    )
+                    xml_log_vals.update(
+                        xml_request=data,
+                        xml_response="[STREAMING]" if stream else r.content,
+                    )
+                span.set_attribute("status_code", r.status_code)
+
+            metrics.inc("requests_total", metrics_label)
+            metrics.observe("request_seconds", metrics_label, log_vals["response_time"])
+            if data:
+                metrics.inc("request_bytes_total", metrics_label, len(data))
+            if not stream and r.content:
+                metrics.inc("response_bytes_total", metrics_label, len(r.content))
             log.debug(log_msg, log_vals)
             xml_log.debug(xml_log_msg, xml_log_vals)
             if _need_new_credentials(response=r):
@@ -888,7 +1116,9 @@ Response XML: %(xml_response)s"""
                     wait,
                 )
                 wait = _retry_after(r, wait)
-                protocol.retry_policy.back_off(wait)
+                protocol.back_off(wait)
+                protocol.register_throttling()
+                metrics.inc("retries_total", metrics_label)
                 retry += 1
                 wait *= 2  # Increase delay for every retry
                 continue
@@ -917,6 +1147,7 @@ Response XML: %(xml_response)s"""
             log.error("%s: %s\n%s\n%s", e.__class__.__name__, str(e), log_msg % log_vals, xml_log_msg % xml_log_vals)
             raise
     log.debug("Session %s thread %s: Useful response from %s", session.session_id, thread_id, url)
+    protocol.register_response_time(log_vals["response_time"])
     return r, session
 
 
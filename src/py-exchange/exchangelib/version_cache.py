@@ -0,0 +1,147 @@
+import logging
+import os
+import sqlite3
+import tempfile
+from threading import RLock
+
+from .version import Build, Version
+
+log = logging.getLogger(__name__)
+
+
+class VersionCache:
+    """Persists the service endpoint -> server version translation to the filesystem, so short-lived processes talking
+    to a known server don't need to guess the server version with a ResolveNames request every time they start.
+
+    The cache is only a starting point. If a response reports a different version in its SOAP headers, the services
+    update the entry. Like the autodiscover cache, the persistent storage must not contain any sensitive information.
+    Endpoint, build numbers and API version are OK to cache because the server reports them in every response.
+
+    The persistent storage is an SQLite database in WAL mode, like the autodiscover cache, so many processes can use
+    it at the same time. If the database stays locked by other processes for more than DB_TIMEOUT seconds, the
+    persistent storage is skipped and the version is guessed as usual.
+
+    This cache is opt-in. Set BaseProtocol.PERSISTENT_VERSION_CACHE to True to enable it.
+    """
+
+    # Bump this if the format of the cached data changes
+    FORMAT_VERSION = 2
+    # Seconds to wait for another process holding a write lock on the database
+    DB_TIMEOUT = 10
+
+    def __init__(self):
+        self._versions = {}  # In-process copy of the persistent storage, mapping service endpoint to Version
+        self._lock = RLock()
+
+    @property
+    def _storage_file(self):
+        from .autodiscover.cache import shelve_filename
+
+        return os.path.join(
+            tempfile.gettempdir(), shelve_filename(name="versions", version=self.FORMAT_VERSION) + ".sqlite3"
+        )
+
+    @staticmethod
+    def _key(service_endpoint):
+        return str(service_endpoint).lower()
+
+    def _db(self):
+        from .autodiscover.cache import sqlite_open_with_failover
+
+        # Don't change this schema without bumping FORMAT_VERSION
+        return sqlite_open_with_failover(
+            self._storage_file,
+            schema="CREATE TABLE IF NOT EXISTS versions (endpoint TEXT PRIMARY KEY, major_version INTEGER, "
+            "minor_version INTEGER, major_build INTEGER, minor_build INTEGER, api_version TEXT)",
+            timeout=self.DB_TIMEOUT,
+        )
+
+    def clear(self):
+        # Wipe the entire cache
+        with self._lock:
+            with self._db() as db:
+                db.execute("DELETE FROM versions")
+            self._versions.clear()
+
+    def __len__(self):
+        return len(self._versions)
+
+    def __contains__(self, service_endpoint):
+        return self.get(service_endpoint) is not None
+
+    def get(self, service_endpoint, default=None):
+        key = self._key(service_endpoint)
+        with self._lock:
+            version = self._versions.get(key)
+            if version:
+                return version.copy()
+            try:
+                with self._db() as db:
+                    row = db.execute(
+                        "SELECT major_version, minor_version, major_build, minor_build, api_version FROM versions "
+                        "WHERE endpoint = ?",
+                        (key,),
+                    ).fetchone()
+            except sqlite3.OperationalError as e:
+                log.warning("Cannot read cached version for %s (%r)", service_endpoint, e)
+                return default
+            if row is None:
+                return default
+            try:
+                major_version, minor_version, major_build, minor_build, api_version = row
+                version = Version(
+                    build=Build(major_version, minor_version, major_build, minor_build), api_version=api_version
+                )
+            except (TypeError, ValueError) as e:
+                log.warning("Ignoring invalid cached version for %s (%r)", service_endpoint, e)
+                return default
+            self._versions[key] = version
+            return version.copy()
+
+    def __getitem__(self, service_endpoint):
+        version = self.get(service_endpoint)
+        if version is None:
+            raise KeyError(service_endpoint)
+        return version
+
+    def __setitem__(self, service_endpoint, version):
+        if not version or not version.build:
+            # A version without a build is only a guess. Don't persist it.
+            return
+        key = self._key(service_endpoint)
+        with self._lock:
+            cached = self._versions.get(key)
+            if cached is not None and cached == version:
+                return
+            log.debug("Service endpoint %s: caching version %s", service_endpoint, version)
+            build = version.build
+            try:
+                with self._db() as db:
+                    db.execute(
+                        "INSERT OR REPLACE INTO versions VALUES (?, ?, ?, ?, ?, ?)",
+                        (
+                            key,
+                            build.major_version,
+                            build.minor_version,
+                            build.major_build,
+                            build.minor_build,
+                            version.api_version,
+                        ),
+                    )
+            except sqlite3.OperationalError as e:
+                log.warning("Cannot cache version for %s (%r)", service_endpoint, e)
+            self._versions[key] = version.copy()
+
+    def __delitem__(self, service_endpoint):
+        # Don't fail on non-existing entries
+        key = self._key(service_endpoint)
+        with self._lock:
+            with self._db() as db:
+                db.execute("DELETE FROM versions WHERE endpoint = ?", (key,))
+            self._versions.pop(key, None)
+
+    def __str__(self):
+        return str(self._versions)
+
+
+version_cache = VersionCache()
@@ -0,0 +1,147 @@
+import asyncio
+import threading
+import unittest
+from collections import defaultdict
+
+from benchmarks.mock_ews import CALENDAR_FOLDER_ID, Calendar, MockServer
+
+from exchangelib import DELEGATE, Account, Configuration, Credentials, EWSTimeZone
+from exchangelib.aio import AsyncAccount, AsyncFolder, AsyncQuerySet, WorkerPool
+from exchangelib.errors import MalformedResponseError
+from exchangelib.folders import Calendar as CalendarFolder
+from exchangelib.folders import Root
+from exchangelib.services import FindItem
+from exchangelib.tracing import Tracer, set_tracer
+from exchangelib.transport import NOAUTH
+from exchangelib.version import Build, Version
+
+
+class ThreadRecordingTracer(Tracer):
+    def __init__(self):
+        self.threads = defaultdict(set)  # Maps trace ID to the threads that started spans in the trace
+        self._lock = threading.Lock()
+
+    def start_span(self, span):
+        with self._lock:
+            self.threads[span.trace_id].add(threading.current_thread().name)
+
+
+class AsyncTest(unittest.TestCase):
+    SIZE = 50
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MockServer(Calendar(cls.SIZE)).__enter__()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.__exit__()
+
+    def get_account(self, service_endpoint=None, max_connections=2):
+        config = Configuration(
+            service_endpoint=service_endpoint or self.server.service_endpoint,
+            credentials=Credentials("benchmark", "benchmark"),
+            auth_type=NOAUTH,
+            max_connections=max_connections,
+            version=Version(build=Build(15, 20, 5452, 24)),  # No version guessing
+        )
+        return Account(
+            "benchmark@example.com",
+            config=config,
+            autodiscover=False,
+            access_type=DELEGATE,
+            default_timezone=EWSTimeZone("UTC"),
+        )
+
+    def test_folder_attribute(self):
+        async def run():
+            return await AsyncAccount(self.get_account()).calendar
+
+        calendar = asyncio.run(run())
+        self.assertIsInstance(calendar, AsyncFolder)
+        self.assertEqual(calendar.id, CALENDAR_FOLDER_ID)
+
+    def test_iteration_order(self):
+        account = self.get_account()
+
+        async def run():
+            qs = (await AsyncAccount(account).calendar).all()
+            self.assertIsInstance(qs, AsyncQuerySet)
+            qs.queryset.page_size = 7  # Several batches, and a short last batch
+            return [item.id async for item in qs]
+
+        self.assertEqual(asyncio.run(run()), [f"item-{i}" for i in range(self.SIZE)])
+
+    def test_fetch_order(self):
+        # The input order must be kept, also across chunks
+        ids = [(f"item-{i}", None) for i in (17, 3, 42, 0, 29, 11, 8)]
+
+        async def run():
+            return await AsyncAccount(self.get_account()).fetch(ids, chunk_size=2)
+
+        self.assertEqual([item.id for item in asyncio.run(run())], [i for i, _ in ids])
+
+    def test_call_exception(self):
+        # The mock server fails on IDs it cannot parse
+        async def run():
+            return await AsyncAccount(self.get_account()).fetch([("invalid", None)])
+
+        with self.assertRaises(MalformedResponseError):
+            asyncio.run(run())
+
+    def test_iteration_exception(self):
+        # Build the folder by hand, so the first request is the FindItem of the iteration
+        account = self.get_account(service_endpoint=self.server.url + "/missing")
+        folder = CalendarFolder(root=Root(account=account, id="root-id"), id=CALENDAR_FOLDER_ID)
+
+        async def run():
+            return [item async for item in AsyncQuerySet(folder.all())]
+
+        with self.assertRaises(MalformedResponseError):
+            asyncio.run(run())
+
+    def test_iteration_is_pinned(self):
+        # All requests of an iteration run on the same worker, also when other iterations share the pool
+        FindItem.CONCURRENT_PAGING, concurrent_paging = False, FindItem.CONCURRENT_PAGING
+        self.addCleanup(setattr, FindItem, "CONCURRENT_PAGING", concurrent_paging)
+        tracer = ThreadRecordingTracer()
+        set_tracer(tracer)
+        self.addCleanup(set_tracer, None)
+        account = self.get_account(max_connections=2)
+        calendar = account.calendar
+        workers = WorkerPool(size=2)
+
+        async def iterate():
+            # Only simple fields, so all requests are FindItem requests without a prefetch thread
+            qs = AsyncQuerySet(calendar.all().only("subject"), workers=workers)
+            qs.queryset.page_size = 5
+            n = 0
+            async for _ in qs:
+                n += 1
+                await asyncio.sleep(0)  # Let the other iterations have a turn
+            return n
+
+        async def run():
+            return await asyncio.gather(*(iterate() for _ in range(4)))
+
+        try:
+            self.assertEqual(asyncio.run(run()), [self.SIZE] * 4)
+        finally:
+            workers.shutdown()
+        iterations = [threads for threads in tracer.threads.values() if any(t.startswith("ews-aio") for t in threads)]
+        self.assertEqual(len(iterations), 4)
+        for threads in iterations:
+            self.assertEqual(len(threads), 1)
+        # Four iterations shared two threads
+        self.assertEqual(len(set.union(*iterations)), 2)
+
+    def test_worker_pool_size(self):
+        pool = WorkerPool(size=2)
+        self.addCleanup(pool.shutdown)
+
+        async def run():
+            return await asyncio.gather(*(pool.run(lambda: threading.current_thread().name) for _ in range(20)))
+
+        self.assertEqual(len(set(asyncio.run(run()))), 2)
+        with self.assertRaises(ValueError):
+            WorkerPool(size=0)
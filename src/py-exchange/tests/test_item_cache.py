@@ -0,0 +1,108 @@
+import pickle
+import unittest
+
+from exchangelib.item_cache import ItemCache
+from exchangelib.items import CalendarItem
+
+
+class ItemCacheTest(unittest.TestCase):
+    FIELDS = frozenset(["subject", "body"])
+
+    @staticmethod
+    def get_item(i, changekey="ck-1", subject="XXX"):
+        return CalendarItem(id=f"item-{i}", changekey=changekey, subject=subject)
+
+    def test_sizes(self):
+        with self.assertRaises(ValueError):
+            ItemCache(max_entries=0)
+        with self.assertRaises(ValueError):
+            ItemCache(max_size=0)
+
+    def test_hit(self):
+        cache = ItemCache()
+        cache.put(self.get_item(1), self.FIELDS)
+        self.assertIn("item-1", cache)
+        item = cache.get("item-1", "ck-1", self.FIELDS)
+        self.assertEqual((item.id, item.changekey, item.subject), ("item-1", "ck-1", "XXX"))
+        # A subset of the cached fields is also a hit
+        self.assertIsNotNone(cache.get("item-1", "ck-1", {"subject"}))
+        self.assertEqual((cache.hits, cache.misses), (2, 0))
+
+    def test_miss(self):
+        cache = ItemCache()
+        cache.put(self.get_item(1), self.FIELDS)
+        self.assertIsNone(cache.get("item-2", "ck-1", self.FIELDS))
+        # The item has changed on the server
+        self.assertIsNone(cache.get("item-1", "ck-2", self.FIELDS))
+        # We can't tell if the item has changed
+        self.assertIsNone(cache.get("item-1", None, self.FIELDS))
+        # The item was fetched without some of the requested fields
+        self.assertIsNone(cache.get("item-1", "ck-1", self.FIELDS | {"location"}))
+        self.assertEqual((cache.hits, cache.misses), (0, 4))
+
+    def test_put_replaces(self):
+        cache = ItemCache()
+        cache.put(self.get_item(1), self.FIELDS)
+        cache.put(self.get_item(1, changekey="ck-2", subject="YYY"), self.FIELDS)
+        self.assertEqual(len(cache), 1)
+        self.assertIsNone(cache.get("item-1", "ck-1", self.FIELDS))
+        self.assertEqual(cache.get("item-1", "ck-2", self.FIELDS).subject, "YYY")
+        self.assertEqual(cache.size, ItemCache.item_size(self.get_item(1, subject="YYY")))
+
+    def test_no_id(self):
+        cache = ItemCache()
+        cache.put(CalendarItem(subject="XXX"), self.FIELDS)
+        cache.put(self.get_item(1, changekey=None), self.FIELDS)
+        self.assertEqual(len(cache), 0)
+
+    def test_max_entries(self):
+        cache = ItemCache(max_entries=2)
+        cache.put(self.get_item(1), self.FIELDS)
+        cache.put(self.get_item(2), self.FIELDS)
+        # Mark item 1 as recently used, so item 2 is evicted first
+        cache.get("item-1", "ck-1", self.FIELDS)
+        cache.put(self.get_item(3), self.FIELDS)
+        self.assertEqual(len(cache), 2)
+        self.assertIn("item-1", cache)
+        self.assertNotIn("item-2", cache)
+        self.assertIn("item-3", cache)
+
+    def test_max_size(self):
+        item_size = ItemCache.item_size(self.get_item(1))
+        cache = ItemCache(max_size=2 * item_size)
+        for i in range(3):
+            cache.put(self.get_item(i), self.FIELDS)
+        self.assertEqual(len(cache), 2)
+        self.assertNotIn("item-0", cache)
+        self.assertEqual(cache.size, 2 * item_size)
+        # Items that are larger than the cache are not cached
+        cache.put(self.get_item(3, subject="X" * 2 * item_size), self.FIELDS)
+        self.assertNotIn("item-3", cache)
+        self.assertEqual(len(cache), 2)
+
+    def test_copies(self):
+        cache = ItemCache()
+        item = self.get_item(1)
+        cache.put(item, self.FIELDS)
+        item.subject = "YYY"
+        cached = cache.get("item-1", "ck-1", self.FIELDS)
+        self.assertEqual(cached.subject, "XXX")
+        cached.subject = "ZZZ"
+        self.assertEqual(cache.get("item-1", "ck-1", self.FIELDS).subject, "XXX")
+
+    def test_delete(self):
+        cache = ItemCache()
+        cache.put(self.get_item(1), self.FIELDS)
+        cache.put(self.get_item(2), self.FIELDS)
+        del cache["item-1"]
+        del cache["item-1"]  # Non-existing entries are ignored
+        self.assertNotIn("item-1", cache)
+        self.assertEqual(cache.size, ItemCache.item_size(self.get_item(2)))
+        cache.clear()
+        self.assertEqual((len(cache), cache.size), (0, 0))
+
+    def test_pickle(self):
+        cache = ItemCache()
+        cache.put(self.get_item(1), self.FIELDS)
+        cache = pickle.loads(pickle.dumps(cache))
+        self.assertEqual(cache.get("item-1", "ck-1", self.FIELDS).subject, "XXX")
@@ -0,0 +1,156 @@
+import datetime
+import threading
+import time
+import unittest
+
+from exchangelib.protocol import AdaptivePoolSize, BackOffScheduler
+
+
+class AdaptivePoolSizeTest(unittest.TestCase):
+    def register_window(self, pool, seconds):
+        for _ in range(pool.WINDOW):
+            pool.register_response_time(seconds)
+
+    def test_sizes(self):
+        with self.assertRaises(ValueError):
+            AdaptivePoolSize(min_size=0, max_size=4)
+        with self.assertRaises(ValueError):
+            AdaptivePoolSize(min_size=5, max_size=4)
+        self.assertEqual(AdaptivePoolSize(min_size=2, max_size=4).limit, 2)
+
+    def test_increase(self):
+        pool = AdaptivePoolSize(min_size=1, max_size=3)
+        # Nothing happens until a full window has been collected
+        for _ in range(pool.WINDOW - 1):
+            pool.register_response_time(0.1)
+        self.assertEqual(pool.limit, 1)
+        pool.register_response_time(0.1)
+        self.assertEqual(pool.limit, 2)
+        # Response times within the tolerance still allow one more session, up to 'max_size'
+        self.register_window(pool, 0.1 * pool.LATENCY_TOLERANCE)
+        self.assertEqual(pool.limit, 3)
+        self.register_window(pool, 0.1)
+        self.assertEqual(pool.limit, 3)
+
+    def test_latency_decrease(self):
+        pool = AdaptivePoolSize(min_size=1, max_size=10)
+        for _ in range(8):
+            self.register_window(pool, 0.1)
+        self.assertEqual(pool.limit, 9)
+        self.register_window(pool, 0.2)
+        self.assertEqual(pool.limit, 4)
+        # The baseline is reset, so the slower response times are the new baseline
+        self.assertIsNone(pool._baseline)
+        self.register_window(pool, 0.2)
+        self.assertEqual(pool.limit, 5)
+        self.assertEqual(pool._baseline, 0.2)
+
+    def test_baseline_is_kept_when_growing(self):
+        # Latency that creeps up a little per session is noticed when it has grown beyond the tolerance in total
+        pool = AdaptivePoolSize(min_size=1, max_size=10)
+        for seconds in (0.10, 0.12, 0.14):
+            self.register_window(pool, seconds)
+        self.assertEqual(pool.limit, 4)
+        self.assertEqual(pool._baseline, 0.10)
+        self.register_window(pool, 0.16)
+        self.assertEqual(pool.limit, 2)
+
+    def test_p95_ignores_outliers(self):
+        pool = AdaptivePoolSize(min_size=1, max_size=10)
+        self.register_window(pool, 0.1)
+        pool.register_response_time(10)
+        for _ in range(pool.WINDOW - 1):
+            pool.register_response_time(0.1)
+        self.assertEqual(pool.limit, 3)
+
+    def test_throttling(self):
+        pool = AdaptivePoolSize(min_size=2, max_size=10)
+        for _ in range(8):
+            self.register_window(pool, 0.1)
+        self.assertEqual(pool.limit, 10)
+        pool.register_throttling()
+        self.assertEqual(pool.limit, 5)
+        pool.register_throttling()
+        self.assertEqual(pool.limit, 2)
+        pool.register_throttling()
+        self.assertEqual(pool.limit, 2)
+
+    def test_throttling_discards_window(self):
+        pool = AdaptivePoolSize(min_size=1, max_size=10)
+        for _ in range(pool.WINDOW - 1):
+            pool.register_response_time(0.1)
+        pool.register_throttling()
+        pool.register_response_time(0.1)
+        self.assertEqual(pool.limit, 1)
+
+
+class BackOffSchedulerTest(unittest.TestCase):
+    def get_scheduler(self):
+        scheduler = BackOffScheduler(service_endpoint="https://example.com/EWS/Exchange.asmx")
+        scheduler.MAX_JITTER = 0
+        return scheduler
+
+    @staticmethod
+    def in_seconds(seconds):
+        return datetime.datetime.now() + datetime.timedelta(seconds=seconds)
+
+    def test_for_endpoint(self):
+        scheduler = BackOffScheduler.for_endpoint("https://example.com/EWS/Exchange.asmx")
+        self.assertIs(scheduler, BackOffScheduler.for_endpoint("https://EXAMPLE.com/EWS/Exchange.asmx"))
+        self.assertIsNot(scheduler, BackOffScheduler.for_endpoint("https://example.org/EWS/Exchange.asmx"))
+
+    def test_back_off(self):
+        scheduler = self.get_scheduler()
+        self.assertIsNone(scheduler.back_off_until)
+        until = self.in_seconds(60)
+        scheduler.back_off(until)
+        self.assertEqual(scheduler.back_off_until, until)
+        # A shorter window does not cut the current window short
+        scheduler.back_off(self.in_seconds(10))
+        self.assertEqual(scheduler.back_off_until, until)
+        later = self.in_seconds(120)
+        scheduler.back_off(later)
+        self.assertEqual(scheduler.back_off_until, later)
+        scheduler.back_off(None)
+        self.assertEqual(scheduler.back_off_until, later)
+
+    def test_expired(self):
+        scheduler = self.get_scheduler()
+        scheduler.back_off(self.in_seconds(-1))
+        self.assertIsNone(scheduler.back_off_until)
+        self.assertFalse(scheduler.wait())
+
+    def test_wait(self):
+        scheduler = self.get_scheduler()
+        scheduler.back_off(self.in_seconds(0.2))
+        t1 = time.monotonic()
+        self.assertTrue(scheduler.wait())
+        self.assertGreaterEqual(time.monotonic() - t1, 0.15)
+        self.assertEqual(scheduler.queue_depth, 0)
+        self.assertIsNone(scheduler.back_off_until)
+
+    def test_wait_extends_window(self):
+        scheduler = self.get_scheduler()
+        t1 = time.monotonic()
+        self.assertTrue(scheduler.wait(until=self.in_seconds(0.2)))
+        self.assertGreaterEqual(time.monotonic() - t1, 0.15)
+
+    def test_reset(self):
+        scheduler = self.get_scheduler()
+        scheduler.back_off(self.in_seconds(60))
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(scheduler.wait())) for _ in range(3)]
+        for t in threads:
+            t.start()
+        for _ in range(100):
+            if scheduler.queue_depth == 3:
+                break
+            time.sleep(0.01)
+        self.assertEqual(scheduler.queue_depth, 3)
+        t1 = time.monotonic()
+        scheduler.reset()
+        for t in threads:
+            t.join(timeout=5)
+        self.assertLess(time.monotonic() - t1, 5)
+        self.assertEqual(results, [True] * 3)
+        self.assertEqual(scheduler.queue_depth, 0)
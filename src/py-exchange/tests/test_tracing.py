@@ -0,0 +1,80 @@
+import unittest
+
+from exchangelib.tracing import Tracer, current_span, set_tracer, trace, trace_iter
+
+
+class RecordingTracer(Tracer):
+    def __init__(self):
+        self.ended = []
+
+    def end_span(self, span):
+        self.ended.append(span)
+
+
+class TracingTest(unittest.TestCase):
+    def setUp(self):
+        self.tracer = RecordingTracer()
+        set_tracer(self.tracer)
+        self.addCleanup(set_tracer, None)
+
+    def _gen(self, name, n):
+        # A generator that creates a child span for each element, like paging requests do
+        for i in range(n):
+            with trace("child", gen=name, i=i):
+                pass
+            yield i
+
+    def test_nested_spans(self):
+        with trace("outer") as outer:
+            with trace("inner") as inner:
+                self.assertEqual(current_span(), inner)
+            self.assertEqual(current_span(), outer)
+        self.assertIsNone(current_span())
+        self.assertEqual(inner.parent, outer)
+        self.assertEqual(inner.trace_id, outer.trace_id)
+
+    def test_interleaved_generators(self):
+        # Spans of suspended generators must not leak into the consumer, or into other generators
+        span_a, span_b = trace("a"), trace("b")
+        gen_a = trace_iter(span_a, self._gen("a", 3))
+        gen_b = trace_iter(span_b, self._gen("b", 3))
+        with trace("consumer") as consumer:
+            for _ in range(3):
+                next(gen_a)
+                self.assertEqual(current_span(), consumer)
+                next(gen_b)
+                self.assertEqual(current_span(), consumer)
+                with trace("work") as work:
+                    pass
+                self.assertEqual(work.parent, consumer)
+            self.assertEqual(list(gen_a), [])
+            self.assertEqual(list(gen_b), [])
+        self.assertIsNone(current_span())
+        self.assertEqual(span_a.parent, consumer)
+        self.assertEqual(span_b.parent, consumer)
+        children = [s for s in self.tracer.ended if s.name == "child"]
+        self.assertEqual(len(children), 6)
+        for child in children:
+            self.assertEqual(child.parent, span_a if child.attributes["gen"] == "a" else span_b)
+        self.assertIsNotNone(span_a.end_time)
+        self.assertIsNotNone(span_b.end_time)
+
+    def test_closed_generator(self):
+        span = trace("gen")
+        gen = trace_iter(span, self._gen("a", 3))
+        next(gen)
+        gen.close()
+        self.assertIsNone(current_span())
+        self.assertIsNotNone(span.end_time)
+        self.assertIsNone(span.error)
+
+    def test_failing_generator(self):
+        def fail():
+            yield 1
+            raise ValueError("XXX")
+
+        span = trace("gen")
+        with self.assertRaises(ValueError):
+            list(trace_iter(span, fail()))
+        self.assertIsNone(current_span())
+        self.assertIsInstance(span.error, ValueError)
@@ -0,0 +1,176 @@
+import threading
+import time
+import unittest
+
+from exchangelib.util import IncrementalDocument, ParseError, SingleFlight, prefetch, threaded_map
+
+
+class ThreadedMapTest(unittest.TestCase):
+    def test_order(self):
+        # Later calls finish first, but results come in the order of the input
+        def func(i):
+            time.sleep(0.01 * (5 - i))
+            return i * 10
+
+        self.assertEqual(list(threaded_map(func, range(5), max_workers=3)), [0, 10, 20, 30, 40])
+
+    def test_max_workers(self):
+        lock = threading.Lock()
+        running, peak = [0], [0]
+
+        def func(i):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.01)
+            with lock:
+                running[0] -= 1
+            return i
+
+        self.assertEqual(list(threaded_map(func, range(10), max_workers=3)), list(range(10)))
+        self.assertLessEqual(peak[0], 3)
+
+    def test_exception(self):
+        # Results before the failing call are returned, then the exception is raised
+        def func(i):
+            if i == 2:
+                raise ValueError("XXX")
+            return i
+
+        res = threaded_map(func, range(5), max_workers=2)
+        self.assertEqual(next(res), 0)
+        self.assertEqual(next(res), 1)
+        with self.assertRaises(ValueError):
+            next(res)
+
+
+class PrefetchTest(unittest.TestCase):
+    def test_order(self):
+        self.assertEqual(list(prefetch(iter(range(100)), maxsize=7)), list(range(100)))
+
+    def test_runs_ahead(self):
+        consumed = []
+
+        def gen():
+            for i in range(10):
+                consumed.append(i)
+                yield i
+
+        res = prefetch(gen(), maxsize=3)
+        self.assertEqual(next(res), 0)
+        for _ in range(100):
+            if len(consumed) >= 4:
+                break
+            time.sleep(0.01)
+        # One element in our hands, 'maxsize' elements in the queue
+        self.assertGreaterEqual(len(consumed), 4)
+        self.assertLessEqual(len(consumed), 5)
+        res.close()
+
+    def test_exception(self):
+        def gen():
+            yield 1
+            yield 2
+            raise ValueError("XXX")
+
+        res = prefetch(gen(), maxsize=10)
+        self.assertEqual(next(res), 1)
+        self.assertEqual(next(res), 2)
+        with self.assertRaises(ValueError):
+            next(res)
+
+
+class SingleFlightTest(unittest.TestCase):
+    def _run_concurrently(self, flight, key, func, n=5):
+        # Start 'n' callers of the same key while the first call is in flight
+        started, release = threading.Event(), threading.Event()
+        results = [None] * n
+
+        def leader_func():
+            started.set()
+            release.wait()
+            return func()
+
+        def caller(i):
+            try:
+                results[i] = flight.do(key, leader_func if i == 0 else func)
+            except Exception as e:
+                results[i] = e
+
+        threads = [threading.Thread(target=caller, args=(0,))]
+        threads[0].start()
+        started.wait()
+        for i in range(1, n):
+            threads.append(threading.Thread(target=caller, args=(i,)))
+            threads[i].start()
+        time.sleep(0.05)  # Let the followers reach do()
+        release.set()
+        for t in threads:
+            t.join()
+        return results
+
+    def test_coalescing(self):
+        flight = SingleFlight()
+        calls = []
+
+        def func():
+            calls.append(1)
+            return "XXX"
+
+        self.assertEqual(self._run_concurrently(flight, "key", func), ["XXX"] * 5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(flight), 0)
+
+    def test_exception(self):
+        flight = SingleFlight()
+        error = ValueError("XXX")
+
+        def func():
+            raise error
+
+        self.assertEqual(self._run_concurrently(flight, "key", func), [error] * 5)
+        self.assertEqual(len(flight), 0)
+
+    def test_no_caching(self):
+        flight = SingleFlight()
+        self.assertEqual(flight.do("key", lambda: 1), 1)
+        self.assertEqual(flight.do("key", lambda: 2), 2)
+
+    def test_other_keys(self):
+        flight = SingleFlight()
+        self.assertEqual(flight.do("a", lambda: 1), 1)
+        self.assertEqual(flight.do("b", lambda: 2), 2)
+
+
+class IncrementalDocumentTest(unittest.TestCase):
+    XML = b"<root><a>1</a><skip><x/></skip><a>2</a><a>3</a></root>"
+
+    def _chunks(self, size):
+        # Feed the document in small pieces, like a streamed HTTP response
+        for i in range(0, len(self.XML), size):
+            yield self.XML[i : i + size]
+
+    def test_next_child(self):
+        for content in (self.XML, self._chunks(3)):
+            doc = IncrementalDocument(content)
+            root = doc.next_child(None)
+            self.assertEqual(root.tag, "root")
+            self.assertEqual(doc.next_child(root, tag="skip").tag, "skip")
+            self.assertEqual(doc.complete(doc.next_child(root)).text, "2")
+            self.assertEqual(doc.next_child(root).tag, "a")
+            self.assertIsNone(doc.next_child(root))
+
+    def test_iter_children(self):
+        for content in (self.XML, self._chunks(5)):
+            doc = IncrementalDocument(content)
+            root = doc.next_child(None)
+            children = [(e.tag, e.text) for e in doc.iter_children(root)]
+            self.assertEqual(children, [("a", "1"), ("skip", None), ("a", "2"), ("a", "3")])
+            # Consumed children are removed from the tree
+            self.assertEqual(len(root), 0)
+            self.assertTrue(doc.is_complete(root))
+
+    def test_parse_error(self):
+        doc = IncrementalDocument(b"")
+        with self.assertRaises(ParseError):
+            doc.next_child(None)